@@ -12,8 +12,12 @@ from __future__ import absolute_import, print_function
 import os
 import sys
 import copy
+import atexit
 import pprint
+import shutil
 import logging
+import tempfile
+import threading
 import subprocess
 
 # Import 3rd-party libs
@@ -75,6 +79,21 @@ def pytest_addoption(parser):
         help=('If a salt daemon fails to start, the test is marked as XFailed. '
               'If this flag is passed, then a test failure is raised instead of XFail.')
     )
+    saltparser.addoption(
+        '--salt-cli-zygote',
+        default=None,
+        action='store_true',
+        help=('Run salt-call and salt-run commands in children forked from a pre-loaded '
+              'interpreter instead of executing the CLI scripts every time.')
+    )
+    saltparser.addoption(
+        '--salt-log-server-backend',
+        default=None,
+        choices=('tornado', 'asyncio'),
+        help=('The backend of the server which receives the log records of the salt daemons. '
+              'Either \'tornado\', the default, or \'asyncio\', which uses uvloop when installed, '
+              'and requires Python 3.')
+    )
     parser.addini(
         'cli_bin_dir',
         default=None,
@@ -89,6 +108,86 @@ def pytest_addoption(parser):
         help=('If a salt daemon fails to start, the test is marked as XFailed. '
               'If this flag is set, then a test failure is raised instead of XFail.')
     )
+    parser.addini(
+        'salt_cli_zygote',
+        default=None,
+        type='bool',
+        help=('Run salt-call and salt-run commands in children forked from a pre-loaded '
+              'interpreter instead of executing the CLI scripts every time.')
+    )
+    parser.addini(
+        'salt_call_backend',
+        default=None,
+        help=('How the salt_call fixtures run their commands. Either \'cli\', the default, '
+              'which executes the salt-call CLI script, or \'caller\', which runs them '
+              'through salt.client.Caller in a reusable worker process.')
+    )
+    parser.addini(
+        'salt_client_backend',
+        default=None,
+        help=('How the salt and salt_run fixtures run their commands. Either \'cli\', the '
+              'default, which executes the salt and salt-run CLI scripts, or \'client\', which '
+              'runs them through salt.client.LocalClient and salt.runner.RunnerClient in reusable '
+              'worker processes.')
+    )
+    parser.addini(
+        'salt_daemon_readiness',
+        default=None,
+        help=('How to confirm the salt daemons are running. Either \'ports\', the default, '
+              'which connects to their ports and waits for their start events, or \'paths\', '
+              'which waits for their pidfile and event bus IPC sockets to be created.')
+    )
+    parser.addini(
+        'salt_log_server_backend',
+        default=None,
+        help=('The backend of the server which receives the log records of the salt daemons. '
+              'Either \'tornado\', the default, or \'asyncio\', which uses uvloop when installed, '
+              'and requires Python 3.')
+    )
+    parser.addini(
+        'salt_log_transport',
+        default=None,
+        help=('How the salt daemons hand their log records to the log server. Either \'tcp\', '
+              'the default, or \'ring\', where the daemons running on this host write them to '
+              'shared memory ring buffers, and the others still use TCP.')
+    )
+    parser.addini(
+        'salt_log_buffer_size',
+        default=None,
+        help=('How many log records, at most, wait to be sent to the log server in each salt '
+              'daemon process. Defaults to 100000.')
+    )
+    parser.addini(
+        'salt_log_overflow',
+        default=None,
+        help=('What the salt daemons do with a log record when too many are waiting to be sent '
+              'to the log server. Either \'drop-oldest\', the default, which drops the oldest '
+              'waiting log record, \'drop-debug-first\', which drops the waiting log records '
+              'under the INFO level first, or \'block\', which waits for room. The number of '
+              'dropped log records is logged when the daemons stop.')
+    )
+    parser.addini(
+        'salt_config_cache',
+        default=True,
+        type='bool',
+        help=('Load the salt daemons configuration files only once for the same options, '
+              'apart from their paths, ports and IDs, and reuse the loaded options after that. '
+              'Defaults to true.')
+    )
+    parser.addini(
+        'salt_key_pool_size',
+        default='4',
+        help=('How many RSA keypairs to pre-generate, in parallel, for each of the salt masters '
+              'and minions, and to hand to the daemons instead of them generating their own. '
+              'Set to 0 to disable. Defaults to 4.')
+    )
+    parser.addini(
+        'salt_hold_ports',
+        default=None,
+        type='bool',
+        help=('Keep the ports handed to the salt daemons bound, allowing their reuse, until '
+              'the daemons are running, so that nothing else can take them in the meantime.')
+    )
 
 
 @pytest.hookimpl(trylast=True)
@@ -163,6 +262,122 @@ def _salt_fail_hard(request, salt_fail_hard):
     return salt_fail_hard
 
 
+@pytest.fixture(scope='session')
+def salt_cli_zygote(request):
+    '''
+    Return the salt CLI zygote value
+    '''
+    return False
+
+
+@pytest.fixture(scope='session')
+def _salt_cli_zygote(request, salt_cli_zygote):
+    '''
+    Return the salt CLI zygote value
+    '''
+    cli_zygote = request.config.getoption('salt_cli_zygote')
+    if cli_zygote is not None:
+        # We were passed --salt-cli-zygote as a CLI option
+        return cli_zygote
+
+    # The salt CLI zygote was not passed as a CLI option
+    cli_zygote = request.config.getini('salt_cli_zygote')
+    if cli_zygote != []:
+        # We were passed salt_cli_zygote as a INI option
+        return cli_zygote
+
+    return salt_cli_zygote
+
+
+@pytest.fixture(scope='session')
+def salt_call_backend(request):
+    '''
+    Return the backend the salt_call fixtures use to run their commands
+    '''
+    return 'cli'
+
+
+@pytest.fixture(scope='session')
+def _salt_call_backend(request, salt_call_backend):
+    '''
+    Return the backend the salt_call fixtures use to run their commands
+    '''
+    backend = request.config.getini('salt_call_backend')
+    if backend:
+        # We were passed salt_call_backend as a INI option
+        return backend
+
+    return salt_call_backend
+
+
+@pytest.fixture(scope='session')
+def salt_client_backend(request):
+    '''
+    Return the backend the salt and salt_run fixtures use to run their commands
+    '''
+    return 'cli'
+
+
+@pytest.fixture(scope='session')
+def _salt_client_backend(request, salt_client_backend):
+    '''
+    Return the backend the salt and salt_run fixtures use to run their commands
+    '''
+    backend = request.config.getini('salt_client_backend')
+    if backend:
+        # We were passed salt_client_backend as a INI option
+        return backend
+
+    return salt_client_backend
+
+
+@pytest.fixture(scope='session')
+def salt_daemon_readiness(request):
+    '''
+    Return the strategy used to confirm the salt daemons are running
+    '''
+    return 'ports'
+
+
+@pytest.fixture(scope='session')
+def _salt_daemon_readiness(request, salt_daemon_readiness):
+    '''
+    Return the strategy used to confirm the salt daemons are running
+    '''
+    readiness = request.config.getini('salt_daemon_readiness')
+    if readiness:
+        # We were passed salt_daemon_readiness as a INI option
+        return readiness
+
+    return salt_daemon_readiness
+
+
+@pytest.fixture(scope='session')
+def salt_log_server_backend(request):
+    '''
+    Return the backend of the server which receives the log records of the salt daemons
+    '''
+    return 'tornado'
+
+
+@pytest.fixture(scope='session')
+def _salt_log_server_backend(request, salt_log_server_backend):
+    '''
+    Return the backend of the server which receives the log records of the salt daemons
+    '''
+    backend = request.config.getoption('salt_log_server_backend')
+    if backend is not None:
+        # We were passed --salt-log-server-backend as a CLI option
+        return backend
+
+    backend = request.config.getini('salt_log_server_backend')
+    if backend:
+        # We were passed salt_log_server_backend as a INI option
+        return backend
+
+    return salt_log_server_backend
+
+
 @pytest.fixture(scope='session')
 def running_username():
     '''
@@ -686,6 +901,33 @@ def session_salt_run_log_prefix(session_master_id):
     return 'salt-run/{}'.format(session_master_id)
 
 
+def _verify_env(verify_env_entries, running_username, pki_dir):
+    '''
+    Create the directories the salt daemons need, with the right permissions,
+    unless they all exist already, because the salt root dir was cloned from
+    its skeleton
+    '''
+    if all(os.path.isdir(entry) for entry in verify_env_entries):
+        return
+
+    # Late import
+    import salt.utils.verify as salt_verify
+    try:
+        # Salt > v2017.7.x
+        salt_verify.verify_env(  # pylint: disable=unexpected-keyword-arg
+            verify_env_entries,
+            running_username,
+            sensitive_dirs=[pki_dir]
+        )
+    except TypeError:
+        # Salt <= v2017.7.x
+        salt_verify.verify_env(
+            verify_env_entries,
+            running_username,
+            pki_dir=pki_dir
+        )
+
+
 def apply_master_config(default_options,
                         root_dir,
                         config_file,
@@ -708,16 +950,20 @@ def apply_master_config(default_options,
                         tcp_master_pull_port,
                         tcp_master_publish_pull,
                         tcp_master_workers,
-                        direct_overrides=None):
+                        direct_overrides=None,
+                        log_server_logger_filters=None):
     '''
     This fixture will return the salt master configuration options after being
     overridden with any options passed from ``master_config_overrides``
     '''
+    import pytestsalt.salt.log_handlers.pytest_log_handler as pytest_log_handler
     import pytestsalt.utils.compat as compat
+    import pytestsalt.utils.config_cache as config_cache
+    import pytestsalt.utils.keys as keys
+    import pytestsalt.utils.log_ring as log_ring
     import salt.config
     import salt.utils
     import salt.utils.dictupdate as dictupdate
-    import salt.utils.verify as salt_verify
     import salt.utils.yaml as yamlserialize
     _default_options = {
         'id': master_id,
@@ -798,6 +1044,18 @@ def apply_master_config(default_options,
     default_options['pytest_log_port'] = log_server_port
     default_options['pytest_log_level'] = log_server_level
     default_options['pytest_log_prefix'] = master_log_prefix
+    if log_server_logger_filters:
+        if log_server_logger_filters['levels']:
+            default_options['pytest_log_levels'] = log_server_logger_filters['levels']
+        if log_server_logger_filters['disabled']:
+            default_options['pytest_log_disabled'] = log_server_logger_filters['disabled']
+    log_ring_dir = log_ring.get_ring_dir()
+    if log_ring_dir is not None:
+        default_options['pytest_log_ring_dir'] = log_ring_dir
+    if pytest_log_handler.DAEMON_BUFFER_SIZE is not None:
+        default_options['pytest_log_buffer_size'] = pytest_log_handler.DAEMON_BUFFER_SIZE
+    if pytest_log_handler.DAEMON_OVERFLOW is not None:
+        default_options['pytest_log_overflow'] = pytest_log_handler.DAEMON_OVERFLOW
 
     if direct_overrides is not None:
         # We've been passed some direct override configuration.
@@ -813,7 +1071,28 @@ def apply_master_config(default_options,
         yamlserialize.safe_dump(default_options, wfh, default_flow_style=False)
 
     # Make sure to load the config file as a salt-master starting from CLI
-    options = salt.config.master_config(config_file)
+    variables = {
+        'root_dir': root_dir.strpath,
+        'real_root_dir': root_dir.realpath().strpath,
+        'config_dir': os.path.dirname(config_file),
+        'master_id': master_id,
+        'master_log_prefix': master_log_prefix,
+        'publish_port': publish_port,
+        'return_port': return_port,
+        'engine_port': engine_port,
+        'log_server_port': log_server_port,
+        'tcp_master_pub_port': tcp_master_pub_port,
+        'tcp_master_pull_port': tcp_master_pull_port,
+        'tcp_master_publish_pull': tcp_master_publish_pull,
+        'tcp_master_workers': tcp_master_workers,
+    }
+    for name, paths in (('base_env_state_tree_root_dir', base_env_state_tree_root_dirs),
+                        ('prod_env_state_tree_root_dir', prod_env_state_tree_root_dirs),
+                        ('base_env_pillar_tree_root_dir', base_env_pillar_tree_root_dirs),
+                        ('prod_env_pillar_tree_root_dir', prod_env_pillar_tree_root_dirs)):
+        for idx, path in enumerate(paths):
+            variables['{}_{}'.format(name, idx)] = path
+    options = config_cache.load_config(salt.config.master_config, config_file, default_options, variables)
 
     # verify env to make sure all required directories are created and have the
     # right permissions
@@ -843,18 +1122,8 @@ def apply_master_config(default_options,
             os.path.join(options['cachedir'], 'jobs'),
         ])
 
-    try:
-        salt_verify.verify_env(  # pylint: disable=unexpected-keyword-arg
-            verify_env_entries,
-            running_username,
-            sensitive_dirs=[options['pki_dir']]
-        )
-    except TypeError:
-        salt_verify.verify_env(
-            verify_env_entries,
-            running_username,
-            pki_dir=options['pki_dir']
-        )
+    _verify_env(verify_env_entries, running_username, options['pki_dir'])
+    keys.install_keypair('master', options['pki_dir'], options.get('keysize', 2048))
     return options
 
 
@@ -879,6 +1148,7 @@ def master_config(root_dir,
                   running_username,
                   log_server_port,
                   log_server_level,
+                  log_server_logger_filters,
                   engines_dir,
                   log_handlers_dir,
                   master_log_prefix,
@@ -911,7 +1181,8 @@ def master_config(root_dir,
                                master_tcp_master_pub_port,
                                master_tcp_master_pull_port,
                                master_tcp_master_publish_pull,
-                               master_tcp_master_workers)
+                               master_tcp_master_workers,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -935,6 +1206,7 @@ def session_master_config(session_root_dir,
                           running_username,
                           log_server_port,
                           log_server_level,
+                          log_server_logger_filters,
                           engines_dir,
                           log_handlers_dir,
                           session_master_log_prefix,
@@ -967,7 +1239,8 @@ def session_master_config(session_root_dir,
                                session_master_tcp_master_pub_port,
                                session_master_tcp_master_pull_port,
                                session_master_tcp_master_publish_pull,
-                               session_master_tcp_master_workers)
+                               session_master_tcp_master_workers,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -991,6 +1264,7 @@ def master_of_masters_config(master_of_masters_root_dir,
                              running_username,
                              log_server_port,
                              log_server_level,
+                             log_server_logger_filters,
                              engines_dir,
                              log_handlers_dir,
                              master_of_masters_log_prefix,
@@ -1027,7 +1301,8 @@ def master_of_masters_config(master_of_masters_root_dir,
                                master_of_masters_master_tcp_master_pull_port,
                                master_of_masters_master_tcp_master_publish_pull,
                                master_of_masters_master_tcp_master_workers,
-                               direct_overrides=direct_overrides)
+                               direct_overrides=direct_overrides,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -1051,6 +1326,7 @@ def session_master_of_masters_config(session_master_of_masters_root_dir,
                                      running_username,
                                      log_server_port,
                                      log_server_level,
+                                     log_server_logger_filters,
                                      engines_dir,
                                      log_handlers_dir,
                                      session_master_of_masters_log_prefix,
@@ -1087,7 +1363,8 @@ def session_master_of_masters_config(session_master_of_masters_root_dir,
                                session_master_of_masters_master_tcp_master_pull_port,
                                session_master_of_masters_master_tcp_master_publish_pull,
                                session_master_of_masters_master_tcp_master_workers,
-                               direct_overrides=direct_overrides)
+                               direct_overrides=direct_overrides,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 def apply_minion_config(default_options,
@@ -1103,16 +1380,20 @@ def apply_minion_config(default_options,
                         minion_log_prefix,
                         tcp_pub_port,
                         tcp_pull_port,
-                        direct_overrides=None):
+                        direct_overrides=None,
+                        log_server_logger_filters=None):
     '''
     This fixture will return the salt minion configuration options after being
     overridden with any options passed from ``config_overrides``
     '''
+    import pytestsalt.salt.log_handlers.pytest_log_handler as pytest_log_handler
     import pytestsalt.utils.compat as compat
+    import pytestsalt.utils.config_cache as config_cache
+    import pytestsalt.utils.keys as keys
+    import pytestsalt.utils.log_ring as log_ring
     import salt.config
     import salt.utils
     import salt.utils.dictupdate as dictupdate
-    import salt.utils.verify as salt_verify
     import salt.utils.yaml as yamlserialize
     _default_options = {
         'root_dir': root_dir.strpath,
@@ -1158,6 +1439,18 @@ def apply_minion_config(default_options,
     default_options['pytest_log_port'] = log_server_port
     default_options['pytest_log_level'] = log_server_level
     default_options['pytest_log_prefix'] = minion_log_prefix
+    if log_server_logger_filters:
+        if log_server_logger_filters['levels']:
+            default_options['pytest_log_levels'] = log_server_logger_filters['levels']
+        if log_server_logger_filters['disabled']:
+            default_options['pytest_log_disabled'] = log_server_logger_filters['disabled']
+    log_ring_dir = log_ring.get_ring_dir()
+    if log_ring_dir is not None:
+        default_options['pytest_log_ring_dir'] = log_ring_dir
+    if pytest_log_handler.DAEMON_BUFFER_SIZE is not None:
+        default_options['pytest_log_buffer_size'] = pytest_log_handler.DAEMON_BUFFER_SIZE
+    if pytest_log_handler.DAEMON_OVERFLOW is not None:
+        default_options['pytest_log_overflow'] = pytest_log_handler.DAEMON_OVERFLOW
 
     if direct_overrides is not None:
         # We've been passed some direct override configuration.
@@ -1173,7 +1466,18 @@ def apply_minion_config(default_options,
         yamlserialize.safe_dump(default_options, wfh, default_flow_style=False)
 
     # Make sure to load the config file as a salt-master starting from CLI
-    options = salt.config.minion_config(config_file)
+    variables = {
+        'root_dir': root_dir.strpath,
+        'real_root_dir': root_dir.realpath().strpath,
+        'config_dir': os.path.dirname(config_file),
+        'minion_id': minion_id,
+        'minion_log_prefix': minion_log_prefix,
+        'return_port': return_port,
+        'log_server_port': log_server_port,
+        'tcp_pub_port': tcp_pub_port,
+        'tcp_pull_port': tcp_pull_port,
+    }
+    options = config_cache.load_config(salt.config.minion_config, config_file, default_options, variables)
 
     # verify env to make sure all required directories are created and have the
     # right permissions
@@ -1189,20 +1493,11 @@ def apply_minion_config(default_options,
         #options['extension_modules'],
         options['sock_dir'],
     ]
-    try:
-        # Salt > v2017.7.x
-        salt_verify.verify_env(  # pylint: disable=unexpected-keyword-arg
-            verify_env_entries,
-            running_username,
-            sensitive_dirs=[options['pki_dir']]
-        )
-    except TypeError:
-        # Salt <= v2017.7.x
-        salt_verify.verify_env(
-            verify_env_entries,
-            running_username,
-            pki_dir=options['pki_dir']
-        )
+    _verify_env(verify_env_entries, running_username, options['pki_dir'])
+    pub_path = keys.install_keypair('minion', options['pki_dir'], options.get('keysize', 2048))
+    if pub_path is not None:
+        # Pre-accept the key, for the master sharing the pki_dir, if any
+        shutil.copyfile(pub_path, os.path.join(options['pki_dir'], 'minions', options['id']))
     return options
 
 
@@ -1219,16 +1514,19 @@ def apply_proxy_config(default_options,
                        proxy_log_prefix,
                        tcp_pub_port,
                        tcp_pull_port,
-                       direct_overrides=None):
+                       direct_overrides=None,
+                       log_server_logger_filters=None):
     '''
     This fixture will return the salt proxy configuration options after being
     overridden with any options passed from ``config_overrides``
     '''
+    import pytestsalt.salt.log_handlers.pytest_log_handler as pytest_log_handler
     import pytestsalt.utils.compat as compat
+    import pytestsalt.utils.config_cache as config_cache
+    import pytestsalt.utils.log_ring as log_ring
     import salt.config
     import salt.utils
     import salt.utils.dictupdate as dictupdate
-    import salt.utils.verify as salt_verify
     import salt.utils.yaml as yamlserialize
     _default_options = {
         'root_dir': root_dir.strpath,
@@ -1275,6 +1573,18 @@ def apply_proxy_config(default_options,
     default_options['pytest_log_port'] = log_server_port
     default_options['pytest_log_level'] = log_server_level
     default_options['pytest_log_prefix'] = proxy_log_prefix
+    if log_server_logger_filters:
+        if log_server_logger_filters['levels']:
+            default_options['pytest_log_levels'] = log_server_logger_filters['levels']
+        if log_server_logger_filters['disabled']:
+            default_options['pytest_log_disabled'] = log_server_logger_filters['disabled']
+    log_ring_dir = log_ring.get_ring_dir()
+    if log_ring_dir is not None:
+        default_options['pytest_log_ring_dir'] = log_ring_dir
+    if pytest_log_handler.DAEMON_BUFFER_SIZE is not None:
+        default_options['pytest_log_buffer_size'] = pytest_log_handler.DAEMON_BUFFER_SIZE
+    if pytest_log_handler.DAEMON_OVERFLOW is not None:
+        default_options['pytest_log_overflow'] = pytest_log_handler.DAEMON_OVERFLOW
 
     if direct_overrides is not None:
         # We've been passed some direct override configuration.
@@ -1290,7 +1600,18 @@ def apply_proxy_config(default_options,
         yamlserialize.safe_dump(default_options, wfh, default_flow_style=False)
 
     # Make sure to load the config file as a salt-master starting from CLI
-    options = salt.config.proxy_config(config_file)
+    variables = {
+        'root_dir': root_dir.strpath,
+        'real_root_dir': root_dir.realpath().strpath,
+        'config_dir': os.path.dirname(config_file),
+        'proxy_id': proxy_id,
+        'proxy_log_prefix': proxy_log_prefix,
+        'return_port': return_port,
+        'log_server_port': log_server_port,
+        'tcp_pub_port': tcp_pub_port,
+        'tcp_pull_port': tcp_pull_port,
+    }
+    options = config_cache.load_config(salt.config.proxy_config, config_file, default_options, variables)
 
     # verify env to make sure all required directories are created and have the
     # right permissions
@@ -1298,20 +1619,7 @@ def apply_proxy_config(default_options,
         os.path.dirname(options['log_file']),
         options['sock_dir'],
     ]
-    try:
-        # Salt > v2017.7.x
-        salt_verify.verify_env(  # pylint: disable=unexpected-keyword-arg
-            verify_env_entries,
-            running_username,
-            sensitive_dirs=[options['pki_dir']]
-        )
-    except TypeError:
-        # Salt <= v2017.7.x
-        salt_verify.verify_env(
-            verify_env_entries,
-            running_username,
-            pki_dir=options['pki_dir']
-        )
+    _verify_env(verify_env_entries, running_username, options['pki_dir'])
     return options
 
 
@@ -1330,6 +1638,7 @@ def minion_config(root_dir,
                   running_username,
                   log_server_port,
                   log_server_level,
+                  log_server_logger_filters,
                   log_handlers_dir,
                   minion_log_prefix,
                   minion_tcp_pub_port,
@@ -1350,7 +1659,8 @@ def minion_config(root_dir,
                                log_handlers_dir,
                                minion_log_prefix,
                                minion_tcp_pub_port,
-                               minion_tcp_pull_port)
+                               minion_tcp_pull_port,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -1368,6 +1678,7 @@ def session_minion_config(session_root_dir,
                           running_username,
                           log_server_port,
                           log_server_level,
+                          log_server_logger_filters,
                           log_handlers_dir,
                           session_minion_log_prefix,
                           session_minion_tcp_pub_port,
@@ -1388,7 +1699,8 @@ def session_minion_config(session_root_dir,
                                log_handlers_dir,
                                session_minion_log_prefix,
                                session_minion_tcp_pub_port,
-                               session_minion_tcp_pull_port)
+                               session_minion_tcp_pull_port,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture
@@ -1406,6 +1718,7 @@ def secondary_minion_config(secondary_root_dir,
                             running_username,
                             log_server_port,
                             log_server_level,
+                            log_server_logger_filters,
                             log_handlers_dir,
                             secondary_minion_log_prefix,
                             secondary_minion_tcp_pub_port,
@@ -1426,7 +1739,8 @@ def secondary_minion_config(secondary_root_dir,
                                log_handlers_dir,
                                secondary_minion_log_prefix,
                                secondary_minion_tcp_pub_port,
-                               secondary_minion_tcp_pull_port)
+                               secondary_minion_tcp_pull_port,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -1444,6 +1758,7 @@ def session_secondary_minion_config(session_secondary_root_dir,
                                     running_username,
                                     log_server_port,
                                     log_server_level,
+                                    log_server_logger_filters,
                                     log_handlers_dir,
                                     session_secondary_minion_log_prefix,
                                     session_secondary_minion_tcp_pub_port,
@@ -1464,7 +1779,8 @@ def session_secondary_minion_config(session_secondary_root_dir,
                                log_handlers_dir,
                                session_secondary_minion_log_prefix,
                                session_secondary_minion_tcp_pub_port,
-                               session_secondary_minion_tcp_pull_port)
+                               session_secondary_minion_tcp_pull_port,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 def apply_syndic_config(syndic_default_options,
@@ -1477,7 +1793,8 @@ def apply_syndic_config(syndic_default_options,
                         syndic_log_prefix,
                         syndic_id,
                         log_handlers_dir,
-                        root_dir):
+                        root_dir,
+                        log_server_logger_filters=None):
     '''
     This fixture will return the salt syndic configuration options after being
     overridden with any options passed from ``config_overrides``
@@ -1532,7 +1849,8 @@ def apply_syndic_config(syndic_default_options,
                         syndic_log_prefix,
                         None,  # minion_tcp_pub_port,
                         None,  # minion_tcp_pull_port,
-                        direct_overrides=direct_overrides)
+                        direct_overrides=direct_overrides,
+                        log_server_logger_filters=log_server_logger_filters)
 
     return salt.config.syndic_config(syndic_master_config_file, syndic_config_file)
 
@@ -1551,6 +1869,7 @@ def syndic_config(master_config,
                   running_username,
                   log_server_port,
                   log_server_level,
+                  log_server_logger_filters,
                   syndic_log_prefix,
                   syndic_id,
                   log_handlers_dir,
@@ -1569,7 +1888,8 @@ def syndic_config(master_config,
                                syndic_log_prefix,
                                syndic_id,
                                log_handlers_dir,
-                               root_dir)
+                               root_dir,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -1585,6 +1905,7 @@ def session_syndic_config(session_master_config_file,
                           running_username,
                           log_server_port,
                           log_server_level,
+                          log_server_logger_filters,
                           session_syndic_log_prefix,
                           session_syndic_id,
                           log_handlers_dir,
@@ -1603,7 +1924,8 @@ def session_syndic_config(session_master_config_file,
                                session_syndic_log_prefix,
                                session_syndic_id,
                                log_handlers_dir,
-                               session_root_dir)
+                               session_root_dir,
+                               log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture
@@ -1621,6 +1943,7 @@ def proxy_config(root_dir,
                  running_username,
                  log_server_port,
                  log_server_level,
+                 log_server_logger_filters,
                  log_handlers_dir,
                  proxy_log_prefix,
                  proxy_tcp_pub_port,
@@ -1641,7 +1964,8 @@ def proxy_config(root_dir,
                               log_handlers_dir,
                               proxy_log_prefix,
                               proxy_tcp_pub_port,
-                              proxy_tcp_pull_port)
+                              proxy_tcp_pull_port,
+                              log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture(scope='session')
@@ -1659,6 +1983,7 @@ def session_proxy_config(session_root_dir,
                          running_username,
                          log_server_port,
                          log_server_level,
+                         log_server_logger_filters,
                          log_handlers_dir,
                          session_proxy_log_prefix,
                          session_proxy_tcp_pub_port,
@@ -1679,7 +2004,8 @@ def session_proxy_config(session_root_dir,
                               log_handlers_dir,
                               session_proxy_log_prefix,
                               session_proxy_tcp_pub_port,
-                              session_proxy_tcp_pull_port)
+                              session_proxy_tcp_pull_port,
+                              log_server_logger_filters=log_server_logger_filters)
 
 
 @pytest.fixture
@@ -1808,9 +2134,9 @@ def _write_sshd_config(sshd_config_dir, sshd_config_lines, ssh_client_key):
     server_ecdsa_key_file = os.path.join(server_key_dir, 'ssh_host_ecdsa_key')
     server_ed25519_key_file = os.path.join(server_key_dir, 'ssh_host_ed25519_key')
 
-    _generate_ssh_key(server_dsa_key_file, 'dsa', 1024)
-    _generate_ssh_key(server_ecdsa_key_file, 'ecdsa', 521)
-    _generate_ssh_key(server_ed25519_key_file, 'ed25519', 521)
+    _generate_ssh_keys((server_dsa_key_file, 'dsa', 1024),
+                       (server_ecdsa_key_file, 'ecdsa', 521),
+                       (server_ed25519_key_file, 'ed25519', 521))
 
     sshd_config = sshd_config_lines[:]
     sshd_config.append('AuthorizedKeysFile {}.pub'.format(ssh_client_key))
@@ -1838,40 +2164,102 @@ def session_sshd_server_log_prefix(session_sshd_port):
     return 'session-sshd-server/{}'.format(session_sshd_port)
 
 
+class SSHKeyStore(object):
+    '''
+    Generate each type and size of SSH key only once per session, and copy it
+    wherever it's needed
+    '''
+
+    def __init__(self):
+        self.path = None
+        self._lock = threading.Lock()
+
+    def _get_store_key_path(self, key_type, key_size):
+        return os.path.join(self.path, '{}-{}'.format(key_type, key_size))
+
+    def _generate(self, keys):
+        '''
+        Generate the keys, ``(key_type, key_size)`` pairs, concurrently
+        '''
+        import pytestsalt.utils.compat as compat
+        keygen = compat.which('ssh-keygen')
+        if not keygen:
+            pytest.skip('"ssh-keygen" not found')
+
+        processes = []
+        for key_type, key_size in keys:
+            key_path = self._get_store_key_path(key_type, key_size)
+            log.debug('Generating ssh key(type: %s; size: %d; path: %s;)', key_type, key_size, key_path)
+            processes.append((key_type, key_size, key_path, subprocess.Popen(
+                [
+                    keygen,
+                    '-t', key_type,
+                    '-b', str(key_size),
+                    '-C', '"$(whoami)@$(hostname)-$(date -I)"',
+                    '-f', os.path.basename(key_path),
+                    '-P', ''
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                close_fds=True,
+                cwd=self.path
+            )))
+        errors = []
+        for key_type, key_size, key_path, keygen_process in processes:
+            _, keygen_err = keygen_process.communicate()
+            if keygen_err:
+                errors.append('ssh-keygen had errors generating {}({}:{}): {}'.format(
+                    os.path.basename(key_path),
+                    key_type,
+                    key_size,
+                    keygen_err
+                ))
+                # Don't keep a half generated key around
+                for path in (key_path, key_path + '.pub'):
+                    if os.path.exists(path):
+                        os.unlink(path)
+        if errors:
+            pytest.skip('\n'.join(errors))
+
+    def copy(self, keys):
+        '''
+        Copy the keys, ``(key_path, key_type, key_size)`` tuples, which don't
+        exist yet, into place, generating the ones not in the store first
+        '''
+        keys = [key for key in keys if not os.path.exists(key[0])]
+        if not keys:
+            return
+        with self._lock:
+            if self.path is None:
+                self.path = tempfile.mkdtemp(prefix='pytest-salt-ssh-keys-')
+                atexit.register(shutil.rmtree, self.path, True)
+            missing = sorted(set((key_type, key_size) for _, key_type, key_size in keys
+                                 if not os.path.exists(self._get_store_key_path(key_type, key_size))))
+            if missing:
+                self._generate(missing)
+        for key_path, key_type, key_size in keys:
+            store_key_path = self._get_store_key_path(key_type, key_size)
+            shutil.copyfile(store_key_path, key_path)
+            # ssh refuses private keys others can read
+            os.chmod(key_path, 0o600)
+            shutil.copyfile(store_key_path + '.pub', key_path + '.pub')
+
+
+SSH_KEY_STORE = SSHKeyStore()
+
+
+def _generate_ssh_keys(*keys):
+    '''
+    Generate the SSH keys, ``(key_path, key_type, key_size)`` tuples, which don't exist yet
+    '''
+    SSH_KEY_STORE.copy(keys)
+
+
 def _generate_ssh_key(key_path, key_type='ecdsa', key_size=521):
     '''
     Generate an SSH key
     '''
-    import pytestsalt.utils.compat as compat
-    log.debug('Generating ssh key(type: %s; size: %d; path: %s;)', key_type, key_size, key_path)
-    keygen = compat.which('ssh-keygen')
-    if not keygen:
-        pytest.skip('"ssh-keygen" not found')
-
-    keygen_process = subprocess.Popen(
-        [
-            keygen,
-            '-t', key_type,
-            '-b', str(key_size),
-            '-C', '"$(whoami)@$(hostname)-$(date -I)"',
-            '-f', os.path.basename(key_path),
-            '-P', ''
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        close_fds=True,
-        cwd=os.path.dirname(key_path)
-    )
-    _, keygen_err = keygen_process.communicate()
-    if keygen_err:
-        pytest.skip(
-            'ssh-keygen had errors generating {}({}:{}): {}'.format(
-                os.path.basename(key_path),
-                key_type,
-                key_size,
-                keygen_err
-            )
-        )
+    _generate_ssh_keys((key_path, key_type, key_size))
     return key_path
 
 
@@ -1960,6 +2348,41 @@ def session_roster_config(session_roster_config_file,
 
 @pytest.mark.trylast
 def pytest_configure(config):
+    # Late import
+    import pytestsalt.salt.log_handlers.pytest_log_handler as pytest_log_handler
+    import pytestsalt.utils.config_cache as config_cache
+    import pytestsalt.utils.keys as keys
+    import pytestsalt.utils.log_ring as log_ring
+    config_cache.ENABLED = config.getini('salt_config_cache') is not False
+    key_pool_size = config.getini('salt_key_pool_size')
+    try:
+        keys.POOL_SIZE = int(key_pool_size)
+    except ValueError:
+        keys.POOL_SIZE = -1
+    if keys.POOL_SIZE < 0:
+        raise pytest.UsageError(
+            'The key pool size must be a positive integer, or 0 to disable it, not {!r}'.format(key_pool_size))
+    log_transport = config.getini('salt_log_transport') or 'tcp'
+    if log_transport not in ('tcp', 'ring'):
+        raise pytest.UsageError(
+            'Unknown log transport {!r}. Available transports: tcp, ring'.format(log_transport))
+    log_ring.ENABLED = log_transport == 'ring'
+    log_buffer_size = config.getini('salt_log_buffer_size')
+    if log_buffer_size:
+        try:
+            buffer_size = int(log_buffer_size)
+        except ValueError:
+            buffer_size = 0
+        if buffer_size < 1:
+            raise pytest.UsageError(
+                'The log buffer size must be a positive integer, not {!r}'.format(log_buffer_size))
+        pytest_log_handler.DAEMON_BUFFER_SIZE = buffer_size
+    log_overflow = config.getini('salt_log_overflow')
+    if log_overflow:
+        if log_overflow not in pytest_log_handler.OVERFLOW_POLICIES:
+            raise pytest.UsageError('Unknown log overflow policy {!r}. Available policies: {}'.format(
+                log_overflow, ', '.join(pytest_log_handler.OVERFLOW_POLICIES)))
+        pytest_log_handler.DAEMON_OVERFLOW = log_overflow
     pytest.helpers.utils.register(apply_master_config)
     pytest.helpers.utils.register(apply_minion_config)
     pytest.helpers.utils.register(apply_syndic_config)
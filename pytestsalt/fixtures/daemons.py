@@ -11,16 +11,139 @@ Salt daemons fixtures
 from __future__ import absolute_import, print_function
 import os
 import sys
+import hashlib
 import logging
 import subprocess
+from collections import namedtuple
 
 # Import 3rd-party libs
 import pytest
 
-from pytestsalt.utils import SaltCliScriptBase, SaltDaemonScriptBase, start_daemon
+from pytestsalt.utils import SaltCliScriptBase, SaltDaemonScriptBase, start_daemon, start_daemons
+from pytestsalt.utils import terminate_event_listener
+from pytestsalt.utils.clients import CallerClientWorker, LocalClientWorker, RunnerClientWorker
 
 log = logging.getLogger(__name__)
 
+SaltTopology = namedtuple('SaltTopology', ('master', 'minion', 'secondary_minion'))
+SaltSyndicTopology = namedtuple('SaltSyndicTopology', ('master_of_masters', 'master', 'syndic'))
+
+
+def _get_event_ipc_check_paths(config):
+    '''
+    Return the paths of the event bus IPC sockets the daemon creates
+    '''
+    if config.get('ipc_mode') == 'tcp':
+        return []
+    if config['__role'] == 'master':
+        return [os.path.join(config['sock_dir'], 'master_event_pub.ipc')]
+    # Same as salt.utils.event
+    id_hash = hashlib.new(config['hash_type'],
+                          config.get('hash_id', config['id']).encode('utf-8')).hexdigest()[:10]
+    return [os.path.join(config['sock_dir'], 'minion_event_{}_pub.ipc'.format(id_hash))]
+
+
+def _get_master_start_kwargs(master_id,
+                             master_log_prefix,
+                             cli_master_script_name,
+                             master_config,
+                             master_conf_dir,
+                             cli_bin_dir,
+                             fail_hard):
+    '''
+    Return the start_daemon() keyword arguments of a salt-master
+    '''
+    return dict(daemon_name='salt-master',
+                daemon_id=master_id,
+                daemon_log_prefix=master_log_prefix,
+                daemon_cli_script_name=cli_master_script_name,
+                daemon_config=master_config,
+                daemon_config_dir=master_conf_dir,
+                daemon_class=SaltMaster,
+                bin_dir_path=cli_bin_dir,
+                fail_hard=fail_hard,
+                event_listener_config_dir=master_conf_dir,
+                start_timeout=60)
+
+
+def _get_minion_start_kwargs(minion_id,
+                             minion_log_prefix,
+                             cli_minion_script_name,
+                             minion_config,
+                             minion_conf_dir,
+                             master_conf_dir,
+                             cli_bin_dir,
+                             fail_hard):
+    '''
+    Return the start_daemon() keyword arguments of a salt-minion
+    '''
+    return dict(daemon_name='salt-minion',
+                daemon_id=minion_id,
+                daemon_log_prefix=minion_log_prefix,
+                daemon_cli_script_name=cli_minion_script_name,
+                daemon_config=minion_config,
+                daemon_config_dir=minion_conf_dir,
+                daemon_class=SaltMinion,
+                bin_dir_path=cli_bin_dir,
+                fail_hard=fail_hard,
+                event_listener_config_dir=master_conf_dir,
+                start_timeout=60)
+
+
+def _get_syndic_start_kwargs(syndic_id,
+                             syndic_log_prefix,
+                             cli_syndic_script_name,
+                             syndic_config,
+                             syndic_conf_dir,
+                             master_conf_dir,
+                             cli_bin_dir,
+                             fail_hard):
+    '''
+    Return the start_daemon() keyword arguments of a salt-syndic
+    '''
+    return dict(daemon_name='salt-syndic',
+                daemon_id=syndic_id,
+                daemon_log_prefix=syndic_log_prefix,
+                daemon_cli_script_name=cli_syndic_script_name,
+                daemon_config=syndic_config,
+                daemon_config_dir=syndic_conf_dir,
+                daemon_class=SaltSyndic,
+                bin_dir_path=cli_bin_dir,
+                fail_hard=fail_hard,
+                event_listener_config_dir=master_conf_dir,
+                start_timeout=60)
+
+
+def _start_salt_daemons(request, started_daemons, daemons):
+    '''
+    Concurrently start the ``daemons``, ``(fixture name, start_daemon() keyword arguments)``
+    pairs, which are not in ``started_daemons`` yet, where the daemons started by the
+    fixtures of the same scope are kept, so that a daemon requested both on its own and
+    as part of a topology is only started once.
+
+    Returns the list of the running daemons
+    '''
+    pending = [(name, kwargs) for (name, kwargs) in daemons if name not in started_daemons]
+    if pending:
+        started_daemons.update(start_daemons(request, pending))
+    return [started_daemons[name] for (name, _) in daemons]
+
+
+@pytest.fixture
+def _started_salt_daemons():
+    '''
+    The salt daemons started by the fixtures of the test
+    '''
+    return {}
+
+
+@pytest.fixture(scope='session')
+def _session_started_salt_daemons():
+    '''
+    The salt daemons started by the session fixtures
+    '''
+    return {}
+
 
 @pytest.fixture
 def salt_cli_default_timeout():
@@ -95,22 +218,20 @@ def salt_master(request,
                 master_log_prefix,
                 cli_master_script_name,
                 _cli_bin_dir,
-                _salt_fail_hard):
+                _salt_fail_hard,
+                _started_salt_daemons):
     '''
     Returns a running salt-master
     '''
-    return start_daemon(request,
-                        daemon_name='salt-master',
-                        daemon_id=master_id,
-                        daemon_log_prefix=master_log_prefix,
-                        daemon_cli_script_name=cli_master_script_name,
-                        daemon_config=master_config,
-                        daemon_config_dir=conf_dir,
-                        daemon_class=SaltMaster,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_master', _get_master_start_kwargs(master_id,
+                                                 master_log_prefix,
+                                                 cli_master_script_name,
+                                                 master_config,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture(scope='session')
@@ -153,22 +274,20 @@ def session_salt_master(request,
                         session_master_log_prefix,
                         cli_master_script_name,
                         _cli_bin_dir,
-                        _salt_fail_hard):
+                        _salt_fail_hard,
+                        _session_started_salt_daemons):
     '''
     Returns a running salt-master
     '''
-    return start_daemon(request,
-                        daemon_name='salt-master',
-                        daemon_id=session_master_id,
-                        daemon_log_prefix=session_master_log_prefix,
-                        daemon_cli_script_name=cli_master_script_name,
-                        daemon_config=session_master_config,
-                        daemon_config_dir=session_conf_dir,
-                        daemon_class=SaltMaster,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=session_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_master', _get_master_start_kwargs(session_master_id,
+                                                         session_master_log_prefix,
+                                                         cli_master_script_name,
+                                                         session_master_config,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture
@@ -211,22 +330,20 @@ def salt_master_of_masters(request,
                            master_of_masters_log_prefix,
                            cli_master_script_name,
                            _cli_bin_dir,
-                           _salt_fail_hard):
+                           _salt_fail_hard,
+                           _started_salt_daemons):
     '''
     Returns a running salt-master
     '''
-    return start_daemon(request,
-                        daemon_name='salt-master',
-                        daemon_id=master_of_masters_id,
-                        daemon_log_prefix=master_of_masters_log_prefix,
-                        daemon_cli_script_name=cli_master_script_name,
-                        daemon_config=master_of_masters_config,
-                        daemon_config_dir=master_of_masters_conf_dir,
-                        daemon_class=SaltMaster,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=master_of_masters_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_master_of_masters', _get_master_start_kwargs(master_of_masters_id,
+                                                            master_of_masters_log_prefix,
+                                                            cli_master_script_name,
+                                                            master_of_masters_config,
+                                                            master_of_masters_conf_dir,
+                                                            _cli_bin_dir,
+                                                            _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture(scope='session')
@@ -269,22 +386,20 @@ def session_salt_master_of_masters(request,
                                    session_master_of_masters_log_prefix,
                                    cli_master_script_name,
                                    _cli_bin_dir,
-                                   _salt_fail_hard):
+                                   _salt_fail_hard,
+                                   _session_started_salt_daemons):
     '''
     Returns a running salt-master
     '''
-    return start_daemon(request,
-                        daemon_name='salt-master',
-                        daemon_id=session_master_of_masters_id,
-                        daemon_log_prefix=session_master_of_masters_log_prefix,
-                        daemon_cli_script_name=cli_master_script_name,
-                        daemon_config=session_master_of_masters_config,
-                        daemon_config_dir=session_master_of_masters_conf_dir,
-                        daemon_class=SaltMaster,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=session_master_of_masters_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_master_of_masters', _get_master_start_kwargs(session_master_of_masters_id,
+                                                                    session_master_of_masters_log_prefix,
+                                                                    cli_master_script_name,
+                                                                    session_master_of_masters_config,
+                                                                    session_master_of_masters_conf_dir,
+                                                                    _cli_bin_dir,
+                                                                    _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture
@@ -328,22 +443,21 @@ def salt_minion(request,
                 log_server,
                 _cli_bin_dir,
                 _salt_fail_hard,
-                conf_dir):  # pylint: disable=unused-argument
+                conf_dir,
+                _started_salt_daemons):  # pylint: disable=unused-argument
     '''
     Returns a running salt-minion
     '''
-    return start_daemon(request,
-                        daemon_name='salt-minion',
-                        daemon_id=minion_id,
-                        daemon_log_prefix=minion_log_prefix,
-                        daemon_cli_script_name=cli_minion_script_name,
-                        daemon_config=minion_config,
-                        daemon_config_dir=conf_dir,
-                        daemon_class=SaltMinion,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_minion', _get_minion_start_kwargs(minion_id,
+                                                 minion_log_prefix,
+                                                 cli_minion_script_name,
+                                                 minion_config,
+                                                 conf_dir,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture(scope='session')
@@ -387,22 +501,21 @@ def session_salt_minion(request,
                         log_server,
                         _cli_bin_dir,
                         session_conf_dir,
-                        _salt_fail_hard):
+                        _salt_fail_hard,
+                        _session_started_salt_daemons):  # pylint: disable=unused-argument
     '''
     Returns a running salt-minion
     '''
-    return start_daemon(request,
-                        daemon_name='salt-minion',
-                        daemon_id=session_minion_id,
-                        daemon_log_prefix=session_minion_log_prefix,
-                        daemon_cli_script_name=cli_minion_script_name,
-                        daemon_config=session_minion_config,
-                        daemon_config_dir=session_conf_dir,
-                        daemon_class=SaltMinion,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=session_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_minion', _get_minion_start_kwargs(session_minion_id,
+                                                         session_minion_log_prefix,
+                                                         cli_minion_script_name,
+                                                         session_minion_config,
+                                                         session_conf_dir,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture
@@ -447,22 +560,21 @@ def secondary_salt_minion(request,
                           _cli_bin_dir,
                           _salt_fail_hard,
                           conf_dir,
-                          secondary_conf_dir):  # pylint: disable=unused-argument
+                          secondary_conf_dir,
+                          _started_salt_daemons):  # pylint: disable=unused-argument
     '''
     Returns a running salt-minion
     '''
-    return start_daemon(request,
-                        daemon_name='salt-minion',
-                        daemon_id=secondary_minion_id,
-                        daemon_log_prefix=secondary_minion_log_prefix,
-                        daemon_cli_script_name=cli_minion_script_name,
-                        daemon_config=secondary_minion_config,
-                        daemon_config_dir=secondary_conf_dir,
-                        daemon_class=SaltMinion,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _started_salt_daemons, [
+        ('secondary_salt_minion', _get_minion_start_kwargs(secondary_minion_id,
+                                                           secondary_minion_log_prefix,
+                                                           cli_minion_script_name,
+                                                           secondary_minion_config,
+                                                           secondary_conf_dir,
+                                                           conf_dir,
+                                                           _cli_bin_dir,
+                                                           _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture(scope='session')
@@ -507,22 +619,235 @@ def session_secondary_salt_minion(request,
                                   _cli_bin_dir,
                                   _salt_fail_hard,
                                   session_conf_dir,
-                                  session_secondary_conf_dir):
+                                  session_secondary_conf_dir,
+                                  _session_started_salt_daemons):  # pylint: disable=unused-argument
     '''
     Returns a running salt-minion
     '''
-    return start_daemon(request,
-                        daemon_name='salt-minion',
-                        daemon_id=session_secondary_minion_id,
-                        daemon_log_prefix=session_secondary_minion_log_prefix,
-                        daemon_cli_script_name=cli_minion_script_name,
-                        daemon_config=session_secondary_minion_config,
-                        daemon_config_dir=session_secondary_conf_dir,
-                        daemon_class=SaltMinion,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=session_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_secondary_salt_minion', _get_minion_start_kwargs(session_secondary_minion_id,
+                                                                   session_secondary_minion_log_prefix,
+                                                                   cli_minion_script_name,
+                                                                   session_secondary_minion_config,
+                                                                   session_secondary_conf_dir,
+                                                                   session_conf_dir,
+                                                                   _cli_bin_dir,
+                                                                   _salt_fail_hard)),
+    ])[0]
+
+
+@pytest.fixture
+def salt_topology(request,
+                  conf_dir,
+                  secondary_conf_dir,
+                  master_id,
+                  minion_id,
+                  secondary_minion_id,
+                  master_config,
+                  minion_config,
+                  secondary_minion_config,
+                  salt_master_before_start,  # pylint: disable=unused-argument
+                  salt_minion_before_start,  # pylint: disable=unused-argument
+                  secondary_salt_minion_before_start,  # pylint: disable=unused-argument
+                  master_log_prefix,
+                  minion_log_prefix,
+                  secondary_minion_log_prefix,
+                  cli_master_script_name,
+                  cli_minion_script_name,
+                  log_server,  # pylint: disable=unused-argument
+                  _cli_bin_dir,
+                  _salt_fail_hard,
+                  _started_salt_daemons):
+    '''
+    Returns a running salt-master, salt-minion and secondary salt-minion, all started concurrently,
+    the same ``salt_master``, ``salt_minion`` and ``secondary_salt_minion`` return
+    '''
+    return SaltTopology(*_start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_master', _get_master_start_kwargs(master_id,
+                                                 master_log_prefix,
+                                                 cli_master_script_name,
+                                                 master_config,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+        ('salt_minion', _get_minion_start_kwargs(minion_id,
+                                                 minion_log_prefix,
+                                                 cli_minion_script_name,
+                                                 minion_config,
+                                                 conf_dir,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+        ('secondary_salt_minion', _get_minion_start_kwargs(secondary_minion_id,
+                                                           secondary_minion_log_prefix,
+                                                           cli_minion_script_name,
+                                                           secondary_minion_config,
+                                                           secondary_conf_dir,
+                                                           conf_dir,
+                                                           _cli_bin_dir,
+                                                           _salt_fail_hard)),
+    ]))
+
+
+@pytest.fixture(scope='session')
+def session_salt_topology(request,
+                          session_conf_dir,
+                          session_secondary_conf_dir,
+                          session_master_id,
+                          session_minion_id,
+                          session_secondary_minion_id,
+                          session_master_config,
+                          session_minion_config,
+                          session_secondary_minion_config,
+                          session_salt_master_before_start,  # pylint: disable=unused-argument
+                          session_salt_minion_before_start,  # pylint: disable=unused-argument
+                          session_secondary_salt_minion_before_start,  # pylint: disable=unused-argument
+                          session_master_log_prefix,
+                          session_minion_log_prefix,
+                          session_secondary_minion_log_prefix,
+                          cli_master_script_name,
+                          cli_minion_script_name,
+                          log_server,  # pylint: disable=unused-argument
+                          _cli_bin_dir,
+                          _salt_fail_hard,
+                          _session_started_salt_daemons):
+    '''
+    Returns a running salt-master, salt-minion and secondary salt-minion, all started concurrently,
+    the same ``session_salt_master``, ``session_salt_minion`` and ``session_secondary_salt_minion``
+    return
+    '''
+    return SaltTopology(*_start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_master', _get_master_start_kwargs(session_master_id,
+                                                         session_master_log_prefix,
+                                                         cli_master_script_name,
+                                                         session_master_config,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+        ('session_salt_minion', _get_minion_start_kwargs(session_minion_id,
+                                                         session_minion_log_prefix,
+                                                         cli_minion_script_name,
+                                                         session_minion_config,
+                                                         session_conf_dir,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+        ('session_secondary_salt_minion', _get_minion_start_kwargs(session_secondary_minion_id,
+                                                                   session_secondary_minion_log_prefix,
+                                                                   cli_minion_script_name,
+                                                                   session_secondary_minion_config,
+                                                                   session_secondary_conf_dir,
+                                                                   session_conf_dir,
+                                                                   _cli_bin_dir,
+                                                                   _salt_fail_hard)),
+    ]))
+
+
+@pytest.fixture
+def salt_syndic_topology(request,
+                         master_of_masters_conf_dir,
+                         conf_dir,
+                         syndic_conf_dir,
+                         master_of_masters_id,
+                         master_id,
+                         syndic_id,
+                         master_of_masters_config,
+                         master_config,
+                         syndic_config,
+                         salt_master_of_masters_before_start,  # pylint: disable=unused-argument
+                         salt_master_before_start,  # pylint: disable=unused-argument
+                         salt_syndic_before_start,  # pylint: disable=unused-argument
+                         master_of_masters_log_prefix,
+                         master_log_prefix,
+                         syndic_log_prefix,
+                         cli_master_script_name,
+                         cli_syndic_script_name,
+                         log_server,  # pylint: disable=unused-argument
+                         _cli_bin_dir,
+                         _salt_fail_hard,
+                         _started_salt_daemons):
+    '''
+    Returns a running master of masters, salt-master and salt-syndic, all started concurrently,
+    the same ``salt_master_of_masters``, ``salt_master`` and ``salt_syndic`` return
+    '''
+    return SaltSyndicTopology(*_start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_master_of_masters', _get_master_start_kwargs(master_of_masters_id,
+                                                            master_of_masters_log_prefix,
+                                                            cli_master_script_name,
+                                                            master_of_masters_config,
+                                                            master_of_masters_conf_dir,
+                                                            _cli_bin_dir,
+                                                            _salt_fail_hard)),
+        ('salt_master', _get_master_start_kwargs(master_id,
+                                                 master_log_prefix,
+                                                 cli_master_script_name,
+                                                 master_config,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+        ('salt_syndic', _get_syndic_start_kwargs(syndic_id,
+                                                 syndic_log_prefix,
+                                                 cli_syndic_script_name,
+                                                 syndic_config,
+                                                 syndic_conf_dir,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+    ]))
+
+
+@pytest.fixture(scope='session')
+def session_salt_syndic_topology(request,
+                                 session_master_of_masters_conf_dir,
+                                 session_conf_dir,
+                                 session_syndic_conf_dir,
+                                 session_master_of_masters_id,
+                                 session_master_id,
+                                 session_syndic_id,
+                                 session_master_of_masters_config,
+                                 session_master_config,
+                                 session_syndic_config,
+                                 session_salt_master_of_masters_before_start,  # pylint: disable=unused-argument
+                                 session_salt_master_before_start,  # pylint: disable=unused-argument
+                                 session_salt_syndic_before_start,  # pylint: disable=unused-argument
+                                 session_master_of_masters_log_prefix,
+                                 session_master_log_prefix,
+                                 session_syndic_log_prefix,
+                                 cli_master_script_name,
+                                 cli_syndic_script_name,
+                                 log_server,  # pylint: disable=unused-argument
+                                 _cli_bin_dir,
+                                 _salt_fail_hard,
+                                 _session_started_salt_daemons):
+    '''
+    Returns a running master of masters, salt-master and salt-syndic, all started concurrently,
+    the same ``session_salt_master_of_masters``, ``session_salt_master`` and ``session_salt_syndic``
+    return
+    '''
+    return SaltSyndicTopology(*_start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_master_of_masters', _get_master_start_kwargs(session_master_of_masters_id,
+                                                                    session_master_of_masters_log_prefix,
+                                                                    cli_master_script_name,
+                                                                    session_master_of_masters_config,
+                                                                    session_master_of_masters_conf_dir,
+                                                                    _cli_bin_dir,
+                                                                    _salt_fail_hard)),
+        ('session_salt_master', _get_master_start_kwargs(session_master_id,
+                                                         session_master_log_prefix,
+                                                         cli_master_script_name,
+                                                         session_master_config,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+        ('session_salt_syndic', _get_syndic_start_kwargs(session_syndic_id,
+                                                         session_syndic_log_prefix,
+                                                         cli_syndic_script_name,
+                                                         session_syndic_config,
+                                                         session_syndic_conf_dir,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+    ]))
 
 
 @pytest.fixture
@@ -566,22 +891,21 @@ def salt_syndic(request,
                 cli_syndic_script_name,
                 conf_dir,
                 _cli_bin_dir,
-                _salt_fail_hard):
+                _salt_fail_hard,
+                _started_salt_daemons):
     '''
     Returns a running salt-syndic
     '''
-    return start_daemon(request,
-                        daemon_name='salt-syndic',
-                        daemon_id=syndic_id,
-                        daemon_log_prefix=syndic_log_prefix,
-                        daemon_cli_script_name=cli_syndic_script_name,
-                        daemon_config=syndic_config,
-                        daemon_config_dir=syndic_conf_dir,
-                        daemon_class=SaltSyndic,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _started_salt_daemons, [
+        ('salt_syndic', _get_syndic_start_kwargs(syndic_id,
+                                                 syndic_log_prefix,
+                                                 cli_syndic_script_name,
+                                                 syndic_config,
+                                                 syndic_conf_dir,
+                                                 conf_dir,
+                                                 _cli_bin_dir,
+                                                 _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture(scope='session')
@@ -625,22 +949,21 @@ def session_salt_syndic(request,
                         cli_syndic_script_name,
                         session_conf_dir,
                         _cli_bin_dir,
-                        _salt_fail_hard):
+                        _salt_fail_hard,
+                        _session_started_salt_daemons):
     '''
     Returns a running salt-syndic
     '''
-    return start_daemon(request,
-                        daemon_name='salt-syndic',
-                        daemon_id=session_syndic_id,
-                        daemon_log_prefix=session_syndic_log_prefix,
-                        daemon_cli_script_name=cli_syndic_script_name,
-                        daemon_config=session_syndic_config,
-                        daemon_config_dir=session_syndic_conf_dir,
-                        daemon_class=SaltSyndic,
-                        bin_dir_path=_cli_bin_dir,
-                        fail_hard=_salt_fail_hard,
-                        event_listener_config_dir=session_conf_dir,
-                        start_timeout=60)
+    return _start_salt_daemons(request, _session_started_salt_daemons, [
+        ('session_salt_syndic', _get_syndic_start_kwargs(session_syndic_id,
+                                                         session_syndic_log_prefix,
+                                                         cli_syndic_script_name,
+                                                         session_syndic_config,
+                                                         session_syndic_conf_dir,
+                                                         session_conf_dir,
+                                                         _cli_bin_dir,
+                                                         _salt_fail_hard)),
+    ])[0]
 
 
 @pytest.fixture
@@ -1496,6 +1819,9 @@ class Salt(SaltCliScriptBase):
     Class which runs salt-call commands
     '''
 
+    client_backends = {'client': LocalClientWorker}
+    backend_fixture_name = '_salt_client_backend'
+
     def get_minion_tgt(self, **kwargs):
         return kwargs.pop('minion_tgt', self.config['id'])
 
@@ -1522,6 +1848,10 @@ class SaltCall(SaltCliScriptBase):
     Class which runs salt-call commands
     '''
 
+    zygote_config_name = 'minion'
+    client_backends = {'caller': CallerClientWorker}
+    backend_fixture_name = '_salt_call_backend'
+
     def get_script_args(self):
         return ['--retcode-passthrough']
 
@@ -1537,6 +1867,10 @@ class SaltRun(SaltCliScriptBase):
     Class which runs salt-run commands
     '''
 
+    zygote_config_name = 'master'
+    client_backends = {'client': RunnerClientWorker}
+    backend_fixture_name = '_salt_client_backend'
+
     def process_output(self, tgt, stdout, stderr, cli_cmd):  # pylint: disable=signature-differs
         if 'No minions matched the target. No command was sent, no jid was assigned.\n' in stdout:
             stdout = stdout.split('\n', 1)[1:][0]
@@ -1585,6 +1919,9 @@ class SaltMinion(SaltDaemonScriptBase):
     def get_check_ports(self):
         return super(SaltMinion, self).get_check_ports()
 
+    def get_check_paths(self):
+        return [self.config['pidfile']] + _get_event_ipc_check_paths(self.config)
+
 
 class SaltProxy(SaltDaemonScriptBase):
     '''
@@ -1605,6 +1942,9 @@ class SaltProxy(SaltDaemonScriptBase):
     def get_check_ports(self):
         return super(SaltProxy, self).get_check_ports()
 
+    def get_check_paths(self):
+        return [self.config['pidfile']] + _get_event_ipc_check_paths(self.config)
+
 
 class SaltMaster(SaltDaemonScriptBase):
     '''
@@ -1620,6 +1960,14 @@ class SaltMaster(SaltDaemonScriptBase):
     def get_check_ports(self):
         return super(SaltMaster, self).get_check_ports()
 
+    def get_check_paths(self):
+        return [self.config['pidfile']] + _get_event_ipc_check_paths(self.config)
+
+    def terminate(self):
+        # The event listener shared by everything started against this master goes away with it
+        terminate_event_listener(self.event_listener_config_dir or self.config_dir)
+        super(SaltMaster, self).terminate()
+
 
 class SaltSyndic(SaltDaemonScriptBase):
     '''
@@ -19,6 +19,7 @@ import pytest
 # Import pytest-salt libs
 import pytestsalt.salt.engines
 import pytestsalt.salt.log_handlers
+from pytestsalt.utils import skeleton
 
 
 log = logging.getLogger(__name__)
@@ -29,54 +30,75 @@ SECONDARY_ROOT_DIR = 'secondary-root'
 SESSION_ROOT_DIR = 'session-root'
 SESSION_MOM_ROOT_DIR = 'session-mom-root'
 SESSION_SECONDARY_ROOT_DIR = 'session-secondary-root'
+SKELETON_ROOT_DIR = 'skeleton-root'
+
+
+@pytest.fixture(scope='session')
+def root_dir_skeleton(tempdir, running_username):
+    '''
+    Return the skeleton which the salt root dirs are cloned from
+    '''
+    return skeleton.build(tempdir.join(SKELETON_ROOT_DIR).strpath, running_username)
 
 
 @pytest.fixture
-def root_dir(tempdir):
+def root_dir(tempdir, root_dir_skeleton):
     '''
     Return the function scoped salt root dir
     '''
-    return tempdir.mkdir(ROOT_DIR)
+    dirname = tempdir.join(ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture(scope='session')
-def session_root_dir(tempdir):
+def session_root_dir(tempdir, root_dir_skeleton):
     '''
     Return the session scoped salt root dir
     '''
-    return tempdir.mkdir(SESSION_ROOT_DIR)
+    dirname = tempdir.join(SESSION_ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture
-def master_of_masters_root_dir(tempdir):
+def master_of_masters_root_dir(tempdir, root_dir_skeleton):
     '''
     Return the function scoped salt master of masters root dir
     '''
-    return tempdir.mkdir(MOM_ROOT_DIR)
+    dirname = tempdir.join(MOM_ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture(scope='session')
-def session_master_of_masters_root_dir(tempdir):
+def session_master_of_masters_root_dir(tempdir, root_dir_skeleton):
     '''
     Return the session scoped salt master of masters root dir
     '''
-    return tempdir.mkdir(SESSION_MOM_ROOT_DIR)
+    dirname = tempdir.join(SESSION_MOM_ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture
-def secondary_root_dir(tempdir):
+def secondary_root_dir(tempdir, root_dir_skeleton):
     '''
     Return the function scoped salt secondary root dir
     '''
-    return tempdir.mkdir(SECONDARY_ROOT_DIR)
+    dirname = tempdir.join(SECONDARY_ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture(scope='session')
-def session_secondary_root_dir(tempdir):
+def session_secondary_root_dir(tempdir, root_dir_skeleton):
     '''
     Return the session scoped salt secondary root dir
     '''
-    return tempdir.mkdir(SESSION_SECONDARY_ROOT_DIR)
+    dirname = tempdir.join(SESSION_SECONDARY_ROOT_DIR)
+    root_dir_skeleton.clone(dirname.strpath)
+    return dirname
 
 
 @pytest.fixture
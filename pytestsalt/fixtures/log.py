@@ -9,18 +9,12 @@ from external process to log them in the current process
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
-#import sys
+import sys
 import logging
 
 # Import pytest libs
 import pytest
 
-#if sys.version_info > (3, 5):
-#    from pytestsalt.utils.log_server_asyncio import log_server_asyncio as salt_log_server
-#else:
-#    from pytestsalt.utils.log_server_tornado import log_server_tornado as salt_log_server
-from pytestsalt.utils.log_server_tornado import log_server_tornado as salt_log_server
-
 
 log = logging.getLogger(__name__)
 
@@ -49,10 +43,103 @@ def log_server_level(request):
     return level_str
 
 
+def _handlers_level(logger):
+    '''
+    Return the lowest level of the log records which the handlers of ``logger``,
+    and of the loggers it propagates to, don't drop
+    '''
+    levels = []
+    while logger is not None:
+        levels.extend(handler.level for handler in logger.handlers)
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    if levels:
+        return min(levels)
+    last_resort = getattr(logging, 'lastResort', None)
+    if last_resort is not None:
+        return last_resort.level
+    # Nothing handles the log records
+    return logging.CRITICAL + 1
+
+
+def get_logger_filters(level):
+    '''
+    Return the log records the log server drops, on top of the ones under ``level``.
+
+    ``levels`` maps logger names to the level under which their log records
+    are dropped, for the loggers where that level is above ``level``, and it
+    applies to their child loggers too. ``disabled`` lists the names of the
+    loggers which drop every log record, not their child loggers.
+    '''
+    if not isinstance(level, int):
+        level = logging.getLevelName(level.upper())
+    loggers = {'root': logging.getLogger()}
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger):
+            loggers[name] = logger
+
+    levels = {}
+    disabled = []
+    # Parents first, a level is only published when it's not what its parent says
+    for name in sorted(loggers, key=lambda name: (name != 'root', name.count('.'), name)):
+        logger = loggers[name]
+        if logger.disabled:
+            disabled.append(name)
+        logger_level = max(level, _handlers_level(logger))
+        inherited = level
+        if name != 'root':
+            parent_name = name
+            while parent_name:
+                parent_name = parent_name.rpartition('.')[0]
+                if parent_name in levels:
+                    inherited = levels[parent_name]
+                    break
+            else:
+                inherited = levels.get('root', level)
+        if logger_level != inherited:
+            levels[name] = logger_level
+    return {'levels': levels, 'disabled': disabled}
+
+
+@pytest.fixture(scope='session')
+def log_server_logger_filters(log_server_level):
+    '''
+    Return which log records, per logger, the log server drops, so that the
+    salt daemons don't even send them
+    '''
+    return get_logger_filters(log_server_level)
+
+
+def get_log_server(backend):
+    '''
+    Return the function which starts the log server using ``backend``
+    '''
+    if backend == 'asyncio':
+        if sys.version_info < (3, 5):
+            pytest.fail('The asyncio log server backend requires Python >= 3.5')
+        from pytestsalt.utils.log_server_asyncio import log_server_asyncio
+        return log_server_asyncio
+    if backend == 'tornado':
+        from pytestsalt.utils.log_server_tornado import log_server_tornado
+        return log_server_tornado
+    pytest.fail('Unknown log server backend {!r}. Available backends: tornado, asyncio'.format(backend))
+
+
 @pytest.fixture(scope='session')
-def log_server(salt_log_port):
-    log.info('Starting log server')
+def log_server(salt_log_port, _salt_log_server_backend):
+    salt_log_server = get_log_server(_salt_log_server_backend)
+    log.info('Starting %s log server', _salt_log_server_backend)
     salt_log_server(salt_log_port)
     log.info('Log Server Started')
+    # Late import
+    import pytestsalt.utils.log_ring as log_ring
+    ring_consumer = None
+    ring_dir = log_ring.get_ring_dir()
+    if ring_dir is not None:
+        ring_consumer = log_ring.RingConsumer(ring_dir)
+        log.info('Reading log records from the ring buffers in %s', ring_dir)
     # Run tests
     yield
+    if ring_consumer is not None:
+        ring_consumer.stop()
@@ -13,9 +13,17 @@ from __future__ import absolute_import
 import pytest
 
 # Import pytestsalt libs
+from pytestsalt.utils import ports
 from pytestsalt.utils import get_unused_localhost_port
 
 
+def pytest_configure(config):
+    '''
+    Hold the ports handed out by the fixtures below, if so configured
+    '''
+    ports.HOLD_PORTS = config.getini('salt_hold_ports') is True
+
+
 @pytest.fixture
 def master_publish_port():
     '''
@@ -9,10 +9,14 @@ Salt External Logging Handler
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
 import os
+import mmap
+import time
 import socket
+import struct
 import threading
 import logging
-from multiprocessing import Queue
+import functools
+import collections
 
 # Import 3rd-party libs
 import msgpack
@@ -25,12 +29,6 @@ try:
 except ImportError:
     import salt.utils
     to_unicode = salt.utils.to_unicode
-try:
-    import salt.utils.platform
-    is_darwin = salt.utils.platform.is_darwin
-except ImportError:
-    import salt.utils
-    is_darwin = salt.utils.is_darwin
 # pylint: enable=no-member,invalid-name
 
 __virtualname__ = 'pytest_log_handler'
@@ -48,6 +46,10 @@ def __virtual__():
 
 
 def setup_handlers():
+    ring_dir = __opts__.get('pytest_log_ring_dir')
+    if not ring_dir or __opts__.get('pytest_windows_guest') is True or not os.path.isdir(ring_dir):
+        ring_dir = None
+
     host_addr = __opts__.get('pytest_log_host')
     if not host_addr:
         import subprocess
@@ -65,64 +67,464 @@ def setup_handlers():
             )
             host_addr = proc.stdout.read().strip().encode(__salt_system_encoding__)
     host_port = __opts__['pytest_log_port']
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        sock.connect((host_addr, host_port))
-    except socket.error as exc:
-        # Don't even bother if we can't connect
-        log.warning('Cannot connect back to log server: %s', exc)
-        return
-    finally:
-        sock.close()
-
-    if is_darwin():
-        # The maximum for the multiprocessing queue on MacOS is 32767, so if we running on MacOS
-        # then we use that maximum.
-        queue_size = 32767
-    else:
-        # One million log messages is more than enough to queue.
-        # Above that value, if `process_queue` can't process fast enough,
-        # start dropping. This will contain a memory leak in case `process_queue`
-        # can't process fast enough of in case it can't deliver the log records at all.
-        queue_size = 10000000
+    if ring_dir is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.connect((host_addr, host_port))
+        except socket.error as exc:
+            # Don't even bother if we can't connect
+            log.warning('Cannot connect back to log server: %s', exc)
+            return
+        finally:
+            sock.close()
 
     # Late Imports Because of Salt's logging refactoring
-    from salt.log.setup import SaltLogQueueHandler, LOG_LEVELS
-    queue = Queue(queue_size)
-    handler = SaltLogQueueHandler(queue)
+    from salt.log.setup import LOG_LEVELS
+    pytest_log_prefix = os.environ.get('PYTEST_LOG_PREFIX') or __opts__['pytest_log_prefix']
+    handler = PytestLogHandler(pytest_log_prefix,
+                               (host_addr, host_port, ring_dir),
+                               __opts__.get('pytest_log_buffer_size') or BUFFER_SIZE,
+                               __opts__.get('pytest_log_overflow') or OVERFLOW)
     level = LOG_LEVELS[(__opts__.get('pytest_log_level') or 'error').lower()]
     handler.setLevel(level)
-    pytest_log_prefix = os.environ.get('PYTEST_LOG_PREFIX') or __opts__['pytest_log_prefix']
-    process_queue_thread = threading.Thread(target=process_queue,
-                                            args=(host_addr,
-                                                  host_port,
-                                                  pytest_log_prefix,
-                                                  queue))
-    process_queue_thread.daemon = True
-    process_queue_thread.start()
+    logger_levels = __opts__.get('pytest_log_levels') or {}
+    disabled_loggers = __opts__.get('pytest_log_disabled') or ()
+    if logger_levels or disabled_loggers:
+        handler.addFilter(LoggerLevelsFilter(logger_levels, disabled_loggers))
     return handler
 
 
-def process_queue(host, port, prefix, queue):
+class LoggerLevelsFilter(logging.Filter):
+    '''
+    Drop the log records which the log server would drop, before they are queued.
+
+    ``levels`` maps logger names to the level under which their log records, and
+    those of their child loggers, are dropped, and ``disabled`` the names of the
+    loggers whose log records are all dropped.
+    '''
+
+    def __init__(self, levels, disabled):
+        super(LoggerLevelsFilter, self).__init__()
+        self._levels = dict(levels)
+        self._disabled = frozenset(disabled)
+        self._cache = {}
+
+    def _level(self, name):
+        if name in self._disabled:
+            return None
+        parent_name = name
+        while parent_name:
+            if parent_name in self._levels:
+                return self._levels[parent_name]
+            parent_name = parent_name.rpartition('.')[0]
+        return self._levels.get('root', 0)
+
+    def filter(self, record):
+        try:
+            level = self._cache[record.name]
+        except KeyError:
+            level = self._cache[record.name] = self._level(record.name)
+        return level is not None and record.levelno >= level
+
+
+# The LogRecord attributes sent to the log server, the ones logging.makeLogRecord and
+# the log formatters on the other end use
+RECORD_FIELDS = (
+    'name',
+    'msg',
+    'args',
+    'levelname',
+    'levelno',
+    'pathname',
+    'filename',
+    'module',
+    'exc_text',
+    'stack_info',
+    'lineno',
+    'funcName',
+    'created',
+    'msecs',
+    'relativeCreated',
+    'thread',
+    'threadName',
+    'processName',
+    'process',
+)
+
+# The maximum number of log records sent at once
+BATCH_SIZE = 1000
+
+
+def _get_packer():
+    try:
+        return msgpack.Packer(encoding='utf-8')
+    except TypeError:
+        # msgpack >= 1.0 always encodes strings as utf-8
+        return msgpack.Packer()
+
+
+# The layout of the shared memory ring buffers the log records are written to when the
+# log server is on the same host, see pytestsalt.utils.log_ring for the reading side.
+#
+# A header, with the magic, the layout version and the capacity of the data region,
+# followed by the consumer (head) and producer (tail) positions, each in a cache line
+# of its own, and the data region. The positions only ever increase, their remainder
+# of the division by the capacity is the offset in the data region.
+# Each log record is a frame of its own, the length of the msgpack'ed record followed
+# by it, starting on an 8 bytes boundary. A frame never wraps around the end of the
+# data region, a wrap marker is written instead of a length, and the frame starts over
+# at the beginning of the data region.
+RING_MAGIC = b'PSLR'
+RING_VERSION = 1
+RING_HEADER = struct.Struct(str('<4sIQ'))
+RING_POSITION = struct.Struct(str('<Q'))
+RING_HEAD_OFFSET = 64
+RING_TAIL_OFFSET = 128
+RING_DATA_OFFSET = 192
+RING_FRAME = struct.Struct(str('<I'))
+RING_WRAP = 0xFFFFFFFF
+RING_ALIGNMENT = 8
+RING_SIZE = 8 * 1024 * 1024
+
+# How long, in seconds, to wait for the log server to make room in a full ring buffer
+RING_FULL_INTERVAL = 0.005
+
+
+def ring_frame_size(length):
+    '''
+    Return the space taken in the ring buffer by a frame of a ``length`` bytes log record
+    '''
+    return (RING_FRAME.size + length + RING_ALIGNMENT - 1) & ~(RING_ALIGNMENT - 1)
+
+
+class RingWriter(object):
+    '''
+    The producing end of a shared memory ring buffer of log records
+    '''
+
+    def __init__(self, path, capacity=RING_SIZE):
+        if capacity % RING_ALIGNMENT:
+            raise ValueError('The ring buffer capacity must be a multiple of {}'.format(RING_ALIGNMENT))
+        self.path = path
+        self.capacity = capacity
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.ftruncate(fd, RING_DATA_OFFSET + capacity)
+            self._mmap = mmap.mmap(fd, RING_DATA_OFFSET + capacity)
+        finally:
+            os.close(fd)
+        # The magic goes in last, the log server leaves the file alone until then
+        RING_HEADER.pack_into(self._mmap, 0, b'\x00' * len(RING_MAGIC), RING_VERSION, capacity)
+        RING_HEADER.pack_into(self._mmap, 0, RING_MAGIC, RING_VERSION, capacity)
+        self._head = 0
+        self._tail = 0
+
+    def _publish(self):
+        RING_POSITION.pack_into(self._mmap, RING_TAIL_OFFSET, self._tail)
+
+    def _reserve(self, size):
+        while self.capacity - (self._tail - self._head) < size:
+            self._head = RING_POSITION.unpack_from(self._mmap, RING_HEAD_OFFSET)[0]
+            if self.capacity - (self._tail - self._head) >= size:
+                break
+            # Let the log server have what's written so far, and wait for it to catch up
+            self._publish()
+            time.sleep(RING_FULL_INTERVAL)
+
+    def write(self, chunks):
+        '''
+        Write each of the msgpack'ed log records in ``chunks`` as a frame, and hand
+        them to the log server at once
+        '''
+        for chunk in chunks:
+            length = len(chunk)
+            size = ring_frame_size(length)
+            if size > self.capacity // 2:
+                log.warning('Not writing a %d bytes log record to the log records ring buffer', length)
+                continue
+            offset = self._tail % self.capacity
+            if offset + size > self.capacity:
+                skip = self.capacity - offset
+                self._reserve(skip)
+                RING_FRAME.pack_into(self._mmap, RING_DATA_OFFSET + offset, RING_WRAP)
+                self._tail += skip
+                offset = 0
+            self._reserve(size)
+            position = RING_DATA_OFFSET + offset
+            RING_FRAME.pack_into(self._mmap, position, length)
+            position += RING_FRAME.size
+            self._mmap[position:position + length] = chunk
+            self._tail += size
+        self._publish()
+
+    def close(self):
+        self._mmap.close()
+
+
+# How many log records, at most, wait to be handed to the log server in each process
+BUFFER_SIZE = 100000
+
+# What to do with a log record when the buffer is full. Drop the oldest log record,
+# drop the log records under the INFO level first, and then the oldest, or wait for
+# room in the buffer
+OVERFLOW_POLICIES = ('drop-oldest', 'drop-debug-first', 'block')
+OVERFLOW = 'drop-oldest'
+
+# How long, in seconds, to wait for the buffered log records to be handed to the log
+# server when the handler is closed
+FLUSH_TIMEOUT = 5
+
+# The buffer size and overflow policy the salt daemons started by the test suite
+# are configured with, set from the INI options. None for the defaults above
+DAEMON_BUFFER_SIZE = None
+DAEMON_OVERFLOW = None
+
+
+class RecordsBuffer(object):
+    '''
+    A bounded buffer of msgpack'ed log records, between a single producer, the
+    handler, whose calls are serialized by its lock, and a single consumer,
+    the thread handing the log records to the log server.
+
+    Adding a log record to a buffer which isn't full, does not take any lock.
+    '''
+
+    def __init__(self, size=BUFFER_SIZE, overflow=OVERFLOW):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Unknown overflow policy {!r}. Available policies: {}'.format(
+                overflow, ', '.join(OVERFLOW_POLICIES)))
+        self.size = size
+        self.overflow = overflow
+        self.dropped = 0
+        self._reported = 0
+        self._records = collections.deque()
+        self._has_debug = False
+        self._closed = False
+        # Held by the consumer while taking log records out, and by the producer
+        # while dropping others than the oldest
+        self._lock = threading.Lock()
+        self._not_empty = threading.Event()
+        self._not_full = threading.Event()
+
+    def __len__(self):
+        return len(self._records)
+
+    def _drop_debug(self):
+        with self._lock:
+            kept = [item for item in self._records if item[0] >= logging.INFO]
+            self.dropped += len(self._records) - len(kept)
+            self._records.clear()
+            self._records.extend(kept)
+        self._has_debug = False
+
+    def put(self, levelno, chunk):
+        '''
+        Add a ``levelno`` msgpack'ed log record, applying the overflow policy if
+        the buffer is full
+        '''
+        if self._closed:
+            self.dropped += 1
+            return
+        if len(self._records) >= self.size:
+            if self.overflow == 'block':
+                while len(self._records) >= self.size and not self._closed:
+                    self._not_full.clear()
+                    if len(self._records) >= self.size:
+                        self._not_full.wait()
+                if self._closed:
+                    self.dropped += 1
+                    return
+            elif self.overflow == 'drop-debug-first' and self._has_debug:
+                self._drop_debug()
+            if len(self._records) >= self.size:
+                try:
+                    self._records.popleft()
+                    self.dropped += 1
+                except IndexError:
+                    # Just emptied by the consumer
+                    pass
+        if levelno < logging.INFO:
+            self._has_debug = True
+        self._records.append((levelno, chunk))
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+
+    def get(self, max_records=BATCH_SIZE):
+        '''
+        Wait for log records, and return up to ``max_records`` of them, or an
+        empty list once the buffer is closed and empty
+        '''
+        while True:
+            chunks = []
+            with self._lock:
+                try:
+                    while len(chunks) < max_records:
+                        chunks.append(self._records.popleft()[1])
+                except IndexError:
+                    pass
+            if chunks:
+                self._not_full.set()
+                return chunks
+            if self._closed:
+                return chunks
+            self._not_empty.clear()
+            if not self._records and not self._closed:
+                self._not_empty.wait()
+
+    def take_dropped(self):
+        '''
+        Return how many log records were dropped since the last call
+        '''
+        with self._lock:
+            dropped = self.dropped - self._reported
+            self._reported += dropped
+        return dropped
+
+    def close(self, last=None):
+        '''
+        Stop taking log records, apart from ``last``, a msgpack'ed log record,
+        if passed
+        '''
+        if last is not None:
+            self._records.append((logging.WARNING, last))
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+
+class PytestLogHandler(logging.Handler):
+    '''
+    Serialize the log records, once, into a buffer, from which a thread of their
+    own hands them to the log server
+    '''
+
+    def __init__(self, prefix, address, buffer_size=BUFFER_SIZE, overflow=OVERFLOW):
+        super(PytestLogHandler, self).__init__()
+        self.prefix = '[{}] '.format(to_unicode(prefix))
+        self.address = address
+        self.buffer_size = buffer_size
+        self.overflow = overflow
+        self._packer = _get_packer()
+        self._exc_formatter = logging.Formatter()
+        self._pid = None
+        self._buffer = None
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._packer = _get_packer()
+        self._buffer = RecordsBuffer(self.buffer_size, self.overflow)
+        # Packers aren't thread safe, the thread reporting dropped log records gets its own
+        pack_dropped = functools.partial(self._pack_dropped, packer=_get_packer())
+        self._thread = threading.Thread(target=process_buffer, args=(self.address, self._buffer, pack_dropped))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _pack(self, record, packer=None):
+        record_dict = record.__dict__
+        fields = {field: record_dict[field] for field in RECORD_FIELDS if field in record_dict}
+        fields['msg'] = self.prefix + to_unicode(record.getMessage())
+        fields['args'] = None
+        if record.exc_info and not fields.get('exc_text'):
+            fields['exc_text'] = self._exc_formatter.formatException(record.exc_info)
+        return (packer or self._packer).pack(fields)
+
+    def _pack_dropped(self, count, packer=None):
+        '''
+        Return a msgpack'ed log record letting pytest know that ``count`` log records
+        were dropped
+        '''
+        record = logging.LogRecord(
+            log.name, logging.WARNING, __file__, 0,
+            '%d log records were dropped, more than %d were waiting to be sent to the '
+            'pytest log server. Overflow policy: %s',
+            (count, self.buffer_size, self.overflow), None)
+        return self._pack(record, packer)
+
+    def handle(self, record):
+        if self._thread is not None and threading.current_thread() is self._thread:
+            # The thread handing the log records to the log server never waits on the
+            # handler, which could be waiting on it. What it logs goes elsewhere.
+            return False
+        return super(PytestLogHandler, self).handle(record)
+
+    def emit(self, record):
+        if os.getpid() != self._pid:
+            # This is a forked process, the thread handing the log records to the
+            # log server was left behind
+            self._start()
+        try:
+            chunk = self._pack(record)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        self._buffer.put(record.levelno, chunk)
+
+    def close(self):
+        if self._buffer is not None and os.getpid() == self._pid:
+            last = None
+            dropped = self._buffer.take_dropped()
+            if dropped:
+                # Let pytest know what it's missing, if the thread handing the log
+                # records to the log server hasn't already
+                try:
+                    last = self._pack_dropped(dropped)
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            self._buffer.close(last)
+            self._thread.join(FLUSH_TIMEOUT)
+            self._buffer = None
+        super(PytestLogHandler, self).close()
+
+
+def _get_sender(host, port, ring_dir):
+    '''
+    Return a function handing lists of msgpack'ed log records to the log server,
+    from this process, or ``None`` if the log server cannot be reached
+    '''
+    if ring_dir is not None:
+        # The log server is on this host, and reads the log records from shared memory
+        ring_path = os.path.join(ring_dir, '{}.ring'.format(os.getpid()))
+        try:
+            ring = RingWriter(ring_path)
+        except (IOError, OSError, ValueError) as exc:
+            log.warning('Cannot create the log records ring buffer %s: %s', ring_path, exc)
+        else:
+            log.debug('Writing log records to the ring buffer %s', ring.path)
+            return ring.write
+
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         sock.connect((host, port))
     except socket.error:
         sock.close()
-        return
+        return None
+
+    def send(chunks):
+        sock.sendall(b''.join(chunks))
 
     log.debug('Sending log records to Remote log server')
+    return send
+
+
+def process_buffer(address, records_buffer, pack_dropped=None):
+    send = _get_sender(*address)
+    if send is None:
+        records_buffer.close()
+        return
     while True:
         try:
-            record = queue.get()
-            if record is None:
-                # A sentinel to stop processing the queue
+            chunks = records_buffer.get()
+            if not chunks:
                 break
-            # Just send every log. Filtering will happen on the main process
-            # logging handlers
-            record_dict = record.__dict__
-            record_dict['msg'] = '[{}] {}'.format(to_unicode(prefix), to_unicode(record_dict['msg']))
-            sock.sendall(msgpack.dumps(record_dict, encoding='utf-8'))
+            send(chunks)
+            if pack_dropped is not None:
+                dropped = records_buffer.take_dropped()
+                if dropped:
+                    # Report the dropped log records right away, a process which is
+                    # killed never gets to close the handler
+                    send([pack_dropped(dropped)])
         except (IOError, EOFError, KeyboardInterrupt, SystemExit):
             break
         except Exception as exc:  # pylint: disable=broad-except
@@ -132,3 +534,4 @@ def process_queue(host, port, prefix, queue):
                 exc,
                 exc_info_on_loglevel=logging.DEBUG
             )
+    records_buffer.close()
@@ -16,24 +16,58 @@ import time
 import errno
 import atexit
 import pprint
+import select
 import signal
 import socket
 import logging
 import subprocess
 import threading
 import weakref
+import fnmatch
+import collections
+import multiprocessing
+import datetime
 from operator import itemgetter
 from collections import namedtuple
+try:
+    import selectors
+    HAS_SELECTORS = True
+except ImportError:
+    # Python 2
+    HAS_SELECTORS = False
 
 # Import 3rd party libs
 import pytest
 import psutil
+try:
+    # pytest-tornado's gen_test drives the CLI coroutines, so prefer the
+    # same tornado it uses
+    from tornado import gen
+    from tornado import locks
+    from tornado.concurrent import Future
+    from tornado.ioloop import IOLoop
+    from tornado.iostream import PipeIOStream
+    from tornado.process import Subprocess
+except ImportError:
+    from salt.ext.tornado import gen
+    from salt.ext.tornado import locks
+    from salt.ext.tornado.concurrent import Future
+    from salt.ext.tornado.ioloop import IOLoop
+    from salt.ext.tornado.iostream import PipeIOStream
+    from salt.ext.tornado.process import Subprocess
 try:
     import setproctitle
     HAS_SETPROCTITLE = True
 except ImportError:
     HAS_SETPROCTITLE = False
 
+# Import pytest-salt libs
+from pytestsalt.utils import clients
+from pytestsalt.utils import containment
+from pytestsalt.utils import inotify
+from pytestsalt.utils import ports
+from pytestsalt.utils import zygote
+
 log = logging.getLogger(__name__)
 
 
@@ -43,15 +77,14 @@ def set_proc_title(title):
     setproctitle.setproctitle('[{}] - {}'.format(title, setproctitle.getproctitle()))
 
 
-def get_unused_localhost_port():
+def get_unused_localhost_port(hold=None):
     '''
-    Return a random unused port on localhost
+    Return an unused port on localhost, which is unique across all the processes
+    running the tests, pytest-xdist workers included.
+
+    Held ports are released once the daemon configured to use them is running.
     '''
-    usock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
-    usock.bind(('127.0.0.1', 0))
-    port = usock.getsockname()[1]
-    usock.close()
-    return port
+    return ports.get_unused_localhost_port(hold=hold)
 
 
 def collect_child_processes(pid):
@@ -110,76 +143,80 @@ def _get_cmdline(proc):
 
 
 def _terminate_process_list(process_list, kill=False, slow_stop=False):
-    log.info(
-        'Terminating process list:\n%s',
-        pprint.pformat([_get_cmdline(proc) for proc in process_list])
-    )
+    '''
+    Signal all of the processes at once, without waiting for any of them.
+
+    Processes which are already gone are removed from the list.
+    '''
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            'Terminating process list:\n%s',
+            pprint.pformat([_get_cmdline(proc) for proc in process_list])
+        )
+    log.info('%s %d processes: %s',
+             'Killing' if kill else 'Terminating',
+             len(process_list),
+             [proc.pid for proc in process_list])
     for process in process_list[:]:  # Iterate over copy of the list
-        if not psutil.pid_exists(process.pid):
-            process_list.remove(process)
-            continue
         try:
-            if not kill and process.status() == psutil.STATUS_ZOMBIE:
-                # Zombie processes will exit once child processes also exit
-                continue
             if kill:
-                log.info('Killing process(%s): %s', process.pid, _get_cmdline(process))
                 process.kill()
+            elif slow_stop:
+                # Allow coverage data to be written down to disk
+                process.send_signal(signal.SIGTERM)
             else:
-                log.info('Terminating process(%s): %s', process.pid, _get_cmdline(process))
-                try:
-                    if slow_stop:
-                        # Allow coverage data to be written down to disk
-                        process.send_signal(signal.SIGTERM)
-                        try:
-                            process.wait(2)
-                        except psutil.TimeoutExpired:
-                            if psutil.pid_exists(process.pid):
-                                continue
-                    else:
-                        process.terminate()
-                except OSError as exc:
-                    if exc.errno not in (errno.ESRCH, errno.EACCES):
-                        raise
-            if not psutil.pid_exists(process.pid):
-                process_list.remove(process)
+                process.terminate()
         except psutil.NoSuchProcess:
             process_list.remove(process)
+        except (psutil.AccessDenied, OSError) as exc:
+            if getattr(exc, 'errno', None) not in (None, errno.ESRCH, errno.EACCES, errno.EPERM):
+                raise
+
+
+# How long, in seconds, terminate_process_list() waits for all of the processes
+# to be gone after each of its steps
+TERMINATE_STEP_TIMEOUTS = (15, 10, 5)
 
 
 def terminate_process_list(process_list, kill=False, slow_stop=False):
+    '''
+    Terminate all of the processes in ``process_list``.
+
+    All processes are signaled at once and waited for collectively, and only
+    the ones still alive when the deadline is reached are signaled again, so
+    stopping takes as long as the slowest process, not the sum of all of them.
+    '''
 
     def on_process_terminated(proc):
         log.info('Process %s terminated with exit code: %s', getattr(proc, '_cmdline', proc), proc.returncode)
 
-    # Try to terminate processes with the provided kill and slow_stop parameters
-    log.info('Terminating process list. 1st step. kill: %s, slow stop: %s', kill, slow_stop)
-
     # Remove duplicates from the process list
-    seen_pids = []
+    seen_pids = set()
     start_count = len(process_list)
     for proc in process_list[:]:
         if proc.pid in seen_pids:
             process_list.remove(proc)
-        seen_pids.append(proc.pid)
+        seen_pids.add(proc.pid)
     end_count = len(process_list)
     if end_count < start_count:
         log.debug('Removed %d duplicates from the initial process list', start_count - end_count)
 
-    _terminate_process_list(process_list, kill=kill, slow_stop=slow_stop)
-    psutil.wait_procs(process_list, timeout=15, callback=on_process_terminated)
-
-    if process_list:
+    steps = (
+        # Try to terminate processes with the provided kill and slow_stop parameters
+        (kill, slow_stop),
         # If there's still processes to be terminated, retry and kill them if slow_stop is False
-        log.info('Terminating process list. 2nd step. kill: %s, slow stop: %s', slow_stop is False, slow_stop)
-        _terminate_process_list(process_list, kill=slow_stop is False, slow_stop=slow_stop)
-        psutil.wait_procs(process_list, timeout=10, callback=on_process_terminated)
-
-    if process_list:
+        (slow_stop is False, slow_stop),
         # If there's still processes to be terminated, just kill them, no slow stopping now
-        log.info('Terminating process list. 3rd step. kill: True, slow stop: False')
-        _terminate_process_list(process_list, kill=True, slow_stop=False)
-        psutil.wait_procs(process_list, timeout=5, callback=on_process_terminated)
+        (True, False),
+    )
+    for step, ((step_kill, step_slow_stop), timeout) in enumerate(zip(steps, TERMINATE_STEP_TIMEOUTS), 1):
+        if not process_list:
+            break
+        log.info('Terminating process list. Step %d. kill: %s, slow stop: %s', step, step_kill, step_slow_stop)
+        _terminate_process_list(process_list, kill=step_kill, slow_stop=step_slow_stop)
+        _, alive = psutil.wait_procs(process_list, timeout=timeout, callback=on_process_terminated)
+        # Only the stragglers are escalated
+        process_list[:] = alive
 
     if process_list:
         # In there's still processes to be terminated, log a warning about it
@@ -223,21 +260,48 @@ def start_daemon(request,
                  daemon_name=None,
                  daemon_id=None,
                  daemon_log_prefix=None,
-                 daemon_cli_script_name=None,
-                 daemon_config=None,
-                 daemon_config_dir=None,
-                 daemon_class=None,
-                 bin_dir_path=None,
-                 fail_hard=False,
-                 start_timeout=10,
-                 slow_stop=True,
-                 environ=None,
-                 cwd=None,
-                 max_attempts=3,
                  **kwargs):
     '''
     Returns a running salt daemon
     '''
+    process = _start_daemon(request,
+                            daemon_name=daemon_name,
+                            daemon_id=daemon_id,
+                            daemon_log_prefix=daemon_log_prefix,
+                            **kwargs)
+    _add_stop_daemon_finalizer(request, process, daemon_name, daemon_id, daemon_log_prefix)
+    return process
+
+
+def _add_stop_daemon_finalizer(request, process, daemon_name, daemon_id, daemon_log_prefix):
+
+    def stop_daemon():
+        log.info('[%s] Stopping pytest %s(%s)', daemon_log_prefix, daemon_name, daemon_id)
+        process.terminate()
+        log.info('[%s] pytest %s(%s) stopped', daemon_log_prefix, daemon_name, daemon_id)
+
+    request.addfinalizer(stop_daemon)
+
+
+def _start_daemon(request,
+                  daemon_name=None,
+                  daemon_id=None,
+                  daemon_log_prefix=None,
+                  daemon_cli_script_name=None,
+                  daemon_config=None,
+                  daemon_config_dir=None,
+                  daemon_class=None,
+                  bin_dir_path=None,
+                  fail_hard=False,
+                  start_timeout=10,
+                  slow_stop=True,
+                  environ=None,
+                  cwd=None,
+                  max_attempts=3,
+                  **kwargs):
+    '''
+    Returns a running salt daemon, which the caller is responsible for stopping
+    '''
     if fail_hard:
         fail_method = pytest.fail
     else:
@@ -272,7 +336,7 @@ def start_daemon(request,
                         continue
             except Exception as exc:  # pylint: disable=broad-except
                 log.exception('[%s] %s', daemon_log_prefix, exc, exc_info=True)
-                terminate_process(process.pid, kill_children=True, slow_stop=slow_stop)
+                process.terminate()
                 if attempts >= max_attempts:
                     fail_method(str(exc))
                 continue
@@ -284,20 +348,13 @@ def start_daemon(request,
                 daemon_id,
                 attempts
             )
-
-            def stop_daemon():
-                log.info('[%s] Stopping pytest %s(%s)', daemon_log_prefix, daemon_name, daemon_id)
-                terminate_process(process.pid, kill_children=True, slow_stop=slow_stop)
-                log.info('[%s] pytest %s(%s) stopped', daemon_log_prefix, daemon_name, daemon_id)
-
-            request.addfinalizer(stop_daemon)
             break
         else:
-            terminate_process(process.pid, kill_children=True, slow_stop=slow_stop)
+            process.terminate()
             continue
     else:
         if process is not None:
-            terminate_process(process.pid, kill_children=True, slow_stop=slow_stop)
+            process.terminate()
         fail_method(
             'The pytest {}({}) has failed to start after {} attempts'.format(
                 daemon_name,
@@ -308,6 +365,62 @@ def start_daemon(request,
     return process
 
 
+def start_daemons(request, daemons):
+    '''
+    Start several salt daemons concurrently.
+
+    ``daemons`` is a list of ``(name, kwargs)`` pairs, ``kwargs`` being the keyword
+    arguments to pass to :func:`start_daemon`. All of the daemons are spawned at once
+    and their running status is waited on together, so, for example, the minions
+    authenticate as soon as the master is up.
+
+    The daemons are stopped in the reverse order they are listed in, list the
+    ones the others connect to first.
+
+    Returns a dictionary mapping the names to the running daemons
+    '''
+    if hasattr(daemons, 'items'):
+        daemons = list(daemons.items())
+    # Fixture values can't be looked up from other threads, resolve them beforehand
+    try:
+        readiness = request.getfixturevalue('_salt_daemon_readiness')
+    except AttributeError:
+        readiness = request.getfuncargvalue('_salt_daemon_readiness')
+
+    processes = {}
+    errors = []
+
+    def _start(name, kwargs):
+        try:
+            processes[name] = _start_daemon(request, **kwargs)
+        except BaseException as exc:  # pylint: disable=broad-except
+            # pytest's fail and xfail exceptions included
+            errors.append(exc)
+
+    threads = []
+    for name, kwargs in daemons:
+        kwargs = dict(kwargs)
+        kwargs.setdefault('readiness', readiness)
+        thread = threading.Thread(target=_start, args=(name, kwargs))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    # Finalizers run in the reverse order they're added in, and, like the daemons
+    # which did start when others failed, are only added from this thread
+    for name, kwargs in daemons:
+        if name in processes:
+            _add_stop_daemon_finalizer(request,
+                                       processes[name],
+                                       kwargs.get('daemon_name'),
+                                       kwargs.get('daemon_id'),
+                                       kwargs.get('daemon_log_prefix'))
+    if errors:
+        raise errors[0]
+    return processes
+
+
 class SaltScriptBase(object):
     '''
     Base class for Salt CLI scripts
@@ -401,8 +514,14 @@ class SaltDaemonScriptBase(SaltScriptBase):
     Base class for Salt Daemon CLI scripts
     '''
 
+    # Probe the running status often at first, backing off for slow starting daemons
+    RUNNING_CHECK_INITIAL_INTERVAL = 0.01
+    RUNNING_CHECK_MAX_INTERVAL = 0.5
+    RUNNING_CHECK_BACKOFF_FACTOR = 1.5
+
     def __init__(self, *args, **kwargs):
         self._process_cli_output_in_thread = kwargs.pop('process_cli_output_in_thread', True)
+        self.readiness = kwargs.pop('readiness', None)
         event_listener_config_dir = kwargs.pop('event_listener_config_dir', None)
         if event_listener_config_dir and not isinstance(event_listener_config_dir, str):
             event_listener_config_dir = event_listener_config_dir.realpath().strpath
@@ -410,6 +529,10 @@ class SaltDaemonScriptBase(SaltScriptBase):
         super(SaltDaemonScriptBase, self).__init__(*args, **kwargs)
         self._running = threading.Event()
         self._connectable = threading.Event()
+        self._start_time = None
+        # How long, in seconds, the daemon took to start accepting commands
+        self.startup_time = None
+        self._container = None
 
     def is_alive(self):
         '''
@@ -429,6 +552,25 @@ class SaltDaemonScriptBase(SaltScriptBase):
         '''
         return []
 
+    def get_check_paths(self):  # pylint: disable=no-self-use
+        '''
+        Return a list of paths, which the daemon creates once running, to check against
+        when using the ``paths`` readiness strategy
+        '''
+        return []
+
+    def _get_readiness(self):
+        if self.readiness is None:
+            # Get the value of the _salt_daemon_readiness fixture
+            try:
+                self.readiness = self.request.getfixturevalue('_salt_daemon_readiness')
+            except AttributeError:
+                self.readiness = self.request.getfuncargvalue('_salt_daemon_readiness')
+        if self.readiness not in ('ports', 'paths'):
+            pytest.fail('Unknown daemon readiness strategy {!r}. Available strategies: ports, paths'.format(
+                self.readiness))
+        return self.readiness
+
     def get_salt_run_fixture(self):
         if self.request.scope == 'session':
             try:
@@ -456,6 +598,13 @@ class SaltDaemonScriptBase(SaltScriptBase):
 
         log.info('[%s][%s] Running \'%s\'...', self.log_prefix, self.cli_display_name, ' '.join(proc_args))
 
+        if self._get_readiness() == 'paths':
+            # Paths left behind by a previous run would be taken as the daemon running
+            for path in self.get_check_paths():
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        self._start_time = time.time()
         self.init_terminal(proc_args, env=self.environ, cwd=self.cwd)
         self._running.set()
         if self._process_cli_output_in_thread:
@@ -493,6 +642,22 @@ class SaltDaemonScriptBase(SaltScriptBase):
             return
         return terminal.pid
 
+    def init_terminal(self, cmdline, **kwargs):
+        '''
+        Start the daemon in its own session, and cgroup if possible, so that it can be
+        stopped together with everything it starts, without looking for its children
+        '''
+        if not containment.is_supported():
+            return super(SaltDaemonScriptBase, self).init_terminal(cmdline, **kwargs)
+        # Late import
+        import salt.utils.nb_popen as nb_popen
+        self._container = containment.ProcessContainer(self.cli_script_name)
+        kwargs.update(self._container.popen_kwargs())
+        self._terminal = nb_popen.NonBlockingPopen(cmdline, **kwargs)
+        self._container.attach(self._terminal)
+        atexit.register(self.terminate)
+        return self._terminal
+
     def terminate(self):
         '''
         Terminate the started daemon
@@ -501,7 +666,62 @@ class SaltDaemonScriptBase(SaltScriptBase):
         self._running.clear()
         self._connectable.clear()
         time.sleep(0.0125)
-        super(SaltDaemonScriptBase, self).terminate()
+        if self._container is None:
+            super(SaltDaemonScriptBase, self).terminate()
+            return
+        if self._terminal.stdout:
+            self._terminal.stdout.close()
+        if self._terminal.stderr:
+            self._terminal.stderr.close()
+        self._container.terminate(slow_stop=self.slow_stop)
+
+    def _release_held_ports(self):
+        '''
+        The daemon is running, it has bound the ports in its configuration, which
+        no longer need to be held
+        '''
+        ports.release_ports([value for key, value in self.config.items()
+                             if key.endswith('port') and isinstance(value, int)])
+
+    def _wait_until_paths_exist(self, check_paths, expire):
+        log.info(
+            '[%s][%s] Checking the following paths to assure running status: %s',
+            self.log_prefix,
+            self.cli_display_name,
+            check_paths
+        )
+        with inotify.PathsWatcher(check_paths) as watcher:
+            try:
+                while True:
+                    if self._running.is_set() is False:
+                        # No longer running, break
+                        log.warning('No longer running!')
+                        break
+
+                    # Wake up every now and then to check if the daemon is still running
+                    if not watcher.wait(min(max(expire - time.time(), 0), 0.5)):
+                        self._connectable.set()
+                        break
+
+                    if time.time() >= expire:
+                        # Timeout, break
+                        log.warning('Wait until running expired at %s(was set to %s)', time.time(), expire)
+                        break
+            except KeyboardInterrupt:
+                pass
+        if self._connectable.is_set():
+            stop_sending_events_file = self.config.get('pytest_stop_sending_events_file')
+            if stop_sending_events_file and os.path.exists(stop_sending_events_file):
+                log.info('Removing pytest_stop_sending_events_file: %s', stop_sending_events_file)
+                os.unlink(stop_sending_events_file)
+            if self._start_time is not None:
+                self.startup_time = time.time() - self._start_time
+            self._release_held_ports()
+            log.info('[%s][%s] All paths checked. Running after %.3f seconds!',
+                     self.log_prefix,
+                     self.cli_display_name,
+                     self.startup_time or 0)
+        return self._connectable.is_set()
 
     def wait_until_running(self, timeout=None):
         '''
@@ -511,6 +731,11 @@ class SaltDaemonScriptBase(SaltScriptBase):
             return True
 
         expire = time.time() + timeout
+        if self._get_readiness() == 'paths':
+            check_paths = self.get_check_paths()
+            if check_paths:
+                return self._wait_until_paths_exist(check_paths, expire)
+
         check_ports = self.get_check_ports()
         if check_ports:
             log.info(
@@ -528,59 +753,77 @@ class SaltDaemonScriptBase(SaltScriptBase):
                 check_events
             )
         log.debug('Wait until running expire: %s  Timeout: %s  Current Time: %s', expire, timeout, time.time())
-        with EventListener(self.event_listener_config_dir or self.config_dir, self.log_prefix) as event_listener:
-            try:
-                while True:
-                    if self._running.is_set() is False:
-                        # No longer running, break
-                        log.warning('No longer running!')
-                        break
+        interval = self.RUNNING_CHECK_INITIAL_INTERVAL
+        probes = 0
+        event_listener = None
+        if check_events:
+            event_listener = get_event_listener(self.event_listener_config_dir or self.config_dir, self.log_prefix)
+        try:
+            while True:
+                if self._running.is_set() is False:
+                    # No longer running, break
+                    log.warning('No longer running!')
+                    break
 
-                    if time.time() > expire:
-                        # Timeout, break
-                        log.warning('Wait until running expired at %s(was set to %s)', time.time(), expire)
-                        break
+                if time.time() >= expire:
+                    # Timeout, break
+                    log.warning('Wait until running expired at %s(was set to %s)', time.time(), expire)
+                    break
 
-                    if not check_ports and not check_events:
-                        self._connectable.set()
-                        break
+                if not check_ports and not check_events:
+                    self._connectable.set()
+                    break
 
-                    if check_events:
-                        for tag in event_listener.wait_for_events(check_events, timeout=timeout - 0.5):
-                            check_events.remove(tag)
-
-                    if not check_events:
-                        stop_sending_events_file = self.config.get('pytest_stop_sending_events_file')
-                        if stop_sending_events_file and os.path.exists(stop_sending_events_file):
-                            log.info('Removing pytest_stop_sending_events_file: %s', stop_sending_events_file)
-                            os.unlink(stop_sending_events_file)
-
-                    for port in set(check_ports):
-                        if isinstance(port, int):
-                            log.debug('[%s][%s] Checking connectable status on port: %s',
-                                      self.log_prefix,
-                                      self.cli_display_name,
-                                      port)
-                            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                            conn = sock.connect_ex(('localhost', port))
-                            try:
-                                if conn == 0:
-                                    log.debug('[%s][%s] Port %s is connectable!',
-                                              self.log_prefix,
-                                              self.cli_display_name,
-                                              port)
-                                    check_ports.remove(port)
-                                    sock.shutdown(socket.SHUT_RDWR)
-                            except socket.error:
-                                continue
-                            finally:
-                                sock.close()
-                                del sock
-                    time.sleep(0.5)
-            except KeyboardInterrupt:
-                pass
+                probes += 1
+                if check_events:
+                    for tag in event_listener.wait_for_events(check_events,
+                                                              timeout=max(expire - time.time(), 0),
+                                                              since=self._start_time):
+                        check_events.remove(tag)
+
+                if not check_events:
+                    stop_sending_events_file = self.config.get('pytest_stop_sending_events_file')
+                    if stop_sending_events_file and os.path.exists(stop_sending_events_file):
+                        log.info('Removing pytest_stop_sending_events_file: %s', stop_sending_events_file)
+                        os.unlink(stop_sending_events_file)
+
+                for port in set(check_ports):
+                    if isinstance(port, int):
+                        log.debug('[%s][%s] Checking connectable status on port: %s',
+                                  self.log_prefix,
+                                  self.cli_display_name,
+                                  port)
+                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                        conn = sock.connect_ex(('localhost', port))
+                        try:
+                            if conn == 0:
+                                log.debug('[%s][%s] Port %s is connectable!',
+                                          self.log_prefix,
+                                          self.cli_display_name,
+                                          port)
+                                check_ports.remove(port)
+                                sock.shutdown(socket.SHUT_RDWR)
+                        except socket.error:
+                            continue
+                        finally:
+                            sock.close()
+                            del sock
+                if not check_ports and not check_events:
+                    self._connectable.set()
+                    break
+                time.sleep(min(interval, max(expire - time.time(), 0)))
+                interval = min(interval * self.RUNNING_CHECK_BACKOFF_FACTOR, self.RUNNING_CHECK_MAX_INTERVAL)
+        except KeyboardInterrupt:
+            pass
         if self._connectable.is_set():
-            log.info('[%s][%s] All ports checked. Running!', self.log_prefix, self.cli_display_name)
+            if self._start_time is not None:
+                self.startup_time = time.time() - self._start_time
+            self._release_held_ports()
+            log.info('[%s][%s] All ports checked. Running after %.3f seconds and %d probes!',
+                     self.log_prefix,
+                     self.cli_display_name,
+                     self.startup_time or 0,
+                     probes)
         return self._connectable.is_set()
 
 
@@ -612,6 +855,145 @@ class ShellResult(namedtuple('Result', ('exitcode', 'stdout', 'stderr', 'json'))
         return self.stdout == other
 
 
+class SaltCliTimeoutError(Exception):
+    '''
+    Raised by the CLI coroutines when a command times out.
+
+    pytest's ``fail`` and ``xfail`` raise exceptions which do not inherit from
+    ``Exception`` and which tornado's coroutines therefore don't propagate.
+    ``fail_method`` is the pytest function to call once out of the event loop.
+    '''
+
+    def __init__(self, message, fail_method):
+        super(SaltCliTimeoutError, self).__init__(message)
+        self.fail_method = fail_method
+
+    def fail(self):
+        self.fail_method(str(self))
+
+
+class ProcessOutputPump(object):
+    '''
+    Consume the stdout and stderr pipes of a started terminal.
+
+    Instead of spinning on the non blocking reads of the terminal, this blocks
+    until either of the pipes is readable or the timeout expires, and reads
+    large chunks from them at a time.
+    '''
+
+    READ_CHUNK_SIZE = 65536
+    WINDOWS_POLL_INTERVAL = 0.01
+
+    def __init__(self, terminal, chunk_size=READ_CHUNK_SIZE):
+        self.terminal = terminal
+        self.chunk_size = chunk_size
+        self.stdout = bytearray()
+        self.stderr = bytearray()
+
+    def run(self, timeout_expire):
+        '''
+        Consume the output until both pipes are closed.
+
+        Returns ``True`` if the pipes were consumed until EOF or ``False``
+        if ``timeout_expire`` was reached first.
+        '''
+        buffers = {}
+        for stream, buf in ((self.terminal.stdout, self.stdout),
+                            (self.terminal.stderr, self.stderr)):
+            if stream is not None:
+                buffers[stream.fileno()] = buf
+        if sys.platform.startswith('win'):
+            return self._run_windows(timeout_expire)
+        if HAS_SELECTORS:
+            return self._run_selector(buffers, timeout_expire)
+        return self._run_select(buffers, timeout_expire)
+
+    def _read(self, fd, buffers):
+        try:
+            chunk = os.read(fd, self.chunk_size)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EINTR):
+                return True
+            chunk = None
+        if not chunk:
+            # EOF
+            buffers.pop(fd)
+            return False
+        buffers[fd].extend(chunk)
+        return True
+
+    def _run_selector(self, buffers, timeout_expire):
+        selector = selectors.DefaultSelector()
+        try:
+            for fd in buffers:
+                selector.register(fd, selectors.EVENT_READ)
+            while buffers:
+                timeout = timeout_expire - time.time()
+                if timeout <= 0:
+                    return False
+                for key, _ in selector.select(timeout):
+                    if not self._read(key.fd, buffers):
+                        selector.unregister(key.fd)
+            return True
+        finally:
+            selector.close()
+
+    def _run_select(self, buffers, timeout_expire):
+        while buffers:
+            timeout = timeout_expire - time.time()
+            if timeout <= 0:
+                return False
+            try:
+                readable, _, _ = select.select(list(buffers), [], [], timeout)
+            except select.error as exc:
+                if exc.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in readable:
+                self._read(fd, buffers)
+        return True
+
+    def _run_windows(self, timeout_expire):
+        # Windows pipes can't be waited on with select, rely on the
+        # terminal's own non blocking reads, but don't spin on them
+        out = err = ''
+        while out is not None or err is not None:
+            if timeout_expire < time.time():
+                return False
+            out = err = None
+            if self.terminal.stdout is not None:
+                try:
+                    out = self.terminal.recv(self.chunk_size)
+                except IOError:
+                    out = ''
+                if out:
+                    self.stdout.extend(out)
+            if self.terminal.stderr is not None:
+                try:
+                    err = self.terminal.recv_err(self.chunk_size)
+                except IOError:
+                    err = ''
+                if err:
+                    self.stderr.extend(err)
+            if not out and not err:
+                time.sleep(self.WINDOWS_POLL_INTERVAL)
+        return True
+
+    def wait(self, timeout_expire):
+        '''
+        Wait for the terminal to exit after its pipes have been closed.
+
+        Returns ``False`` if ``timeout_expire`` was reached first.
+        '''
+        interval = 0.001
+        while self.terminal.poll() is None:
+            if timeout_expire < time.time():
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, 0.05)
+        return True
+
+
 class SaltCliScriptBase(SaltScriptBase):
     '''
     Base class which runs Salt's non daemon CLI scripts
@@ -619,9 +1001,22 @@ class SaltCliScriptBase(SaltScriptBase):
 
     DEFAULT_TIMEOUT = 25
 
+    # The name of the configuration file a zygote should pre-load. Scripts
+    # which don't set it always execute the CLI script.
+    zygote_config_name = None
+
+    # Besides 'cli', the backends which can run the script's commands, mapped
+    # to the pytestsalt.utils.clients worker class implementing them
+    client_backends = {}
+    # The fixture which selects the backend when one is not explicitly passed
+    backend_fixture_name = None
+
     def __init__(self, *args, **kwargs):
         self.default_timeout = kwargs.pop('default_timeout', self.DEFAULT_TIMEOUT)
+        self.use_zygote = kwargs.pop('use_zygote', None)
+        self.backend = kwargs.pop('backend', None)
         super(SaltCliScriptBase, self).__init__(*args, **kwargs)
+        self._client_worker = None
 
     def get_base_script_args(self):
         return SaltScriptBase.get_base_script_args(self) + ['--out=json']
@@ -629,13 +1024,7 @@ class SaltCliScriptBase(SaltScriptBase):
     def get_minion_tgt(self, **kwargs):
         return kwargs.pop('minion_tgt', None)
 
-    def run(self, *args, **kwargs):
-        '''
-        Run the given command synchronously
-        '''
-        # Late import
-        import salt.ext.six as six
-        timeout = kwargs.get('timeout', self.default_timeout)
+    def _get_fail_method(self, kwargs):
         if 'fail_hard' in kwargs:
             # Explicit fail_hard passed
             fail_hard = kwargs.pop('fail_hard')
@@ -645,16 +1034,12 @@ class SaltCliScriptBase(SaltScriptBase):
                 fail_hard = self.request.getfixturevalue('_salt_fail_hard')
             except AttributeError:
                 fail_hard = self.request.getfuncargvalue('_salt_fail_hard')
-        if fail_hard is True:
-            fail_method = pytest.fail
-        else:
-            fail_method = pytest.xfail
         log.info('The fail hard setting for %s is: %s', self.cli_script_name, fail_hard)
-        minion_tgt = self.get_minion_tgt(**kwargs)
-        timeout_expire = time.time() + kwargs.pop('timeout', self.default_timeout)
-        environ = self.environ.copy()
-        environ['PYTEST_LOG_PREFIX'] = '[{}] '.format(self.log_prefix)
-        environ['PYTHONUNBUFFERED'] = '1'
+        if fail_hard is True:
+            return pytest.fail
+        return pytest.xfail
+
+    def _get_run_cmdline(self, minion_tgt, args, kwargs):
         proc_args = [
             self.get_script_path(self.cli_script_name)
         ] + self.get_base_script_args() + self.get_script_args()
@@ -668,67 +1053,290 @@ class SaltCliScriptBase(SaltScriptBase):
         proc_args.extend(list(args))
         for key in kwargs:
             proc_args.append('{}={}'.format(key, kwargs[key]))
+        return proc_args
 
-        log.info('[%s][%s] Running \'%s\' in CWD: %s ...',
-                 self.log_prefix, self.cli_display_name, ' '.join(proc_args), self.cwd)
+    def _get_use_zygote(self):
+        if self.zygote_config_name is None or not zygote.is_supported():
+            return False
+        if self.use_zygote is None:
+            # Get the value of the _salt_cli_zygote fixture
+            try:
+                self.use_zygote = self.request.getfixturevalue('_salt_cli_zygote')
+            except AttributeError:
+                self.use_zygote = self.request.getfuncargvalue('_salt_cli_zygote')
+        return self.use_zygote is True
 
-        terminal = self.init_terminal(proc_args,
-                                      cwd=self.cwd,
-                                      env=environ,
-                                      stdout=subprocess.PIPE,
-                                      stderr=subprocess.PIPE)
+    def _spawn_from_zygote(self, cmdline, env):
+        cli_zygote = zygote.get_zygote(cmdline[0],
+                                       env,
+                                       self.cwd,
+                                       config_file=os.path.join(self.config_dir, self.zygote_config_name))
+        return cli_zygote.spawn(cmdline, env, self.cwd)
 
-        # Consume the output
-        stdout = six.b('')
-        stderr = six.b('')
+    def init_zygote_terminal(self, cmdline, env):
+        '''
+        Same as :meth:`init_terminal` but forks the command from a zygote
+        pre-loaded with the CLI script and its configuration
+        '''
+        self._terminal = self._spawn_from_zygote(cmdline, env)
+        self._children = collect_child_processes(self._terminal.pid)
+        atexit.register(self.terminate)
+        return self._terminal
 
+    def _get_backend(self, args):
+        if not self.client_backends:
+            return 'cli'
+        if self.backend is None:
+            # Get the value of the backend fixture
+            try:
+                self.backend = self.request.getfixturevalue(self.backend_fixture_name)
+            except AttributeError:
+                self.backend = self.request.getfuncargvalue(self.backend_fixture_name)
+        if self.backend == 'cli':
+            return 'cli'
+        if self.backend not in self.client_backends:
+            pytest.fail('Unknown {} backend {!r}. Available backends: {}'.format(
+                self.cli_display_name, self.backend, ', '.join(['cli'] + sorted(self.client_backends))))
+        if any(str(arg).startswith('-') for arg in args):
+            # CLI flags need the CLI
+            return 'cli'
+        return self.backend
+
+    def _get_client_worker(self, backend):
+        worker_class = self.client_backends[backend]
+        if not isinstance(self._client_worker, worker_class):
+            if self._client_worker is not None:
+                self._client_worker.terminate()
+            self._client_worker = worker_class(self.config_dir, self.log_prefix)
+            self.request.addfinalizer(self._client_worker.terminate)
+        return self._client_worker
+
+    def _run_client(self, backend, fail_method, minion_tgt, args, kwargs, timeout):
+        call_args = list(args)
+        for key in kwargs:
+            call_args.append('{}={}'.format(key, kwargs[key]))
+        log.info('[%s][%s] Running %r through the %s backend ...',
+                 self.log_prefix, self.cli_display_name, call_args, backend)
         try:
-            while True:
-                # We're not actually interested in processing the output, just consume it
-                if terminal.stdout is not None:
-                    try:
-                        out = terminal.recv(4096)
-                    except IOError:
-                        out = six.b('')
-                    if out:
-                        stdout += out
-                if terminal.stderr is not None:
-                    try:
-                        err = terminal.recv_err(4096)
-                    except IOError:
-                        err = ''
-                    if err:
-                        stderr += err
-                if out is None and err is None:
-                    break
-                if timeout_expire < time.time():
-                    self.terminate()
-                    fail_method(
-                        '[{}][{}] Failed to run: args: {!r}; kwargs: {!r}; Error: {}'.format(
-                            self.log_prefix,
-                            self.cli_display_name,
-                            args,
-                            kwargs,
-                            '[{}][{}] Timed out after {} seconds!'.format(self.log_prefix,
-                                                                          self.cli_display_name,
-                                                                          timeout)
-                        )
-                    )
-        except (SystemExit, KeyboardInterrupt):
-            pass
-        finally:
-            self.terminate()
+            exitcode, stdout, stderr, json_out = self._get_client_worker(backend).run(minion_tgt,
+                                                                                      call_args,
+                                                                                      timeout)
+        except clients.ClientWorkerTimeout:
+            raise SaltCliTimeoutError(self._get_timeout_message(args, kwargs, timeout), fail_method)
+        return ShellResult(exitcode, stdout, stderr, json_out)
+
+    def _run_client_in_thread(self, *args):
+        future = Future()
+        io_loop = IOLoop.current()
+
+        def _run():
+            try:
+                result = self._run_client(*args)
+            except Exception as exc:  # pylint: disable=broad-except
+                io_loop.add_callback(future.set_exception, exc)
+            else:
+                io_loop.add_callback(future.set_result, result)
+
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def _get_run_environ(self):
+        environ = self.environ.copy()
+        environ['PYTEST_LOG_PREFIX'] = '[{}] '.format(self.log_prefix)
+        environ['PYTHONUNBUFFERED'] = '1'
+        return environ
+
+    def _get_timeout_message(self, args, kwargs, timeout):
+        return '[{}][{}] Failed to run: args: {!r}; kwargs: {!r}; Error: {}'.format(
+            self.log_prefix,
+            self.cli_display_name,
+            args,
+            kwargs,
+            '[{}][{}] Timed out after {} seconds!'.format(self.log_prefix,
+                                                          self.cli_display_name,
+                                                          timeout)
+        )
 
+    def _get_shell_result(self, exitcode, minion_tgt, stdout, stderr, proc_args):
+        # Late import
+        import salt.ext.six as six
         if six.PY3:
             # pylint: disable=undefined-variable
             stdout = stdout.decode(__salt_system_encoding__)
             stderr = stderr.decode(__salt_system_encoding__)
             # pylint: enable=undefined-variable
 
-        exitcode = terminal.returncode
         stdout, stderr, json_out = self.process_output(minion_tgt, stdout, stderr, cli_cmd=proc_args)
         return ShellResult(exitcode, stdout, stderr, json_out)
 
+    @gen.coroutine
+    def _communicate(self, stdout_stream, stderr_stream, proc):  # pylint: disable=no-self-use
+        stdout, stderr = yield [stdout_stream.read_until_close(),
+                                stderr_stream.read_until_close()]
+        # Subprocess.wait_for_exit() binds SIGCHLD handling to the first IOLoop
+        # which used it, and each test may run its own loop, so just poll the
+        # process, which has closed its pipes and is about to exit
+        interval = 0.001
+        while proc.poll() is None:
+            yield gen.sleep(interval)
+            interval = min(interval * 2, 0.05)
+        raise gen.Return((stdout, stderr, proc.returncode))
+
+    @gen.coroutine
+    def run(self, *args, **kwargs):
+        '''
+        Run the given command asynchronously.
+
+        Returns a future which resolves to a :class:`ShellResult`, allowing
+        several commands to run concurrently on the same event loop.
+        On timeout, the future raises :class:`SaltCliTimeoutError`.
+        '''
+        if sys.platform.startswith('win'):
+            # Tornado's Subprocess does not support windows
+            raise gen.Return(self.run_sync(*args, **kwargs))
+
+        fail_method = self._get_fail_method(kwargs)
+        minion_tgt = self.get_minion_tgt(**kwargs)
+        timeout = kwargs.pop('timeout', self.default_timeout)
+        backend = self._get_backend(args)
+        if backend != 'cli':
+            result = yield self._run_client_in_thread(backend, fail_method, minion_tgt, args, kwargs, timeout)
+            raise gen.Return(result)
+        proc_args = self._get_run_cmdline(minion_tgt, args, kwargs)
+
+        log.info('[%s][%s] Running \'%s\' in CWD: %s ...',
+                 self.log_prefix, self.cli_display_name, ' '.join(proc_args), self.cwd)
+
+        if self._get_use_zygote():
+            proc = popen = self._spawn_from_zygote(proc_args, self._get_run_environ())
+            # The streams take ownership of the file descriptors they're passed
+            stdout_stream = PipeIOStream(os.dup(proc.stdout.fileno()))
+            stderr_stream = PipeIOStream(os.dup(proc.stderr.fileno()))
+            proc.stdout.close()
+            proc.stderr.close()
+        else:
+            proc = Subprocess(proc_args,
+                              cwd=self.cwd,
+                              env=self._get_run_environ(),
+                              stdout=Subprocess.STREAM,
+                              stderr=Subprocess.STREAM)
+            stdout_stream, stderr_stream, popen = proc.stdout, proc.stderr, proc.proc
+        children = collect_child_processes(proc.pid)
+        try:
+            stdout, stderr, exitcode = yield gen.with_timeout(
+                datetime.timedelta(seconds=timeout),
+                self._communicate(stdout_stream, stderr_stream, popen)
+            )
+        except gen.TimeoutError:
+            stdout_stream.close()
+            stderr_stream.close()
+            terminate_process(pid=proc.pid, children=children, kill_children=True, slow_stop=False)
+            raise SaltCliTimeoutError(self._get_timeout_message(args, kwargs, timeout), fail_method)
+
+        # Lets kill any child processes which salt left behind
+        terminate_process(pid=proc.pid, children=children, kill_children=True, slow_stop=self.slow_stop)
+
+        raise gen.Return(self._get_shell_result(exitcode, minion_tgt, stdout, stderr, proc_args))
+
+    @gen.coroutine
+    def run_many_async(self, calls, concurrency=None, callback=None):
+        '''
+        Coroutine version of :meth:`run_many`
+        '''
+        if concurrency is None:
+            concurrency = multiprocessing.cpu_count()
+        calls = list(calls)
+        semaphore = locks.Semaphore(concurrency)
+        results = [None] * len(calls)
+        errors = []
+
+        @gen.coroutine
+        def _run(index, args, kwargs):
+            with (yield semaphore.acquire()):
+                try:
+                    result = yield self.run(*args, **kwargs)
+                except SaltCliTimeoutError as exc:
+                    # Let the remaining calls finish before failing
+                    errors.append(exc)
+                    return
+            results[index] = result
+            if callback is not None:
+                callback(index, result)
+
+        yield [_run(index, args, dict(kwargs)) for (index, (args, kwargs)) in enumerate(calls)]
+        if errors:
+            raise errors[0]
+        raise gen.Return(results)
+
+    def run_many(self, calls, concurrency=None, callback=None):
+        '''
+        Run several commands concurrently.
+
+        ``calls`` is an iterable of ``(args, kwargs)`` tuples, each of them
+        passed to :meth:`run`, so every call honours its own ``timeout``.
+        At most ``concurrency`` commands, which defaults to the number of CPUs,
+        run at the same time. ``callback``, if passed, is called with the call
+        index and its :class:`ShellResult` as soon as each command finishes.
+
+        Returns the list of :class:`ShellResult` in the same order as ``calls``.
+        '''
+        io_loop = IOLoop()
+        try:
+            return io_loop.run_sync(lambda: self.run_many_async(calls,
+                                                                concurrency=concurrency,
+                                                                callback=callback))
+        except SaltCliTimeoutError as exc:
+            exc.fail()
+        finally:
+            io_loop.close()
+
+    def run_sync(self, *args, **kwargs):
+        '''
+        Run the given command synchronously
+        '''
+        timeout = kwargs.get('timeout', self.default_timeout)
+        fail_method = self._get_fail_method(kwargs)
+        minion_tgt = self.get_minion_tgt(**kwargs)
+        timeout_expire = time.time() + kwargs.pop('timeout', self.default_timeout)
+        backend = self._get_backend(args)
+        if backend != 'cli':
+            try:
+                return self._run_client(backend, fail_method, minion_tgt, args, kwargs, timeout)
+            except SaltCliTimeoutError as exc:
+                exc.fail()
+        proc_args = self._get_run_cmdline(minion_tgt, args, kwargs)
+
+        log.info('[%s][%s] Running \'%s\' in CWD: %s ...',
+                 self.log_prefix, self.cli_display_name, ' '.join(proc_args), self.cwd)
+
+        if self._get_use_zygote():
+            terminal = self.init_zygote_terminal(proc_args, self._get_run_environ())
+        else:
+            terminal = self.init_terminal(proc_args,
+                                          cwd=self.cwd,
+                                          env=self._get_run_environ(),
+                                          stdout=subprocess.PIPE,
+                                          stderr=subprocess.PIPE)
+
+        # Consume the output
+        pump = ProcessOutputPump(terminal)
+        try:
+            if not pump.run(timeout_expire) or not pump.wait(timeout_expire):
+                self.terminate()
+                fail_method(self._get_timeout_message(args, kwargs, timeout))
+        except (SystemExit, KeyboardInterrupt):
+            pass
+        finally:
+            self.terminate()
+
+        return self._get_shell_result(terminal.returncode,
+                                      minion_tgt,
+                                      bytes(pump.stdout),
+                                      bytes(pump.stderr),
+                                      proc_args)
+
     def process_output(self, tgt, stdout, stderr, cli_cmd=None):
         if stdout:
             try:
@@ -745,81 +1353,296 @@ class SaltCliScriptBase(SaltScriptBase):
 
 
 class EventListener(object):
+    '''
+    Listen to a salt master's event bus.
+
+    A single subscription is made to the event bus, read from a background
+    thread, and the events are dispatched to whoever is waiting for them.
+    The most recent events are also kept around, so that waiting for events
+    which were fired before starting to wait is possible.
+    '''
 
     DEFAULT_TIMEOUT = 60
+    HISTORY_SIZE = 1000
+    # How long each read from the event bus blocks, and therefore, how long stopping can take
+    GET_EVENT_WAIT = 0.1
+    # Only the first events, and then one in every EVENT_LOG_SAMPLE_RATE events, are logged
+    EVENT_LOG_SAMPLE_FIRST = 10
+    EVENT_LOG_SAMPLE_RATE = 100
 
     def __init__(self, config_dir, log_prefix):
-        # Late import
         self.config_dir = config_dir
         self.log_prefix = '[{}][PyTestEventListener]'.format(log_prefix)
-        self._listener = None
+        self._lock = threading.Lock()
+        # Held for the whole of start(), so no caller returns before the subscription is made
+        self._start_lock = threading.Lock()
+        # Patterns being waited for -> waiters
+        self._waiters = EventMatcher()
+        self._event_count = 0
+        # (time received, event) tuples
+        self._history = collections.deque(maxlen=self.HISTORY_SIZE)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        '''
+        Subscribe to the event bus and start dispatching its events
+        '''
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            started = threading.Event()
+            errors = []
+            self._stop.clear()
+            thread = threading.Thread(target=self._run, args=(started, errors))
+            thread.daemon = True
+            thread.start()
+            started.wait()
+            if errors:
+                thread.join()
+                raise errors[0]
+            self._thread = thread
+        atexit.register(self.terminate)
 
-    def wait_for_events(self, check_events, timeout=None):
+    def _run(self, started, errors):
+        try:
+            # Late import
+            import salt.config
+            import salt.utils.event
+            opts = salt.config.master_config(os.path.join(self.config_dir, 'master'))
+            listener = salt.utils.event.get_event('master', opts=opts, listen=True)
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+            return
+        finally:
+            started.set()
+        try:
+            while not self._stop.is_set():
+                event = listener.get_event(full=True, wait=self.GET_EVENT_WAIT, auto_reconnect=True)
+                if event is None:
+                    continue
+                self._event_count += 1
+                if self._event_count <= self.EVENT_LOG_SAMPLE_FIRST or \
+                        self._event_count % self.EVENT_LOG_SAMPLE_RATE == 0:
+                    log.debug('%s Got event #%d: %s', self.log_prefix, self._event_count, event)
+                self._dispatch(event)
+        finally:
+            listener.destroy()
+
+    def _dispatch(self, event):
+        with self._lock:
+            self._history.append((time.time(), event))
+            for pattern, waiter in self._waiters.match(event['tag']):
+                log.debug('%s Event %s matched %r', self.log_prefix, event['tag'], pattern)
+                if waiter.match(pattern, event):
+                    self._remove_waiter(waiter)
+
+    def _remove_waiter(self, waiter):
+        for pattern in waiter.patterns:
+            self._waiters.remove(pattern, waiter)
+
+    def wait_for_events(self, check_events, timeout=None, since=None):
+        '''
+        Wait for the events matching the ``check_events`` patterns.
+
+        A pattern is either an exact tag, a glob like ``salt/job/*/ret/minion``,
+        or a compiled regular expression. Events received after ``since``, a
+        timestamp which defaults to now, are taken into account.
+
+        Returns a dictionary mapping the patterns which were matched to the
+        first event, ``tag`` and ``data``, which matched them.
+        '''
         if timeout is None:
             timeout = self.DEFAULT_TIMEOUT
+        if since is None:
+            since = time.time()
         log.info('%s waiting %s seconds for events: %s',
                  self.log_prefix,
                  timeout,
                  check_events)
-        matched_events = set()
-        events_to_match = set(check_events)
-        events_processed = 0
-        max_timeout = time.time() + timeout
-        last_log = 0
-        log_freq = 10
-        while True:
-            if not events_to_match:
+        self.start()
+        waiter = _EventWaiter(check_events)
+        with self._lock:
+            if not waiter.done.is_set():
+                history_matcher = EventMatcher()
+                for pattern in waiter.patterns:
+                    history_matcher.add(pattern, waiter)
+                for received, event in self._history:
+                    if received < since:
+                        continue
+                    for pattern, _ in history_matcher.match(event['tag']):
+                        waiter.match(pattern, event)
+            if not waiter.done.is_set():
+                for pattern in waiter.patterns:
+                    self._waiters.add(pattern, waiter)
+        try:
+            if waiter.done.wait(timeout):
                 log.info('%s ALL EVENT TAGS FOUND!!!', self.log_prefix)
-                return matched_events
-
-            if time.time() > max_timeout:
+            else:
                 log.warning(
-                    '%s Failed to find all of the required event tags(%s). '
-                    'Total events processed: %s. Total events found: %s.',
+                    '%s Failed to find all of the required event tags(%s). Total events found: %s.',
                     self.log_prefix,
                     check_events,
-                    events_processed,
-                    len(matched_events)
+                    len(waiter.matched)
                 )
-                return matched_events
-
-            event = self._listener.get_event(full=True, auto_reconnect=True)
-            if event is None:
-                continue
-
-            tag = event['tag']
-            log.info('Got event: %s', event)
-            if tag in events_to_match:
-                matched_events.add(tag)
-                events_to_match.remove(tag)
-
-            events_processed += 1
-            if time.time() - last_log > log_freq:
-                log.debug('%s Events processed so far: %d',
-                          self.log_prefix,
-                          events_processed)
-                last_log = time.time()
+        finally:
+            with self._lock:
+                self._remove_waiter(waiter)
+        return waiter.matched
 
     def terminate(self):
-        if self._listener is not None:
-            listener = self._listener
-            self._listener = None
-            listener.destroy()
+        with self._start_lock:
+            if self._thread is not None:
+                thread = self._thread
+                self._thread = None
+                self._stop.set()
+                thread.join()
 
     def __enter__(self):
-        if self._listener is None:
-            # Late import
-            import salt.config
-            import salt.utils.event
-            opts = salt.config.master_config(os.path.join(self.config_dir, 'master'))
-            self._listener = salt.utils.event.get_event('master', opts=opts, listen=True)
-            atexit.register(self.terminate)
+        self.start()
         return self
 
     def __exit__(self, *args):
         self.terminate()
 
 
+class EventMatcher(object):
+    '''
+    Index of event tag patterns, each associated to a value.
+
+    Exact tags are looked up in a dictionary. Globs and regular expressions are
+    stored in a prefix trie under their literal prefix, so only the patterns
+    sharing a prefix with a tag are tried against it.
+    '''
+
+    GLOB_CHARS = re.compile(r'[*?\[]')
+
+    def __init__(self):
+        # Exact tag -> values
+        self._exact = {}
+        # Nested dictionaries keyed by character, the None key holding the
+        # (pattern, regex, value) entries whose literal prefix ends there
+        self._trie = {}
+
+    @classmethod
+    def _compile(cls, pattern):
+        '''
+        Return the literal prefix and the regex to match a pattern, the regex being
+        ``None`` for exact tags
+        '''
+        if hasattr(pattern, 'match'):
+            # An already compiled regular expression
+            return '', pattern
+        glob = cls.GLOB_CHARS.search(pattern)
+        if glob is None:
+            return pattern, None
+        return pattern[:glob.start()], re.compile(fnmatch.translate(pattern))
+
+    def add(self, pattern, value):
+        prefix, regex = self._compile(pattern)
+        if regex is None:
+            self._exact.setdefault(prefix, []).append(value)
+        else:
+            node = self._trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append((pattern, regex, value))
+
+    def remove(self, pattern, value):
+        prefix, regex = self._compile(pattern)
+        if regex is None:
+            values = self._exact.get(prefix, [])
+            if value in values:
+                values.remove(value)
+            if not values:
+                self._exact.pop(prefix, None)
+            return
+        path = [self._trie]
+        for char in prefix:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        entries = path[-1].get(None, [])
+        for entry in entries:
+            if entry[0] == pattern and entry[2] is value:
+                entries.remove(entry)
+                break
+        if not entries:
+            path[-1].pop(None, None)
+        # Prune the branches which no longer lead to any pattern
+        for char, node in zip(reversed(prefix), reversed(path[:-1])):
+            if node[char]:
+                break
+            del node[char]
+
+    def match(self, tag):
+        '''
+        Return the ``(pattern, value)`` pairs matching ``tag``
+        '''
+        matches = [(tag, value) for value in self._exact.get(tag, ())]
+        node = self._trie
+        for char in tag + '\0':
+            for pattern, regex, value in node.get(None, ()):
+                if regex.match(tag):
+                    matches.append((pattern, value))
+            node = node.get(char)
+            if node is None:
+                break
+        return matches
+
+
+class _EventWaiter(object):
+    '''
+    Tracks the patterns one call to :meth:`EventListener.wait_for_events` waits for
+    '''
+
+    def __init__(self, patterns):
+        self.patterns = frozenset(patterns)
+        self.matched = {}
+        self.done = threading.Event()
+        if not self.patterns:
+            self.done.set()
+
+    def match(self, pattern, event):
+        '''
+        Record the event matching ``pattern`` and return ``True`` once all patterns matched
+        '''
+        if pattern not in self.matched:
+            self.matched[pattern] = event
+            if len(self.matched) == len(self.patterns):
+                self.done.set()
+        return self.done.is_set()
+
+
+_EVENT_LISTENERS = {}
+_EVENT_LISTENERS_LOCK = threading.Lock()
+
+
+def get_event_listener(config_dir, log_prefix):
+    '''
+    Return the running event listener shared by everything listening to the
+    events of the master configured in ``config_dir``
+    '''
+    with _EVENT_LISTENERS_LOCK:
+        event_listener = _EVENT_LISTENERS.get(config_dir)
+        if event_listener is None:
+            event_listener = _EVENT_LISTENERS[config_dir] = EventListener(config_dir, log_prefix)
+    event_listener.start()
+    return event_listener
+
+
+def terminate_event_listener(config_dir):
+    '''
+    Terminate the shared event listener of the master configured in ``config_dir``
+    '''
+    with _EVENT_LISTENERS_LOCK:
+        event_listener = _EVENT_LISTENERS.pop(config_dir, None)
+    if event_listener is not None:
+        event_listener.terminate()
+
+
 @pytest.mark.trylast
 def pytest_configure(config):
     pytest.helpers.utils.register(get_unused_localhost_port)
+    pytest.helpers.utils.register(start_daemons)
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.clients
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Run salt commands through salt's python clients instead of its CLI scripts.
+
+Each client lives in a worker process, which loads the configuration and the
+client once, and then serves every call made through it, returning the same
+exit code, output and parsed JSON the CLI scripts would.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import json
+import logging
+import threading
+import traceback
+import multiprocessing
+
+log = logging.getLogger(__name__)
+
+
+class ClientWorkerTimeout(Exception):
+    '''
+    Raised when a call to a client worker times out
+    '''
+
+
+def _worker_main(worker_class, config_file, conn):
+    try:
+        client = worker_class.load_client(config_file)
+    except Exception:  # pylint: disable=broad-except
+        conn.send(traceback.format_exc())
+        return
+    conn.send(None)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        try:
+            result = worker_class.call(client, *request)
+        except SystemExit as exc:
+            result = (exc.code if isinstance(exc.code, int) else 1, '', '{}\n'.format(exc), None)
+        except Exception:  # pylint: disable=broad-except
+            result = (1, '', traceback.format_exc(), None)
+        conn.send(result)
+
+
+class ClientWorker(object):
+    '''
+    Base class for the client worker processes
+    '''
+
+    # The name of the configuration file, in the fixture's configuration directory, to load
+    config_name = None
+
+    def __init__(self, config_dir, log_prefix):
+        self.config_file = os.path.join(config_dir, self.config_name)
+        self.log_prefix = log_prefix
+        self._process = self._conn = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        log.info('[%s] Starting %s for %s', self.log_prefix, self.__class__.__name__, self.config_file)
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_worker_main,
+                                                args=(self.__class__, self.config_file, child_conn))
+        self._process.daemon = True
+        self._process.start()
+        child_conn.close()
+        error = self._conn.recv()
+        if error is not None:
+            self.terminate()
+            raise RuntimeError('Failed to load the salt client in {}:\n{}'.format(self.__class__.__name__, error))
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def run(self, minion_tgt, args, timeout):
+        '''
+        Run the command and return a ``(exitcode, stdout, stderr, json)`` tuple
+        '''
+        with self._lock:
+            if not self.is_alive():
+                self.start()
+            self._conn.send((minion_tgt, args))
+            if not self._conn.poll(timeout):
+                # The worker can't be trusted anymore, the next call starts a new one
+                self.terminate()
+                raise ClientWorkerTimeout()
+            return self._conn.recv()
+
+    def terminate(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(None)
+        except (IOError, OSError):
+            pass
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._conn.close()
+        self._process = self._conn = None
+
+    @staticmethod
+    def load_client(config_file):
+        '''
+        Return the salt client the calls are made through
+        '''
+        raise NotImplementedError
+
+    @staticmethod
+    def call(client, minion_tgt, args):
+        '''
+        Make the call and return a ``(exitcode, stdout, stderr, json)`` tuple
+        '''
+        raise NotImplementedError
+
+
+def _format_output(ret):
+    # What the json outputter would print, and what would be parsed from it, so
+    # that, for example, tuples are still returned as lists
+    stdout = json.dumps(ret, default=repr, indent=4) + '\n'
+    return stdout, json.loads(stdout)
+
+
+class CallerClientWorker(ClientWorker):
+    '''
+    Runs ``salt-call`` commands through ``salt.client.Caller``
+    '''
+
+    config_name = 'minion'
+
+    @staticmethod
+    def load_client(config_file):
+        # Late import
+        import salt.client
+        import salt.config
+        opts = salt.config.minion_config(config_file)
+        return salt.client.Caller(mopts=opts)
+
+    @staticmethod
+    def call(client, minion_tgt, args):
+        # Late import
+        import salt.minion
+        import salt.utils.args
+        import salt.defaults.exitcodes
+        from salt.exceptions import CommandExecutionError, SaltInvocationError
+
+        fun, args = args[0], args[1:]
+        functions = client.sminion.functions
+        if fun not in functions:
+            # salt-call exits with -1
+            return 255, '', '{}\n'.format(functions.missing_fun_string(fun)), None
+        func = functions[fun]
+        # A freshly started salt-call would not have a retcode yet
+        context = functions.pack['__context__']
+        context.pop('retcode', None)
+        try:
+            args, kwargs = salt.minion.load_args_and_kwargs(func, salt.utils.args.parse_input(args))
+            ret = func(*args, **kwargs)
+        except CommandExecutionError as exc:
+            return (salt.defaults.exitcodes.EX_GENERIC,
+                    '',
+                    'Error running \'{}\': {}\n'.format(fun, exc),
+                    None)
+        except (SaltInvocationError, TypeError) as exc:
+            return salt.defaults.exitcodes.EX_GENERIC, '', '{}\n'.format(exc), None
+
+        retcode = context.get('retcode', 0)
+        if retcode == 0:
+            # Same as salt-call, check the result and success keys of the return
+            try:
+                if not all(ret.get(key, True) for key in ('result', 'success')):
+                    retcode = salt.defaults.exitcodes.EX_GENERIC
+            except Exception:  # pylint: disable=broad-except
+                pass
+        stdout, json_out = _format_output({'local': ret})
+        return retcode, stdout, '', json_out
+
+
+class LocalClientWorker(ClientWorker):
+    '''
+    Runs ``salt`` commands through ``salt.client.LocalClient``
+    '''
+
+    config_name = 'master'
+
+    @staticmethod
+    def load_client(config_file):
+        # Late import
+        import salt.client
+        return salt.client.LocalClient(c_path=config_file)
+
+    @staticmethod
+    def call(client, minion_tgt, args):
+        # Late import
+        import salt.utils.args
+        import salt.defaults.exitcodes
+        from salt.exceptions import SaltClientError
+
+        fun = args[0]
+        args, kwargs = salt.utils.args.parse_input(args[1:], condition=False)
+        try:
+            full_ret = client.cmd(minion_tgt, fun, arg=args, kwarg=kwargs, full_return=True)
+        except SaltClientError as exc:
+            return salt.defaults.exitcodes.EX_GENERIC, '', '{}\n'.format(exc), None
+        if not full_ret:
+            return (salt.defaults.exitcodes.EX_GENERIC,
+                    '',
+                    'No minions matched the target. No command was sent, no jid was assigned.\n',
+                    None)
+
+        ret = {}
+        exitcode = salt.defaults.exitcodes.EX_OK
+        for minion_id, data in full_ret.items():
+            if data is False:
+                ret[minion_id] = 'Minion did not return. [No response]'
+                exitcode = salt.defaults.exitcodes.EX_GENERIC
+                continue
+            ret[minion_id] = data['ret']
+            # Same as the salt CLI, any minion failure fails the command
+            if data.get('retcode', 0) != 0:
+                exitcode = salt.defaults.exitcodes.EX_GENERIC
+        stdout, json_out = _format_output(ret)
+        if minion_tgt in json_out:
+            json_out = json_out[minion_tgt]
+        return exitcode, stdout, '', json_out
+
+
+class RunnerClientWorker(ClientWorker):
+    '''
+    Runs ``salt-run`` commands through ``salt.runner.RunnerClient``
+    '''
+
+    config_name = 'master'
+
+    @staticmethod
+    def load_client(config_file):
+        # Late import
+        import salt.config
+        import salt.runner
+        return salt.runner.RunnerClient(salt.config.master_config(config_file))
+
+    @staticmethod
+    def call(client, minion_tgt, args):
+        # Late import
+        import salt.utils.args
+        import salt.defaults.exitcodes
+        from salt.exceptions import SaltClientError
+
+        fun = args[0]
+        if fun not in client.functions:
+            return (salt.defaults.exitcodes.EX_GENERIC,
+                    '',
+                    '{}\n'.format(client.functions.missing_fun_string(fun)),
+                    None)
+        args, kwargs = salt.utils.args.parse_input(args[1:], condition=False)
+        # A freshly started salt-run would not have a retcode yet
+        getattr(client, 'context', {}).pop('retcode', None)
+        try:
+            full_ret = client.cmd(fun, arg=args, kwarg=kwargs, print_event=False, full_return=True)
+        except SaltClientError as exc:
+            return salt.defaults.exitcodes.EX_GENERIC, '', '{}\n'.format(exc), None
+
+        # Same as salt-run
+        ret = full_ret
+        if isinstance(ret, dict) and 'return' in ret and 'retcode' not in ret:
+            ret = ret['return']
+        exitcode = salt.defaults.exitcodes.EX_OK
+        if isinstance(full_ret, dict) and 'retcode' in full_ret:
+            exitcode = full_ret['retcode']
+            ret = full_ret.get('return', ret)
+        elif isinstance(ret, dict) and 'retcode' in ret:
+            exitcode = ret['retcode']
+        elif isinstance(ret, dict) and isinstance(ret.get('data'), dict) and 'retcode' in ret['data']:
+            exitcode = ret['data']['retcode']
+        stdout, json_out = _format_output(ret)
+        return exitcode, stdout, '', json_out
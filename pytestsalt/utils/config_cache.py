@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.config_cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Cache the salt configuration loaded for the daemons.
+
+Loading a configuration file with ``salt.config.master_config()`` and friends
+is expensive, and function scoped daemon fixtures do it for every test, with
+options which only differ on the per test values, paths, ports and IDs.
+
+Those values are replaced by placeholders in the options written to the
+configuration file, and a hash of the result is the cache key. The loaded
+options are stored with the same placeholders, which are replaced by the
+actual values on a cache hit.
+
+The second configuration loaded for a cache key is still loaded from the file,
+and only when the cached options match it, are they used from then on.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import re
+import copy
+import glob
+import json
+import hashlib
+import logging
+
+try:
+    STRING_TYPES = (str, unicode)  # pylint: disable=undefined-variable
+except NameError:
+    # Python 3
+    STRING_TYPES = (str,)
+
+log = logging.getLogger(__name__)
+
+# Whether load_config() caches anything at all
+ENABLED = True
+
+_PLACEHOLDER = '\x00pytestsalt:{}\x00'
+_PLACEHOLDER_RE = re.compile('\x00pytestsalt:([^\x00]+)\x00')
+
+_CACHE = {}
+
+
+class _Substitutions(object):
+    '''
+    Replace per test values by placeholders, and back
+    '''
+
+    def __init__(self, options, variables):
+        self.values = {}
+        patterns = []
+        for name, value in variables.items():
+            if value is None or isinstance(value, bool):
+                continue
+            self.values[name] = value
+            if isinstance(value, int):
+                # Ports show up on their own, or in URIs, like tcp://127.0.0.1:4506
+                patterns.append((len(str(value)), name, r'(?<=:){}(?!\d)'.format(value)))
+            elif value:
+                patterns.append((len(value), name, r'(?<![\w.-]){}(?![\w.-])'.format(re.escape(value))))
+        # Longest values first, so that a path is not replaced by a placeholder for its parent
+        patterns.sort(key=lambda item: item[0], reverse=True)
+        self._names = [name for _, name, _ in patterns]
+        self._regex = None
+        if patterns:
+            self._regex = re.compile('|'.join('({})'.format(pattern) for _, _, pattern in patterns))
+        # Only the top level options which were passed a port are ports, salt has integer
+        # defaults which could match a port number
+        self._port_keys = {}
+        for key, value in options.items():
+            if isinstance(value, bool) or not isinstance(value, int):
+                continue
+            for name, port in self.values.items():
+                if isinstance(port, int) and value == port:
+                    self._port_keys[key] = name
+                    break
+
+    def _replace(self, match):
+        return _PLACEHOLDER.format(self._names[match.lastindex - 1])
+
+    def _restore(self, match):
+        return str(self.values[match.group(1)])
+
+    def normalize(self, data, top_level=True):
+        if isinstance(data, dict):
+            normalized = []
+            for key, value in data.items():
+                if top_level and key in self._port_keys and value == self.values[self._port_keys[key]]:
+                    normalized.append((key, _PLACEHOLDER.format(self._port_keys[key])))
+                else:
+                    normalized.append((self.normalize(key, False), self.normalize(value, False)))
+            return _copy_dict(data, normalized)
+        if type(data) in (list, tuple, set, frozenset):
+            return type(data)(self.normalize(item, False) for item in data)
+        if isinstance(data, STRING_TYPES) and self._regex is not None:
+            return self._regex.sub(self._replace, data)
+        return data
+
+    def restore(self, data):
+        if isinstance(data, dict):
+            return _copy_dict(data, [(self.restore(key), self.restore(value)) for key, value in data.items()])
+        if type(data) in (list, tuple, set, frozenset):
+            return type(data)(self.restore(item) for item in data)
+        if isinstance(data, STRING_TYPES) and '\x00' in data:
+            match = _PLACEHOLDER_RE.match(data)
+            if match and match.end() == len(data) and isinstance(self.values[match.group(1)], int):
+                return self.values[match.group(1)]
+            return _PLACEHOLDER_RE.sub(self._restore, data)
+        return data
+
+
+class _CachedConfig(object):  # pylint: disable=too-few-public-methods
+
+    __slots__ = ('options', 'verified')
+
+    def __init__(self, options):
+        self.options = options
+        self.verified = False
+
+
+def _copy_dict(data, items):
+    # Keep the dictionary type, OrderedDict for example
+    copied = copy.copy(data)
+    copied.clear()
+    copied.update(items)
+    return copied
+
+
+def _has_includes(options, config_file):
+    if options.get('include'):
+        return True
+    include_dir = '{}.d'.format(config_file)
+    return bool(glob.glob(os.path.join(include_dir, '*.conf')))
+
+
+def load_config(loader, config_file, options, variables):
+    '''
+    Return ``loader(config_file)``, where ``options`` were written to
+    ``config_file``, from the cache if the same options, apart from the per
+    test ``variables``, a mapping of names to paths, ports and IDs, were
+    loaded before
+    '''
+    if not ENABLED or _has_includes(options, config_file):
+        # Whatever is included is not part of the cache key
+        return loader(config_file)
+    substitutions = _Substitutions(options, variables)
+    try:
+        serialized = json.dumps(substitutions.normalize(options), sort_keys=True)
+    except (TypeError, ValueError):
+        return loader(config_file)
+    key = (loader, hashlib.sha256(serialized.encode('utf-8')).hexdigest())
+    cached = _CACHE.get(key)
+    if cached is not None and cached.verified:
+        log.debug('Loading %s from the configuration cache', config_file)
+        return substitutions.restore(cached.options)
+    loaded = loader(config_file)
+    if key in _CACHE and cached is None:
+        # Not cacheable, see below
+        return loaded
+    normalized = substitutions.normalize(loaded)
+    if substitutions.restore(normalized) != loaded:
+        log.debug('Not caching the configuration loaded from %s, it does not survive the round trip',
+                  config_file)
+        _CACHE[key] = None
+    elif cached is None:
+        _CACHE[key] = _CachedConfig(normalized)
+    elif cached.options == normalized:
+        # The placeholders are only trusted once they've been shown to replace
+        # every per test value, loading a configuration with different ones
+        cached.verified = True
+    else:
+        log.debug('Not caching the configuration loaded from %s, some per test values are '
+                  'not replaced by placeholders', config_file)
+        _CACHE[key] = None
+    return loaded
+
+
+def clear():
+    '''
+    Empty the cache
+    '''
+    _CACHE.clear()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.containment
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Keep track of a daemon and all of its descendants.
+
+The daemon is started in its own session, and therefore, its own process
+group. When a cgroup v2 hierarchy is mounted and writable, the daemon is also
+moved into its own leaf cgroup, right after it's started, which, unlike the
+process group, also holds the processes which start a new session themselves.
+The signals are sent to both, the processes the daemon starts before being
+moved into its cgroup being only in its process group.
+
+Stopping the daemon is then a single signal to the whole group, followed by a
+single wait for it to be empty, instead of walking the process tree looking for
+children, which also misses the ones re-parented to init.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import sys
+import time
+import errno
+import signal
+import logging
+import itertools
+
+log = logging.getLogger(__name__)
+
+_CGROUP_COUNTER = itertools.count()
+
+
+def is_supported():
+    '''
+    Process groups are not available on windows
+    '''
+    return hasattr(os, 'killpg') and not sys.platform.startswith('win')
+
+
+def get_cgroup2_path():
+    '''
+    Return the path of the cgroup v2 this process belongs to, or ``None`` if
+    there's no cgroup v2 hierarchy mounted
+    '''
+    try:
+        with open('/proc/self/mounts') as rfh:
+            mounts = [line.split()[1] for line in rfh if line.split()[2:3] == ['cgroup2']]
+        with open('/proc/self/cgroup') as rfh:
+            cgroups = [line.strip().split(':', 2)[2] for line in rfh if line.startswith('0::')]
+    except (IOError, OSError, IndexError):
+        return None
+    if not mounts or not cgroups:
+        return None
+    return os.path.join(mounts[0], cgroups[0].lstrip('/'))
+
+
+class ProcessContainer(object):
+    '''
+    Contain a started process and everything it starts
+    '''
+
+    # How long to wait for the processes to go away after each signal
+    TERMINATE_TIMEOUT = 15
+    KILL_TIMEOUT = 5
+
+    def __init__(self, name, use_cgroup=True):
+        self.name = name
+        self.use_cgroup = use_cgroup
+        self.cgroup_path = None
+        self._process = None
+
+    def popen_kwargs(self):
+        '''
+        The keyword arguments to pass to ``subprocess.Popen`` for the process to
+        get its own session.
+
+        No python code runs in the child between fork and exec, the process is
+        moved into its cgroup by :meth:`attach`.
+        '''
+        if self.use_cgroup:
+            self.cgroup_path = self._create_cgroup()
+        if sys.version_info < (3,):
+            return {'preexec_fn': os.setsid}
+        return {'start_new_session': True}
+
+    def attach(self, process):
+        '''
+        Track ``process``, a ``subprocess.Popen`` instance started with :meth:`popen_kwargs`,
+        moving it into its cgroup when there's one
+        '''
+        self._process = process
+        if self.cgroup_path is None:
+            return
+        try:
+            with open(os.path.join(self.cgroup_path, 'cgroup.procs'), 'w') as wfh:
+                wfh.write(str(process.pid))
+        except (IOError, OSError) as exc:
+            log.debug('Failed to move %s into cgroup %s, relying on its process group: %s',
+                      self.name, self.cgroup_path, exc)
+            self.close()
+            self.cgroup_path = None
+            self._process = process
+        else:
+            log.debug('Contained %s in cgroup %s', self.name, self.cgroup_path)
+
+    def _create_cgroup(self):
+        parent = get_cgroup2_path()
+        if parent is None:
+            return None
+        path = os.path.join(parent,
+                            'pytest-salt-{}-{}-{}'.format(os.getpid(), self.name, next(_CGROUP_COUNTER)))
+        try:
+            os.mkdir(path)
+        except OSError as exc:
+            log.debug('Not containing %s in a cgroup: %s', self.name, exc)
+            return None
+        if not os.access(os.path.join(path, 'cgroup.procs'), os.W_OK):
+            log.debug('Not containing %s in a cgroup: %s is not writable', self.name, path)
+            os.rmdir(path)
+            return None
+        return path
+
+    def _cgroup_pids(self):
+        try:
+            with open(os.path.join(self.cgroup_path, 'cgroup.procs')) as rfh:
+                return [int(pid) for pid in rfh.read().split()]
+        except (IOError, OSError):
+            return []
+
+    def _cgroup_populated(self):
+        try:
+            with open(os.path.join(self.cgroup_path, 'cgroup.events')) as rfh:
+                for line in rfh:
+                    if line.startswith('populated '):
+                        return line.split()[1] != '0'
+        except (IOError, OSError):
+            pass
+        return bool(self._cgroup_pids())
+
+    def send_signal(self, signum):
+        '''
+        Send ``signum`` to every contained process
+        '''
+        if self._process is None:
+            return
+        if self.cgroup_path is not None:
+            self._signal_cgroup(signum)
+        # Whatever the process started before it was moved into its cgroup is
+        # only in its process group
+        self._signal_process_group(signum)
+
+    def _signal_cgroup(self, signum):
+        if signum == signal.SIGKILL and os.path.exists(os.path.join(self.cgroup_path, 'cgroup.kill')):
+            with open(os.path.join(self.cgroup_path, 'cgroup.kill'), 'w') as wfh:
+                wfh.write('1')
+            return
+        for pid in self._cgroup_pids():
+            try:
+                os.kill(pid, signum)
+            except OSError as exc:
+                if exc.errno != errno.ESRCH:
+                    raise
+
+    def _signal_process_group(self, signum):
+        try:
+            os.killpg(self._process.pid, signum)
+        except OSError as exc:
+            if exc.errno not in (errno.ESRCH, errno.EPERM):
+                raise
+
+    def is_empty(self):
+        '''
+        Returns ``True`` once all contained processes are gone
+        '''
+        if self._process is None:
+            return True
+        # Reap the process we started, otherwise, as a zombie, it would still be around
+        self._process.poll()
+        if self.cgroup_path is not None:
+            # Unlike the process group, zombies re-parented to init don't count
+            return not self._cgroup_populated()
+        try:
+            os.killpg(self._process.pid, 0)
+        except OSError as exc:
+            if exc.errno == errno.ESRCH:
+                return True
+            if exc.errno != errno.EPERM:
+                raise
+        return False
+
+    def wait(self, timeout):
+        '''
+        Wait up to ``timeout`` seconds for all contained processes to be gone
+        '''
+        expire = time.time() + timeout
+        interval = 0.005
+        while not self.is_empty():
+            remaining = expire - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 0.1)
+        return True
+
+    def terminate(self, slow_stop=False):
+        '''
+        Stop every contained process.
+
+        When ``slow_stop`` is ``True``, they get a chance to stop gracefully, to
+        write down coverage data for example, before being killed.
+        '''
+        if self._process is None:
+            return
+        log.info('Terminating %s(%s) and everything it started', self.name, self._process.pid)
+        if slow_stop:
+            self.send_signal(signal.SIGTERM)
+            self.wait(self.TERMINATE_TIMEOUT)
+        if not self.is_empty():
+            self.send_signal(signal.SIGKILL)
+            if not self.wait(self.KILL_TIMEOUT):
+                log.warning('Some processes started by %s failed to properly terminate', self.name)
+        elif self.cgroup_path is not None:
+            # The cgroup is empty, but not necessarily the process group
+            self._signal_process_group(signal.SIGKILL)
+        log.info('%s(%s) terminated with exit code: %s', self.name, self._process.pid, self._process.poll())
+        self.close()
+
+    def close(self):
+        if self.cgroup_path is not None:
+            try:
+                os.rmdir(self.cgroup_path)
+            except OSError as exc:
+                log.debug('Failed to remove cgroup %s: %s', self.cgroup_path, exc)
+            else:
+                self.cgroup_path = None
+        self._process = None
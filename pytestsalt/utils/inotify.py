@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.inotify
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Wait for paths to be created, using inotify where available and falling
+back to polling them otherwise
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import sys
+import time
+import errno
+import select
+import logging
+
+log = logging.getLogger(__name__)
+
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+try:
+    if not sys.platform.startswith('linux'):
+        raise ImportError('inotify is only available on linux')
+    import ctypes
+    import ctypes.util
+    _LIBC = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+    _LIBC.inotify_init1.argtypes = [ctypes.c_int]
+    _LIBC.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    HAS_INOTIFY = True
+except (ImportError, OSError, AttributeError):
+    HAS_INOTIFY = False
+
+
+class PathsWatcher(object):
+    '''
+    Wait for a list of paths to exist
+    '''
+
+    POLL_INITIAL_INTERVAL = 0.005
+    POLL_MAX_INTERVAL = 0.1
+
+    def __init__(self, paths):
+        self.missing = set(paths)
+        self._fd = None
+        self._watched = set()
+        self._poll_interval = self.POLL_INITIAL_INTERVAL
+        if HAS_INOTIFY:
+            fd = _LIBC.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                log.debug('Failed to initialize inotify: %s', os.strerror(ctypes.get_errno()))
+            else:
+                self._fd = fd
+
+    def _watch_ancestors(self):
+        for path in self.missing:
+            # Watch the closest existing directory, it's where the next component will be created
+            directory = os.path.dirname(path)
+            while directory and not os.path.isdir(directory):
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+            if directory in self._watched:
+                continue
+            wd = _LIBC.inotify_add_watch(self._fd,
+                                         directory.encode(sys.getfilesystemencoding()),
+                                         IN_CREATE | IN_MOVED_TO)
+            if wd < 0:
+                log.debug('Failed to watch %s: %s', directory, os.strerror(ctypes.get_errno()))
+                continue
+            self._watched.add(directory)
+
+    def _check(self):
+        for path in list(self.missing):
+            if os.path.exists(path):
+                self.missing.remove(path)
+        return self.missing
+
+    def wait(self, timeout):
+        '''
+        Wait up to ``timeout`` seconds for the paths to exist.
+
+        Returns the paths which are still missing.
+        '''
+        expire = time.time() + timeout
+        while self._check():
+            remaining = expire - time.time()
+            if remaining <= 0:
+                break
+            if self._fd is None:
+                time.sleep(min(self._poll_interval, remaining))
+                self._poll_interval = min(self._poll_interval * 2, self.POLL_MAX_INTERVAL)
+                continue
+            # Watch before checking again so that no creation is missed
+            self._watch_ancestors()
+            if not self._check():
+                break
+            try:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+            except (select.error, OSError) as exc:
+                if exc.args[0] != errno.EINTR:
+                    raise
+                continue
+            if readable:
+                try:
+                    while os.read(self._fd, 4096):
+                        pass
+                except OSError as exc:
+                    if exc.errno != errno.EAGAIN:
+                        raise
+        return self.missing
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.keys
+~~~~~~~~~~~~~~~~~~~~~
+
+Hand pre-generated RSA keypairs to the salt daemons.
+
+A salt master or minion generates its keypair the first time it starts, which
+function scoped daemons do for every test. Instead, a few keypairs for each
+kind of daemon are generated once, in parallel, and copied into the daemons'
+``pki_dir`` when their configuration is written. The keypairs are handed out
+round robin, the daemons started for a single test get different ones.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+import multiprocessing
+
+log = logging.getLogger(__name__)
+
+# How many keypairs to generate for each kind of daemon, 0 disables the pool
+POOL_SIZE = 4
+
+KINDS = ('master', 'minion')
+
+
+def _generate_keypair(keydir, keyname, keysize):
+    # Late import
+    import salt.crypt
+    os.makedirs(keydir)
+    salt.crypt.gen_keys(keydir, keyname, keysize)
+    return keydir
+
+
+class KeyPool(object):
+    '''
+    Keypairs of a given size for each kind of daemon
+    '''
+
+    def __init__(self, size, keysize, path=None):
+        self.size = size
+        self.keysize = keysize
+        self.path = path
+        self._keys = None
+        self._next = dict.fromkeys(KINDS, 0)
+        self._lock = threading.Lock()
+
+    def _generate(self):
+        if self.path is None:
+            self.path = tempfile.mkdtemp(prefix='pytest-salt-keys-{}-'.format(self.keysize))
+            atexit.register(shutil.rmtree, self.path, True)
+        jobs = [(os.path.join(self.path, '{}-{}'.format(kind, idx)), kind, self.keysize)
+                for kind in KINDS for idx in range(self.size)]
+        log.debug('Generating %d keypairs of %d bits in %s', len(jobs), self.keysize, self.path)
+        pool = multiprocessing.Pool(processes=min(len(jobs), multiprocessing.cpu_count()))
+        try:
+            keydirs = [result.get() for result in [pool.apply_async(_generate_keypair, job) for job in jobs]]
+        finally:
+            pool.close()
+            pool.join()
+        self._keys = {kind: [keydir for keydir in keydirs if os.path.basename(keydir).startswith(kind + '-')]
+                      for kind in KINDS}
+
+    def get(self, kind):
+        '''
+        Return the paths to the next private and public keys of ``kind``
+        '''
+        with self._lock:
+            if self._keys is None:
+                self._generate()
+            keydir = self._keys[kind][self._next[kind] % self.size]
+            self._next[kind] += 1
+        return os.path.join(keydir, kind + '.pem'), os.path.join(keydir, kind + '.pub')
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def install_keypair(kind, pki_dir, keysize):
+    '''
+    Copy a pre-generated keypair of ``kind``, ``master`` or ``minion``, into
+    ``pki_dir``, unless it already has one, and return the path to the public
+    key, or ``None`` if nothing was copied
+    '''
+    if POOL_SIZE <= 0:
+        return None
+    priv_path = os.path.join(pki_dir, kind + '.pem')
+    pub_path = os.path.join(pki_dir, kind + '.pub')
+    if os.path.exists(priv_path) or os.path.exists(pub_path):
+        return None
+    with _POOLS_LOCK:
+        if keysize not in _POOLS:
+            _POOLS[keysize] = KeyPool(POOL_SIZE, keysize)
+        pool = _POOLS[keysize]
+    pool_priv_path, pool_pub_path = pool.get(kind)
+    shutil.copyfile(pool_priv_path, priv_path)
+    # The same permissions salt gives the keys it generates
+    os.chmod(priv_path, 0o400)
+    shutil.copyfile(pool_pub_path, pub_path)
+    os.chmod(pub_path, 0o644)
+    log.debug('Installed a pre-generated %s keypair in %s', kind, pki_dir)
+    return pub_path
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+'''
+    pytestsalt.utils.log_records
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The parts of the log servers which don't depend on their event loop
+'''
+
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue
+
+# Import 3rd-party libs
+import msgpack
+
+log = logging.getLogger(__name__)
+
+# How much, in bytes, to read from a log stream at once
+MIN_READ_SIZE = 4096
+MAX_READ_SIZE = 1024 * 1024
+
+# How much, in bytes, of an incomplete log record to buffer, at most
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+# How many batches of log records can wait to be handled before the log
+# servers stop reading from the log streams
+MAX_PENDING_BATCHES = 256
+
+# How long, in seconds, the log servers wait before retrying to dispatch a batch
+BACKPRESSURE_INTERVAL = 0.005
+
+
+class ReadSize(object):
+    '''
+    Read more at once from streams which fill the reads, and less from the ones which don't
+    '''
+
+    def __init__(self):
+        self.size = MIN_READ_SIZE
+
+    def update(self, nbytes):
+        if nbytes >= self.size:
+            self.size = min(self.size * 2, MAX_READ_SIZE)
+        elif nbytes < self.size // 4:
+            self.size = max(self.size // 2, MIN_READ_SIZE)
+
+
+class RecordsUnpacker(object):
+    '''
+    Turn the bytes read from a log stream into batches of log records
+    '''
+
+    def __init__(self, address):
+        self.address = address
+        self._unpacker = self._new_unpacker()
+
+    @staticmethod
+    def _new_unpacker():
+        return msgpack.Unpacker(raw=False, max_buffer_size=MAX_BUFFER_SIZE)
+
+    def feed(self, wire_bytes):
+        '''
+        Return the list of log records dictionaries completed by ``wire_bytes``
+        '''
+        try:
+            self._unpacker.feed(wire_bytes)
+        except msgpack.exceptions.BufferFull:
+            # A single log record bigger than the buffer. There's no telling where the
+            # next one starts, this one, and maybe a few others, are lost.
+            log.error('A log record from %s is over %d bytes, discarding it', self.address, MAX_BUFFER_SIZE)
+            self._unpacker = self._new_unpacker()
+            return []
+        return list(self._unpacker)
+
+
+class RecordDispatcher(object):
+    '''
+    Handle batches of log records, in a thread of its own, so that reading them
+    from the log streams does not wait on the logging handlers
+    '''
+
+    def __init__(self):
+        self._queue = queue.Queue(MAX_PENDING_BATCHES)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def dispatch(self, batch):
+        '''
+        Queue ``batch``, a list of log records dictionaries, to be handled.
+
+        Returns ``False`` when too many batches are waiting to be handled, the
+        caller should then stop reading log records for a while, and retry.
+        '''
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            return False
+        return True
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            for record_dict in batch:
+                try:
+                    record = logging.makeLogRecord(record_dict)
+                    logger = logging.getLogger(record.name)
+                    logger.handle(record)
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.exception(exc)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.log_ring
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Read the log records of the local salt daemons from shared memory.
+
+When enabled, the salt daemons on this host write their log records into a
+ring buffer of their own, a file in the directory passed to them as the
+``pytest_log_ring_dir`` option, which they map in memory. The log server
+maps the same files, and unpacks the log records straight from the shared
+memory. The daemons which cannot use a ring buffer, Windows guests for
+example, still send their log records to the log server over TCP.
+
+The ring buffers layout is described in
+``pytestsalt.salt.log_handlers.pytest_log_handler``, which writes them.
+'''
+
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import os
+import mmap
+import time
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+
+# Import 3rd-party libs
+import msgpack
+import psutil
+
+# Import pytest-salt libs
+from pytestsalt.salt.log_handlers.pytest_log_handler import BATCH_SIZE
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_DATA_OFFSET
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_FRAME
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_HEAD_OFFSET
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_HEADER
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_MAGIC
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_POSITION
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_TAIL_OFFSET
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_VERSION
+from pytestsalt.salt.log_handlers.pytest_log_handler import RING_WRAP
+from pytestsalt.salt.log_handlers.pytest_log_handler import ring_frame_size
+from pytestsalt.utils.log_records import BACKPRESSURE_INTERVAL
+from pytestsalt.utils.log_records import RecordDispatcher
+
+log = logging.getLogger(__name__)
+
+# Whether the salt daemons write their log records to ring buffers
+ENABLED = False
+
+# How long, in seconds, the log server waits between looking for log records in
+# the ring buffers, the longer the longer they have been empty
+MIN_POLL_INTERVAL = 0.001
+MAX_POLL_INTERVAL = 0.05
+
+# How often, in seconds, the log server looks for new ring buffers
+SCAN_INTERVAL = 0.1
+
+_RING_DIR = None
+_RING_DIR_LOCK = threading.Lock()
+
+
+def get_ring_dir():
+    '''
+    Return the directory where the salt daemons create their ring buffers, or
+    ``None`` if they don't use them
+    '''
+    global _RING_DIR  # pylint: disable=global-statement
+    if not ENABLED:
+        return None
+    with _RING_DIR_LOCK:
+        if _RING_DIR is None:
+            _RING_DIR = tempfile.mkdtemp(prefix='pytest-salt-log-rings-')
+            atexit.register(shutil.rmtree, _RING_DIR, True)
+    return _RING_DIR
+
+
+class RingReader(object):
+    '''
+    The consuming end of a shared memory ring buffer of log records
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r+b') as rfh:
+            # Raises ValueError while the file is still empty
+            self._mmap = mmap.mmap(rfh.fileno(), 0)
+        try:
+            if len(self._mmap) < RING_DATA_OFFSET:
+                raise ValueError('{} is not a log records ring buffer yet'.format(path))
+            magic, version, self.capacity = RING_HEADER.unpack_from(self._mmap, 0)
+            if magic != RING_MAGIC:
+                raise ValueError('{} is not a log records ring buffer yet'.format(path))
+            if version != RING_VERSION:
+                raise ValueError('{} is a version {} log records ring buffer, not {}'.format(
+                    path, version, RING_VERSION))
+            if len(self._mmap) < RING_DATA_OFFSET + self.capacity:
+                raise ValueError('{} is truncated'.format(path))
+        except ValueError:
+            self._mmap.close()
+            raise
+        try:
+            self._view = memoryview(self._mmap)
+        except TypeError:
+            # Python 2, slicing the mmap copies the log records out of it
+            self._view = self._mmap
+        try:
+            self.pid = int(os.path.basename(path).split('.')[0])
+        except ValueError:
+            self.pid = None
+
+    def producer_alive(self):
+        '''
+        Whether the process writing to the ring buffer could still write to it
+        '''
+        return self.pid is None or psutil.pid_exists(self.pid)
+
+    def read(self, max_records=BATCH_SIZE):
+        '''
+        Return up to ``max_records`` log records dictionaries, and make room for
+        new ones in the ring buffer
+        '''
+        records = []
+        head = RING_POSITION.unpack_from(self._mmap, RING_HEAD_OFFSET)[0]
+        tail = RING_POSITION.unpack_from(self._mmap, RING_TAIL_OFFSET)[0]
+        while head < tail and len(records) < max_records:
+            offset = head % self.capacity
+            length = RING_FRAME.unpack_from(self._mmap, RING_DATA_OFFSET + offset)[0]
+            if length == RING_WRAP:
+                head += self.capacity - offset
+                continue
+            start = RING_DATA_OFFSET + offset + RING_FRAME.size
+            try:
+                # Unpacked in place, from the shared memory
+                records.append(msgpack.unpackb(self._view[start:start + length], raw=False))
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error('Failed to unpack a log record from %s: %s', self.path, exc)
+            head += ring_frame_size(length)
+        RING_POSITION.pack_into(self._mmap, RING_HEAD_OFFSET, head)
+        return records
+
+    def close(self):
+        if self._view is not self._mmap:
+            self._view.release()
+        self._mmap.close()
+
+
+class RingConsumer(object):
+    '''
+    Read the log records from the ring buffers created in ``path``, in a thread
+    of its own, and handle them
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._readers = {}
+        self._dispatcher = RecordDispatcher()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._dispatcher.stop()
+
+    def _scan(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.ring') or name in self._readers:
+                continue
+            try:
+                self._readers[name] = RingReader(os.path.join(self.path, name))
+            except (IOError, OSError, ValueError) as exc:
+                # Most likely, the daemon is still creating it
+                log.debug('Not reading from %s yet: %s', name, exc)
+
+    def _consume(self):
+        '''
+        Handle what is in the ring buffers, return whether there was anything
+        '''
+        consumed = False
+        for name, reader in list(self._readers.items()):
+            # Checked first, whatever was written before the producer died is still read
+            alive = reader.producer_alive()
+            batch = reader.read()
+            if batch:
+                consumed = True
+                while not self._dispatcher.dispatch(batch):
+                    # The log records are not being handled fast enough, the
+                    # producers wait for room in their ring buffer meanwhile
+                    time.sleep(BACKPRESSURE_INTERVAL)
+            elif not alive:
+                reader.close()
+                del self._readers[name]
+                try:
+                    os.unlink(reader.path)
+                except OSError:
+                    pass
+        return consumed
+
+    def _run(self):
+        poll_interval = MIN_POLL_INTERVAL
+        last_scan = 0
+        while not self._stopped.is_set():
+            now = time.time()
+            if now - last_scan >= SCAN_INTERVAL:
+                self._scan()
+                last_scan = now
+            try:
+                consumed = self._consume()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception(exc)
+                consumed = False
+            if consumed:
+                poll_interval = MIN_POLL_INTERVAL
+            else:
+                self._stopped.wait(poll_interval)
+                poll_interval = min(poll_interval * 2, MAX_POLL_INTERVAL)
+        # Whatever is left
+        self._scan()
+        while self._consume():
+            pass
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
@@ -14,7 +14,17 @@ import logging
 import threading
 
 # Import 3rd-party libs
-import msgpack
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+# Import pytest-salt libs
+from pytestsalt.utils.log_records import BACKPRESSURE_INTERVAL
+from pytestsalt.utils.log_records import ReadSize
+from pytestsalt.utils.log_records import RecordDispatcher
+from pytestsalt.utils.log_records import RecordsUnpacker
 
 log = logging.getLogger(__name__)
 
@@ -23,38 +33,43 @@ def log_server_asyncio(log_server_port):
     '''
     Starts a log server.
     '''
+    dispatcher = RecordDispatcher()
+
     async def read_child_processes_log_records(reader, writer):
-        unpacker = msgpack.Unpacker(raw=False)
+        unpacker = RecordsUnpacker(writer.get_extra_info('peername'))
+        read_size = ReadSize()
         while True:
             try:
-                wire_bytes = await reader.read(1024)
+                wire_bytes = await reader.read(read_size.size)
                 if not wire_bytes:
                     break
-                try:
-                    unpacker.feed(wire_bytes)
-                except msgpack.exceptions.BufferFull:
-                    # Start over loosing some data?!
-                    unpacker = msgpack.Unpacker(raw=False)
-                    unpacker.feed(wire_bytes)
-                for record_dict in unpacker:
-                    record = logging.makeLogRecord(record_dict)
-                    logger = logging.getLogger(record.name)
-                    logger.handle(record)
-            except (EOFError, KeyboardInterrupt, SystemExit):
+                read_size.update(len(wire_bytes))
+                batch = unpacker.feed(wire_bytes)
+                if batch:
+                    while not dispatcher.dispatch(batch):
+                        # The log records are not being handled fast enough, stop
+                        # reading for a while, and let the senders wait
+                        await asyncio.sleep(BACKPRESSURE_INTERVAL)
+            except (EOFError, KeyboardInterrupt, SystemExit, ConnectionError):
                 break
             except Exception as exc:  # pylint: disable=broad-except
                 log.exception(exc)
+        writer.close()
 
     def process_logs(port):
-        loop = asyncio.new_event_loop()
+        if HAS_UVLOOP:
+            loop = uvloop.new_event_loop()
+        else:
+            loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         try:
-            coro = asyncio.start_server(read_child_processes_log_records, host='localhost', port=port, loop=loop)
+            coro = asyncio.start_server(read_child_processes_log_records, host='localhost', port=port)
             server = loop.run_until_complete(coro)
         except OSError as err:
             if err.errno != errno.EADDRNOTAVAIL:
                 # If not address not available, in case localhost cannot be resolved
                 raise
-            coro = asyncio.start_server(read_child_processes_log_records, host='127.0.0.1', port=port, loop=loop)
+            coro = asyncio.start_server(read_child_processes_log_records, host='127.0.0.1', port=port)
             server = loop.run_until_complete(coro)
         try:
             loop.run_forever()
@@ -64,6 +79,7 @@ def log_server_asyncio(log_server_port):
         server.close()
         loop.run_until_complete(server.wait_closed())
         loop.close()
+        dispatcher.stop()
 
     process_queue_thread = threading.Thread(target=process_logs, args=(log_server_port,))
     process_queue_thread.daemon = True
@@ -12,8 +12,6 @@ import logging
 import threading
 
 # Import 3rd-party libs
-import msgpack
-
 try:
     from salt.ext.tornado import gen
     from salt.ext.tornado.ioloop import IOLoop
@@ -25,29 +23,37 @@ except ImportError:
     from tornado.tcpserver import TCPServer
     from tornado.iostream import StreamClosedError
 
+# Import pytest-salt libs
+from pytestsalt.utils.log_records import BACKPRESSURE_INTERVAL
+from pytestsalt.utils.log_records import ReadSize
+from pytestsalt.utils.log_records import RecordDispatcher
+from pytestsalt.utils.log_records import RecordsUnpacker
+
 log = logging.getLogger(__name__)
 
 
 class LogServer(TCPServer):
 
+    def __init__(self, *args, **kwargs):
+        super(LogServer, self).__init__(*args, **kwargs)
+        self.dispatcher = RecordDispatcher()
+
     @gen.coroutine
     def handle_stream(self, stream, address):
-        unpacker = msgpack.Unpacker(raw=False)
+        unpacker = RecordsUnpacker(address)
+        read_size = ReadSize()
         while True:
             try:
-                wire_bytes = yield stream.read_bytes(1024, partial=True)
+                wire_bytes = yield stream.read_bytes(read_size.size, partial=True)
                 if not wire_bytes:
                     break
-                try:
-                    unpacker.feed(wire_bytes)
-                except msgpack.exceptions.BufferFull:
-                    # Start over loosing some data?!
-                    unpacker = msgpack.Unpacker(raw=False)
-                    unpacker.feed(wire_bytes)
-                for record_dict in unpacker:
-                    record = logging.makeLogRecord(record_dict)
-                    logger = logging.getLogger(record.name)
-                    logger.handle(record)
+                read_size.update(len(wire_bytes))
+                batch = unpacker.feed(wire_bytes)
+                if batch:
+                    while not self.dispatcher.dispatch(batch):
+                        # The log records are not being handled fast enough, stop
+                        # reading for a while, and let the senders wait
+                        yield gen.sleep(BACKPRESSURE_INTERVAL)
             except (EOFError, KeyboardInterrupt, SystemExit, StreamClosedError):
                 break
             except Exception as exc:  # pylint: disable=broad-except
@@ -68,6 +74,7 @@ def log_server_tornado(log_server_port):
             pass
 
         server.stop()
+        server.dispatcher.stop()
 
     process_queue_thread = threading.Thread(target=process_logs, args=(log_server_port,))
     process_queue_thread.daemon = True
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.ports
+~~~~~~~~~~~~~~~~~~~~~~
+
+Hand out localhost ports which are unique across processes.
+
+Binding to port 0 and closing the socket, the way ``get_unused_localhost_port``
+used to do it, lets two processes, pytest-xdist workers for example, get the
+same port before either daemon binds it.
+
+Instead, each process reserves whole blocks of ports, from a range below the
+ephemeral one, in a state file shared by every process on the host and
+protected by a file lock. Ports are then handed out from the reserved blocks
+without any further coordination. Blocks reserved by processes which are no
+longer running are reclaimed.
+
+Optionally, the ports handed out can be held, kept bound, until the daemon they
+were handed to is running, so that nothing else gets them in the meantime.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import json
+import errno
+import atexit
+import socket
+import logging
+import tempfile
+import threading
+import collections
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # Windows
+    HAS_FCNTL = False
+
+# Import 3rd party libs
+import psutil
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT_RANGE_START = 20000
+DEFAULT_PORT_RANGE_END = 32768
+
+
+def get_default_port_range():
+    '''
+    Return the ``(start, end)`` range of ports to allocate from, which ends
+    where the ephemeral ports range starts, so that the ports handed out don't
+    clash with the ones the kernel picks for outgoing connections
+    '''
+    end = DEFAULT_PORT_RANGE_END
+    try:
+        with open('/proc/sys/net/ipv4/ip_local_port_range') as rfh:
+            end = int(rfh.read().split()[0])
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    if end - DEFAULT_PORT_RANGE_START < PortAllocator.BLOCK_SIZE:
+        end = DEFAULT_PORT_RANGE_END
+    return DEFAULT_PORT_RANGE_START, end
+
+
+def get_ephemeral_port():
+    '''
+    Return a random unused port on localhost, as chosen by the kernel
+    '''
+    usock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
+    usock.bind(('127.0.0.1', 0))
+    port = usock.getsockname()[1]
+    usock.close()
+    return port
+
+
+def bind_port(port):
+    '''
+    Bind a socket to ``port`` on localhost, without listening on it, and return
+    it, or ``None`` if something outside of the allocator is using the port.
+
+    The socket allows reusing the address, and the port where supported, so
+    that, while it's kept open, a daemon can still bind the port, but the kernel
+    won't hand it out to anything else.
+    '''
+    usock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
+    # Daemons bind with SO_REUSEADDR, sockets in TIME_WAIT won't stop them
+    usock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        usock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        usock.bind(('127.0.0.1', port))
+    except socket.error as exc:
+        usock.close()
+        if exc.errno != errno.EADDRINUSE:
+            raise
+        return None
+    return usock
+
+
+def is_port_free(port):
+    '''
+    Check that nothing outside of the allocator is using ``port``
+    '''
+    usock = bind_port(port)
+    if usock is None:
+        return False
+    usock.close()
+    return True
+
+
+class PortAllocator(object):
+    '''
+    Reserve blocks of ports in a state file shared across processes and hand
+    out the ports in them
+    '''
+
+    BLOCK_SIZE = 50
+
+    def __init__(self, state_path=None, port_range=None, block_size=None):
+        if state_path is None:
+            state_path = os.path.join(tempfile.gettempdir(), 'pytest-salt-ports.json')
+        self.state_path = state_path
+        self.port_range = port_range or get_default_port_range()
+        self.block_size = block_size or self.BLOCK_SIZE
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._blocks = []
+        self._free = collections.deque()
+        self._held = {}
+
+    def get_port(self, hold=False):
+        '''
+        Return a localhost port which no other process got from an allocator.
+
+        When ``hold`` is ``True``, the port is kept bound until
+        :meth:`release_ports` is called with it, see :func:`bind_port`.
+        '''
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked, the blocks, and the held sockets, belong to the parent process
+                self._reset()
+            while True:
+                if not self._free:
+                    self._reserve_block()
+                port = self._free.popleft()
+                usock = bind_port(port)
+                if usock is None:
+                    log.debug('Skipping port %s, it is already in use', port)
+                    continue
+                if hold:
+                    self._held[port] = usock
+                else:
+                    usock.close()
+                return port
+
+    def release_ports(self, ports):
+        '''
+        Stop holding ``ports``, once whatever they were handed to has bound them
+        '''
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for port in ports:
+                usock = self._held.pop(port, None)
+                if usock is not None:
+                    log.debug('Releasing held port %s', port)
+                    usock.close()
+
+    def _update_state(self, update):
+        '''
+        Call ``update`` with the blocks mapping, starting port to owner pid,
+        while holding the lock on the state file, store the updated mapping and
+        return whatever ``update`` returned
+        '''
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r+') as fh:
+                contents = fh.read()
+                try:
+                    blocks = {int(start): pid for start, pid in json.loads(contents).items()}
+                except ValueError:
+                    if contents:
+                        log.warning('Discarding the corrupted ports state file %s', self.state_path)
+                    blocks = {}
+                result = update(blocks)
+                fh.seek(0)
+                fh.truncate()
+                json.dump({str(start): pid for start, pid in blocks.items()}, fh)
+            return result
+        finally:
+            os.close(fd)
+
+    def _reserve_block(self):
+        pid = os.getpid()
+        range_start, range_end = self.port_range
+
+        def reserve(blocks):
+            for start, owner in list(blocks.items()):
+                if owner != pid and not psutil.pid_exists(owner):
+                    log.debug('Reclaiming ports block %s from process %s', start, owner)
+                    del blocks[start]
+            for start in range(range_start, range_end - self.block_size + 1, self.block_size):
+                if start not in blocks:
+                    blocks[start] = pid
+                    return start
+            raise RuntimeError(
+                'All the ports between {} and {} are reserved'.format(range_start, range_end)
+            )
+
+        start = self._update_state(reserve)
+        log.debug('Reserved ports %s to %s', start, start + self.block_size - 1)
+        if not self._blocks:
+            atexit.register(self.release)
+        self._blocks.append(start)
+        self._free.extend(range(start, start + self.block_size))
+
+    def release(self):
+        '''
+        Give the reserved blocks back
+        '''
+        with self._lock:
+            if self._pid != os.getpid() or not self._blocks:
+                return
+            owned = set(self._blocks)
+
+            def release(blocks):
+                for start in owned:
+                    if blocks.get(start) == self._pid:
+                        del blocks[start]
+
+            try:
+                self._update_state(release)
+            except (IOError, OSError) as exc:
+                log.debug('Failed to release the reserved ports: %s', exc)
+            for usock in self._held.values():
+                usock.close()
+            self._reset()
+
+
+_ALLOCATOR = None
+_ALLOCATOR_LOCK = threading.Lock()
+
+# Whether get_unused_localhost_port() holds the ports it returns by default
+HOLD_PORTS = False
+
+
+def _get_allocator():
+    global _ALLOCATOR  # pylint: disable=global-statement
+    with _ALLOCATOR_LOCK:
+        if _ALLOCATOR is None:
+            _ALLOCATOR = PortAllocator()
+    return _ALLOCATOR
+
+
+def get_unused_localhost_port(hold=None):
+    '''
+    Return an unused port on localhost, which no other process got from this
+    function.
+
+    When ``hold`` is ``True``, or ``None`` and :data:`HOLD_PORTS` is ``True``, the
+    port is kept bound until it's passed to :func:`release_ports`.
+    '''
+    if not HAS_FCNTL:
+        return get_ephemeral_port()
+    if hold is None:
+        hold = HOLD_PORTS
+    allocator = _get_allocator()
+    try:
+        return allocator.get_port(hold=hold)
+    except (IOError, OSError) as exc:
+        # The state file might belong to another user, for example
+        log.warning('Failed to reserve ports in %s: %s', allocator.state_path, exc)
+        return get_ephemeral_port()
+
+
+def release_ports(ports):
+    '''
+    Stop holding ``ports``, the ones which were not held are ignored
+    '''
+    if _ALLOCATOR is not None:
+        _ALLOCATOR.release_ports(ports)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.skeleton
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Provision salt root directories from a prebuilt skeleton.
+
+Every salt root directory gets the same directory layout, the configuration
+directories, the state and pillar trees and the directories which
+``salt.utils.verify.verify_env`` creates for the daemons. The skeleton is built
+once, through ``verify_env`` itself, and its layout and permissions are then
+replayed for each new root directory, without checking what exists, who owns
+it and with which permissions, directory by directory.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import stat
+import logging
+
+log = logging.getLogger(__name__)
+
+# The directories in a salt root directory, relative to it
+CONFIG_DIRS = (
+    'conf',
+    'syndic-conf',
+)
+TREE_DIRS = (
+    os.path.join('integration-files', 'state-tree', 'base'),
+    os.path.join('integration-files', 'state-tree', 'prod'),
+    os.path.join('integration-files', 'pillar-tree', 'base'),
+    os.path.join('integration-files', 'pillar-tree', 'prod'),
+)
+PKI_DIR = 'pki'
+VERIFY_ENV_DIRS = (
+    os.path.join(PKI_DIR, 'minions'),
+    os.path.join(PKI_DIR, 'minions_pre'),
+    os.path.join(PKI_DIR, 'minions_rejected'),
+    os.path.join(PKI_DIR, 'accepted'),
+    os.path.join(PKI_DIR, 'rejected'),
+    os.path.join(PKI_DIR, 'pending'),
+    'logs',
+    'tokens',
+    '.salt-unix',
+    os.path.join('cache', 'jobs'),
+    os.path.join('cache', 'proc'),
+)
+
+
+class Skeleton(object):
+    '''
+    A directory tree which can be cloned
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        umask = os.umask(0)
+        os.umask(umask)
+        self._default_mode = 0o777 & ~umask
+        self._entries = []
+        for dirpath, dirnames, _ in os.walk(path):
+            dirnames.sort()
+            for dirname in dirnames:
+                fullpath = os.path.join(dirpath, dirname)
+                mode = stat.S_IMODE(os.lstat(fullpath).st_mode)
+                self._entries.append((os.path.relpath(fullpath, path), mode))
+
+    def clone(self, destination):
+        '''
+        Create ``destination``, which must not exist, with the same directories
+        and permissions as the skeleton
+        '''
+        os.mkdir(destination)
+        for relpath, mode in self._entries:
+            path = os.path.join(destination, relpath)
+            os.mkdir(path, mode)
+            if mode != self._default_mode:
+                # The umask got in the way
+                os.chmod(path, mode)
+        return destination
+
+
+def build(path, running_username):
+    '''
+    Build the salt root directory skeleton at ``path`` and return it
+    '''
+    # Late import
+    import salt.utils.verify as salt_verify
+
+    log.debug('Building the salt root directory skeleton at %s', path)
+    for relpath in CONFIG_DIRS + TREE_DIRS:
+        os.makedirs(os.path.join(path, relpath))
+    verify_env_entries = [os.path.join(path, relpath) for relpath in VERIFY_ENV_DIRS]
+    pki_dir = os.path.join(path, PKI_DIR)
+    try:
+        # Salt > v2017.7.x
+        salt_verify.verify_env(  # pylint: disable=unexpected-keyword-arg
+            verify_env_entries,
+            running_username,
+            sensitive_dirs=[pki_dir]
+        )
+    except TypeError:
+        # Salt <= v2017.7.x
+        salt_verify.verify_env(
+            verify_env_entries,
+            running_username,
+            pki_dir=pki_dir
+        )
+    return Skeleton(path)
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+'''
+pytestsalt.utils.zygote
+~~~~~~~~~~~~~~~~~~~~~~~
+
+Pre-forked Salt CLI interpreters.
+
+A zygote is a long lived process which loads one of the generated Salt CLI
+scripts, importing Salt and loading its configuration once, and then forks a
+child for each invocation, applying the passed argv, environment and working
+directory, and passing back the child's exit code. The caller's stdout and
+stderr pipes are handed to the zygote over a unix socket, so the child writes
+its output directly to them, just like a freshly executed script would.
+
+This module is also the zygote's entry point, hence why the server side
+only uses the standard library.
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+import os
+import sys
+import json
+import time
+import array
+import errno
+import atexit
+import select
+import signal
+import socket
+import logging
+import tempfile
+import traceback
+import subprocess
+
+log = logging.getLogger(__name__)
+
+ZYGOTE_START_TIMEOUT = 60
+# The scripts generated by pytestsalt.utils.cli_scripts define their entry points as
+ENTRY_POINT_NAMES = ('main', 'salt_main')
+# Two ints, the stdout and stderr file descriptors
+FDS_ANCILLARY_SIZE = socket.CMSG_LEN(2 * array.array('i').itemsize) if hasattr(socket, 'CMSG_LEN') else 0
+
+_ZYGOTES = {}
+
+
+def is_supported():
+    '''
+    Zygotes need fork and file descriptor passing over unix sockets
+    '''
+    return hasattr(os, 'fork') and hasattr(socket.socket, 'sendmsg')
+
+
+def get_zygote(script_path, environ, cwd, config_file=None):
+    '''
+    Return a running zygote for ``script_path`` and ``config_file``, starting it
+    if necessary, or restarting it if it was started with another environment
+    or working directory
+    '''
+    key = (script_path, config_file)
+    zygote = _ZYGOTES.get(key)
+    if zygote is not None and (zygote.environ != environ or zygote.cwd != cwd):
+        log.info('Restarting the Salt CLI zygote for %s, its environment or working directory changed',
+                 script_path)
+        zygote.terminate()
+        zygote = None
+    if zygote is None or not zygote.is_alive():
+        zygote = SaltCliZygote(script_path, environ, cwd, config_file=config_file)
+        zygote.start()
+        _ZYGOTES[key] = zygote
+    return zygote
+
+
+@atexit.register
+def terminate_zygotes():
+    '''
+    Terminate all started zygotes
+    '''
+    while _ZYGOTES:
+        _, zygote = _ZYGOTES.popitem()
+        zygote.terminate()
+
+
+class SaltCliZygote(object):
+    '''
+    Client side of a zygote process
+    '''
+
+    def __init__(self, script_path, environ, cwd, config_file=None):
+        self.script_path = script_path
+        self.environ = environ
+        self.cwd = cwd
+        self.config_file = config_file
+        self.socket_dir = None
+        self.socket_path = None
+        self._process = None
+
+    def start(self):
+        '''
+        Start the zygote and wait until it accepts connections
+        '''
+        self.socket_dir = tempfile.mkdtemp(prefix='pytest-salt-zygote-')
+        self.socket_path = os.path.join(self.socket_dir, 'zygote.sock')
+        cmdline = [sys.executable, os.path.abspath(__file__.replace('.pyc', '.py')),
+                   self.socket_path, self.script_path]
+        if self.config_file:
+            cmdline.append(self.config_file)
+        log.info('Starting Salt CLI zygote: %s', cmdline)
+        self._process = subprocess.Popen(cmdline, env=self.environ, cwd=self.cwd, close_fds=True)
+        expire = time.time() + ZYGOTE_START_TIMEOUT
+        interval = 0.005
+        while not os.path.exists(self.socket_path):
+            if self._process.poll() is not None:
+                raise RuntimeError(
+                    'The Salt CLI zygote for {} exited with code {}'.format(self.script_path,
+                                                                            self._process.returncode))
+            if time.time() > expire:
+                self.terminate()
+                raise RuntimeError('The Salt CLI zygote for {} failed to start'.format(self.script_path))
+            time.sleep(interval)
+            interval = min(interval * 2, 0.1)
+
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def spawn(self, argv, env, cwd):
+        '''
+        Fork a child running ``argv`` and return a :class:`ZygoteProcess` for it
+        '''
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            payload = json.dumps({'argv': argv, 'env': env, 'cwd': cwd}).encode('utf-8') + b'\n'
+            fds = array.array('i', [stdout_w, stderr_w])
+            sent = sock.sendmsg([payload], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds.tobytes())])
+            if sent < len(payload):
+                sock.sendall(payload[sent:])
+        except Exception:  # pylint: disable=broad-except
+            sock.close()
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise
+        finally:
+            # The child now owns the write ends of the pipes
+            os.close(stdout_w)
+            os.close(stderr_w)
+        return ZygoteProcess(sock, os.fdopen(stdout_r, 'rb'), os.fdopen(stderr_r, 'rb'))
+
+    def terminate(self):
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.terminate()
+                try:
+                    self._process.wait()
+                except OSError:
+                    pass
+            self._process = None
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self.socket_dir and os.path.isdir(self.socket_dir):
+            os.rmdir(self.socket_dir)
+
+
+class ZygoteProcess(object):
+    '''
+    A ``subprocess.Popen`` like object for a child forked by a zygote
+    '''
+
+    def __init__(self, sock, stdout, stderr):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._sock = sock
+        self._buffer = b''
+        self.pid = self._read_message(block=True)['pid']
+
+    def _read_message(self, block):
+        while b'\n' not in self._buffer:
+            if not block:
+                readable, _, _ = select.select([self._sock], [], [], 0)
+                if not readable:
+                    return None
+            chunk = self._sock.recv(4096)
+            if not chunk:
+                raise RuntimeError('Lost the connection to the Salt CLI zygote')
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return json.loads(line.decode('utf-8'))
+
+    def poll(self):
+        if self.returncode is None:
+            message = self._read_message(block=False)
+            if message is not None:
+                self.returncode = message['exitcode']
+                self._sock.close()
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            self.returncode = self._read_message(block=True)['exitcode']
+            self._sock.close()
+        return self.returncode
+
+
+def _load_entry_point(script_path, config_file):
+    import runpy
+    environ = dict(os.environ)
+    namespace = runpy.run_path(script_path, run_name='__pytestsalt_zygote__')
+    # The generated scripts may set environment variables, coverage's for
+    # example, which the children must keep
+    script_environ = dict(
+        (key, value) for (key, value) in os.environ.items() if environ.get(key) != value
+    )
+    for name in ENTRY_POINT_NAMES:
+        if name in namespace:
+            entry_point = namespace[name]
+            break
+    else:
+        raise RuntimeError('Could not find the entry point of {}'.format(script_path))
+
+    if config_file:
+        # Loading the configuration once imports everything it needs, and
+        # warms up any caches salt keeps along the way
+        try:
+            import salt.config
+            if os.path.basename(config_file) == 'minion':
+                salt.config.minion_config(config_file)
+            else:
+                salt.config.master_config(config_file)
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+    return entry_point, script_environ
+
+
+def _recv_request(conn):
+    data = b''
+    fds = []
+    while b'\n' not in data:
+        chunk, ancdata, _, _ = conn.recvmsg(65536, FDS_ANCILLARY_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        for level, kind, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                received = array.array('i')
+                received.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % received.itemsize)])
+                fds.extend(received)
+    return json.loads(data.decode('utf-8')), fds
+
+
+def _run_child(entry_point, script_environ, request, stdout_fd, stderr_fd):
+    exitcode = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in (devnull, stdout_fd, stderr_fd):
+            os.close(fd)
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        os.environ.update(script_environ)
+        sys.argv = request['argv']
+        try:
+            entry_point()
+            exitcode = 0
+        except SystemExit as exc:
+            # Same semantics as the interpreter exiting
+            exitcode = exc.code
+            if exitcode is None:
+                exitcode = 0
+            elif not isinstance(exitcode, int):
+                sys.stderr.write('{}\n'.format(exitcode))
+                exitcode = 1
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+            exitcode = 1
+        # Run the exit functions a freshly executed script would
+        atexit._run_exitfuncs()  # pylint: disable=protected-access
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exitcode)  # pylint: disable=protected-access
+
+
+def serve(socket_path, script_path, config_file=None):
+    '''
+    The zygote main loop
+    '''
+    entry_point, script_environ = _load_entry_point(script_path, config_file)
+    parent_pid = os.getppid()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path + '.tmp')
+    server.listen(128)
+    # Only let clients connect once we're ready
+    os.rename(socket_path + '.tmp', socket_path)
+
+    # Late import, not available on windows
+    import fcntl
+
+    # Wake up as soon as a child exits
+    wakeup_r, wakeup_w = os.pipe()
+    for fd in (wakeup_r, wakeup_w):
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    running = {}
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    while not stopping and os.getppid() == parent_pid:
+        try:
+            readable, _, _ = select.select([server, wakeup_r], [], [], 0.5)
+        except (select.error, OSError) as exc:
+            if exc.args[0] != errno.EINTR:
+                raise
+            readable = []
+        if wakeup_r in readable:
+            try:
+                while os.read(wakeup_r, 4096):
+                    pass
+            except OSError:
+                pass
+        if server in readable:
+            conn, _ = server.accept()
+            try:
+                request, (stdout_fd, stderr_fd) = _recv_request(conn)
+            except (ValueError, OSError):
+                traceback.print_exc()
+                conn.close()
+                continue
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                conn.close()
+                os.close(wakeup_r)
+                os.close(wakeup_w)
+                for other in running.values():
+                    other.close()
+                _run_child(entry_point, script_environ, request, stdout_fd, stderr_fd)
+            os.close(stdout_fd)
+            os.close(stderr_fd)
+            conn.sendall(json.dumps({'pid': pid}).encode('utf-8') + b'\n')
+            running[pid] = conn
+
+        while running:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as exc:
+                if exc.errno != errno.ECHILD:
+                    raise
+                break
+            if pid == 0:
+                break
+            if os.WIFSIGNALED(status):
+                exitcode = -os.WTERMSIG(status)
+            else:
+                exitcode = os.WEXITSTATUS(status)
+            conn = running.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.sendall(json.dumps({'exitcode': exitcode}).encode('utf-8') + b'\n')
+                except socket.error:
+                    pass
+                conn.close()
+    server.close()
+
+
+if __name__ == '__main__':
+    serve(*sys.argv[1:])
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+'''
+    test_config_cache.py
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Test the pytest salt plugin configuration cache
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import config_cache
+
+
+class FakeLoader(object):
+    '''
+    Load the options the way salt does, relative paths are joined to the root
+    directory and some options are derived from others
+    '''
+
+    def __init__(self, derive_from_id=False):
+        self.written = {}
+        self.loads = 0
+        self.derive_from_id = derive_from_id
+
+    def __call__(self, config_file):
+        self.loads += 1
+        return self.load(config_file)
+
+    def load(self, config_file):
+        options = dict(self.written[config_file])
+        options['pki_dir'] = os.path.join(options['root_dir'], options['pki_dir'])
+        options['conf_file'] = config_file
+        options['master_uri'] = 'tcp://127.0.0.1:{}'.format(options['ret_port'])
+        # A default which happens to be in the ports range
+        options['salt_event_pub_hwm'] = 20000
+        if self.derive_from_id:
+            options['derived'] = options['id'] + '0'
+        return options
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    config_cache.clear()
+    yield
+    config_cache.clear()
+
+
+def _load(loader, tmpdir, idx):
+    root_dir = tmpdir.join('root-{}'.format(idx)).strpath
+    config_file = tmpdir.join('conf-{}'.format(idx), 'master').strpath
+    port = 20000 + idx
+    options = {'root_dir': root_dir, 'pki_dir': 'pki', 'ret_port': port, 'id': 'master-{}'.format(idx)}
+    loader.written[config_file] = options
+    variables = {'root_dir': root_dir,
+                 'config_dir': os.path.dirname(config_file),
+                 'master_id': options['id'],
+                 'return_port': port}
+    return config_cache.load_config(loader, config_file, options, variables), loader.load(config_file)
+
+
+def test_cache_hit(tmpdir):
+    loader = FakeLoader()
+    for idx in range(5):
+        cached, expected = _load(loader, tmpdir, idx)
+        assert cached == expected
+    # The second load verifies the cached options
+    assert loader.loads == 2
+
+
+def test_not_cached_when_values_are_not_replaced(tmpdir):
+    loader = FakeLoader(derive_from_id=True)
+    for idx in range(5):
+        cached, expected = _load(loader, tmpdir, idx)
+        assert cached == expected
+    assert loader.loads == 5
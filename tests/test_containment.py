@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+'''
+    test_containment.py
+    ~~~~~~~~~~~~~~~~~~~
+
+    Test keeping track of a daemon and all of its descendants
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import errno
+import subprocess
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import containment
+from pytestsalt.utils import start_daemon
+from pytestsalt.utils import SaltDaemonScriptBase
+
+pytestmark = pytest.mark.skipif(not containment.is_supported(), reason='Process groups are not supported')
+
+# Starts a grandchild and prints its pid
+SCRIPT = 'sleep 60 & echo $!; wait'
+
+
+def _start(container):
+    process = subprocess.Popen(['sh', '-c', SCRIPT], stdout=subprocess.PIPE, **container.popen_kwargs())
+    container.attach(process)
+    grandchild = int(process.stdout.readline())
+    process.stdout.close()
+    return process, grandchild
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        if exc.errno == errno.ESRCH:
+            return False
+        raise
+    # Once killed, it might take a little while for init to reap it
+    with open('/proc/{}/stat'.format(pid)) as rfh:
+        return rfh.read().rsplit(')', 1)[1].split()[0] != 'Z'
+
+
+def test_popen_kwargs_new_session():
+    container = containment.ProcessContainer('test', use_cgroup=False)
+    process, grandchild = _start(container)
+    try:
+        assert container.cgroup_path is None
+        assert os.getsid(process.pid) == process.pid
+        assert os.getpgid(process.pid) == process.pid
+        # The grandchild stays in the process group
+        assert os.getpgid(grandchild) == process.pid
+        assert not container.is_empty()
+    finally:
+        container.terminate()
+
+
+@pytest.mark.parametrize('slow_stop', (True, False))
+def test_terminate(slow_stop):
+    container = containment.ProcessContainer('test', use_cgroup=False)
+    process, grandchild = _start(container)
+    container.terminate(slow_stop=slow_stop)
+    assert process.poll() is not None
+    assert container.is_empty()
+    assert container.wait(5)
+    assert not _is_running(grandchild)
+    # Terminating again is fine
+    container.terminate()
+
+
+def test_cgroup_fallback_to_process_group(tmpdir, monkeypatch):
+    # A cgroup which can't be joined
+    monkeypatch.setattr(containment.ProcessContainer, '_create_cgroup',
+                        lambda self: tmpdir.join('missing').strpath)
+    container = containment.ProcessContainer('test')
+    process, grandchild = _start(container)
+    try:
+        assert container.cgroup_path is None
+        assert os.getpgid(grandchild) == process.pid
+    finally:
+        container.terminate()
+    assert process.poll() is not None
+    assert not _is_running(grandchild)
+
+
+class FakeRequest(object):
+
+    def __init__(self):
+        self.finalizers = []
+
+    def addfinalizer(self, finalizer):
+        self.finalizers.append(finalizer)
+
+
+class DaemonizingScript(SaltDaemonScriptBase):
+    '''
+    Runs a script which leaves a daemonized grandchild behind
+    '''
+
+    def get_script_path(self, script_name):
+        return os.path.join(self.config_dir, script_name)
+
+
+def test_start_daemon_finalizer_stops_grandchildren(tmpdir):
+    pidfile = tmpdir.join('grandchild.pid')
+    script = tmpdir.join('daemon')
+    # The subshell exits right away, re-parenting the grandchild to init
+    script.write('#!/bin/sh\n(sleep 60 & echo $! > {}.tmp; mv {}.tmp {})\nexec sleep 60\n'.format(
+        pidfile.strpath, pidfile.strpath, pidfile.strpath))
+    script.chmod(0o755)
+    request = FakeRequest()
+    daemon = start_daemon(request,
+                          daemon_name='daemon',
+                          daemon_id='daemon',
+                          daemon_log_prefix='daemon',
+                          daemon_cli_script_name='daemon',
+                          daemon_config={},
+                          daemon_config_dir=tmpdir.strpath,
+                          daemon_class=DaemonizingScript,
+                          bin_dir_path=tmpdir.strpath,
+                          fail_hard=True,
+                          slow_stop=False,
+                          readiness='ports')
+    assert daemon.is_alive()
+    expire = time.time() + 10
+    while not pidfile.check() and time.time() < expire:
+        time.sleep(0.05)
+    grandchild = int(pidfile.read())
+    assert _is_running(grandchild)
+    assert len(request.finalizers) == 1
+    request.finalizers[0]()
+    # Killed, but it might take a little while for the signal to be delivered
+    expire = time.time() + 5
+    while _is_running(grandchild) and time.time() < expire:
+        time.sleep(0.05)
+    assert not _is_running(grandchild)
+    assert daemon._container.cgroup_path is None
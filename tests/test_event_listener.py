@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+'''
+    test_event_listener.py
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Test the salt master event bus listener
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import re
+import time
+import threading
+
+# Import pytest-salt libs
+from pytestsalt.fixtures.daemons import SaltMaster
+from pytestsalt.utils import EventListener
+from pytestsalt.utils import EventMatcher
+from pytestsalt.utils import get_event_listener
+from pytestsalt.utils import start_daemon
+
+
+class SlowEventListener(EventListener):
+    '''
+    Takes a while to subscribe to the event bus, which is never read from
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(SlowEventListener, self).__init__(*args, **kwargs)
+        self.subscribed = threading.Event()
+        self.runs = 0
+
+    def _run(self, started, errors):
+        self.runs += 1
+        time.sleep(0.2)
+        self.subscribed.set()
+        started.set()
+        self._stop.wait()
+
+
+def test_concurrent_start():
+    event_listener = SlowEventListener('/nonexistent', 'test')
+    barrier = threading.Event()
+    subscribed = []
+
+    def start():
+        barrier.wait()
+        event_listener.start()
+        subscribed.append(event_listener.subscribed.is_set())
+
+    threads = [threading.Thread(target=start) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    barrier.set()
+    for thread in threads:
+        thread.join(10)
+    try:
+        # No caller returned before the subscription was made
+        assert subscribed == [True] * 5
+        assert event_listener.runs == 1
+    finally:
+        event_listener.terminate()
+
+
+def test_matcher_exact_tag():
+    matcher = EventMatcher()
+    matcher.add('salt/auth', 1)
+    assert matcher.match('salt/auth') == [('salt/auth', 1)]
+    assert matcher.match('salt/aut') == []
+    assert matcher.match('salt/auth/more') == []
+
+
+def test_matcher_glob():
+    matcher = EventMatcher()
+    matcher.add('salt/job/*/ret/minion', 1)
+    assert matcher.match('salt/job/20170101/ret/minion') == [('salt/job/*/ret/minion', 1)]
+    assert matcher.match('salt/job/20170101/ret/other') == []
+    assert matcher.match('salt/job') == []
+
+
+def test_matcher_regex():
+    pattern = re.compile(r'salt/minion/[^/]+/start$')
+    matcher = EventMatcher()
+    matcher.add(pattern, 1)
+    assert matcher.match('salt/minion/minion-1/start') == [(pattern, 1)]
+    assert matcher.match('salt/minion/minion-1/start/more') == []
+
+
+def test_matcher_overlapping_patterns():
+    matcher = EventMatcher()
+    matcher.add('salt/job/1/ret/minion', 1)
+    matcher.add('salt/job/*', 2)
+    matcher.add('salt/*/1/ret/*', 3)
+    matcher.add('salt/job/*', 4)
+    assert sorted(matcher.match('salt/job/1/ret/minion')) == [
+        ('salt/*/1/ret/*', 3),
+        ('salt/job/*', 2),
+        ('salt/job/*', 4),
+        ('salt/job/1/ret/minion', 1),
+    ]
+    assert sorted(matcher.match('salt/job/2/ret/minion')) == [('salt/job/*', 2), ('salt/job/*', 4)]
+
+
+def test_matcher_remove():
+    matcher = EventMatcher()
+    matcher.add('salt/auth', 1)
+    matcher.add('salt/job/*', 1)
+    matcher.add('salt/job/*', 2)
+    matcher.remove('salt/job/*', 1)
+    assert matcher.match('salt/job/1') == [('salt/job/*', 2)]
+    matcher.remove('salt/job/*', 2)
+    matcher.remove('salt/auth', 1)
+    assert matcher.match('salt/job/1') == []
+    assert matcher.match('salt/auth') == []
+    # Nothing is left behind once every pattern was removed
+    assert matcher._exact == {}
+    assert matcher._trie == {}
+    # Removing what isn't there is not an error
+    matcher.remove('salt/job/*', 1)
+    matcher.remove('salt/auth', 1)
+
+
+class FakeRequest(object):
+
+    def __init__(self):
+        self.finalizers = []
+
+    def addfinalizer(self, finalizer):
+        self.finalizers.append(finalizer)
+
+
+class FakeMaster(SaltMaster):
+    '''
+    Runs a script standing in for the salt-master
+    '''
+
+    def get_script_path(self, script_name):
+        return os.path.join(self.config_dir, script_name)
+
+    def get_check_events(self):
+        return set()
+
+
+def _run(self, started, errors):  # pylint: disable=unused-argument
+    # Never actually subscribes to the event bus
+    started.set()
+    self._stop.wait()
+
+
+def test_restarted_master_gets_fresh_event_listener(tmpdir, monkeypatch):
+    monkeypatch.setattr(EventListener, '_run', _run)
+    script = tmpdir.join('salt-master')
+    script.write('#!/bin/sh\nexec sleep 60\n')
+    script.chmod(0o755)
+    conf_dir = tmpdir.strpath
+    listeners = []
+    for _ in range(2):
+        request = FakeRequest()
+        start_daemon(request,
+                     daemon_name='salt-master',
+                     daemon_id='master',
+                     daemon_log_prefix='salt-master',
+                     daemon_cli_script_name='salt-master',
+                     daemon_config={},
+                     daemon_config_dir=conf_dir,
+                     daemon_class=FakeMaster,
+                     bin_dir_path=conf_dir,
+                     fail_hard=True,
+                     slow_stop=False,
+                     readiness='ports')
+        # What the minions waiting for their start event would do
+        event_listener = get_event_listener(conf_dir, 'salt-master')
+        assert not event_listener._history
+        event_listener._dispatch({'tag': 'salt/minion/minion/start', 'data': {}})
+        listeners.append(event_listener)
+        for finalizer in request.finalizers:
+            finalizer()
+        # Released, and no longer listening, once the master is stopped
+        assert event_listener._thread is None
+    assert listeners[0] is not listeners[1]
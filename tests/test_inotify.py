@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+'''
+    test_inotify.py
+    ~~~~~~~~~~~~~~~
+
+    Test waiting for paths to be created
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import threading
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import inotify
+
+
+def _create_later(paths, delay=0.2):
+    def create():
+        time.sleep(delay)
+        for path in paths:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w'):
+                pass
+
+    thread = threading.Thread(target=create)
+    thread.start()
+    return thread
+
+
+@pytest.fixture(params=('inotify', 'polling'))
+def backend(request, monkeypatch):
+    if request.param == 'inotify':
+        if not inotify.HAS_INOTIFY:
+            pytest.skip('inotify is not available')
+    else:
+        monkeypatch.setattr(inotify, 'HAS_INOTIFY', False)
+    return request.param
+
+
+def test_paths_created_after_start(tmpdir, backend):  # pylint: disable=redefined-outer-name
+    paths = [
+        tmpdir.join('pidfile').strpath,
+        # The parent directories are created later too
+        tmpdir.join('run', 'sockets', 'publish_pull.ipc').strpath,
+    ]
+    with inotify.PathsWatcher(paths) as watcher:
+        assert (watcher._fd is not None) is (backend == 'inotify')
+        thread = _create_later(paths)
+        start = time.time()
+        assert watcher.wait(10) == set()
+        assert time.time() - start < 5
+    thread.join()
+
+
+def test_missing_paths_reported(tmpdir, backend):  # pylint: disable=unused-argument,redefined-outer-name
+    existing = tmpdir.join('existing')
+    existing.write('')
+    missing = tmpdir.join('missing').strpath
+    with inotify.PathsWatcher([existing.strpath, missing]) as watcher:
+        assert watcher.wait(0.2) == {missing}
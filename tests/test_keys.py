@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+'''
+    test_keys.py
+    ~~~~~~~~~~~~
+
+    Test the pytest salt plugin pre-generated keypairs pool
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import stat
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import keys
+
+
+def test_install_keypair(tmpdir):
+    pki_dirs = [tmpdir.mkdir('pki-{}'.format(idx)) for idx in range(2)]
+    for pki_dir in pki_dirs:
+        assert keys.install_keypair('minion', pki_dir.strpath, 2048) == pki_dir.join('minion.pub').strpath
+        assert stat.S_IMODE(os.stat(pki_dir.join('minion.pem').strpath).st_mode) == 0o400
+    # Different daemons get different keys
+    assert pki_dirs[0].join('minion.pub').read() != pki_dirs[1].join('minion.pub').read()
+    # Existing keys are left alone
+    assert keys.install_keypair('minion', pki_dirs[0].strpath, 2048) is None
+
+
+@pytest.mark.parametrize('pool_size', ('four', '-1'))
+def test_invalid_key_pool_size(testdir, pool_size):
+    testdir.makeini('''
+        [pytest]
+        salt_key_pool_size = {}
+    '''.format(pool_size))
+    testdir.makepyfile('''
+        def test_nothing():
+            pass
+    ''')
+    result = testdir.runpytest()
+    assert result.ret != 0
+    result.stderr.fnmatch_lines([
+        '*The key pool size must be a positive integer, or 0 to disable it, not {!r}*'.format(pool_size),
+    ])
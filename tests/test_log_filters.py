@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+    test_log_filters.py
+    ~~~~~~~~~~~~~~~~~~~
+
+    Test the log records filtering pushed down to the salt daemons
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import logging
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.fixtures.log import get_logger_filters
+from pytestsalt.salt.log_handlers.pytest_log_handler import LoggerLevelsFilter
+
+
+@pytest.fixture
+def logger_filters():
+    muted = logging.getLogger('pytestsalt-test.muted')
+    muted.propagate = False
+    muted.addHandler(logging.NullHandler())
+    muted.handlers[0].setLevel(logging.CRITICAL)
+    disabled = logging.getLogger('pytestsalt-test.disabled')
+    disabled.disabled = True
+    loud = logging.getLogger('pytestsalt-test.muted.loud')
+    loud.propagate = False
+    loud.addHandler(logging.NullHandler())
+    # Computed right away, pytest's own log capturing handlers are attached to the
+    # loggers which don't propagate at the start of each test phase
+    yield get_logger_filters('warning')
+    for logger in (muted, disabled, loud):
+        logger.propagate = True
+        logger.disabled = False
+        del logger.handlers[:]
+
+
+def _record(name, level):
+    return logging.makeLogRecord({'name': name, 'levelno': level})
+
+
+def test_get_logger_filters(logger_filters):  # pylint: disable=redefined-outer-name
+    assert logger_filters['levels']['pytestsalt-test.muted'] == logging.CRITICAL
+    # Back to the level every logger gets, under a logger with a higher one
+    assert logger_filters['levels']['pytestsalt-test.muted.loud'] == logging.WARNING
+    assert 'pytestsalt-test' not in logger_filters['levels']
+    assert 'pytestsalt-test.disabled' in logger_filters['disabled']
+
+
+def test_logger_levels_filter(logger_filters):  # pylint: disable=redefined-outer-name
+    log_filter = LoggerLevelsFilter(logger_filters['levels'], logger_filters['disabled'])
+    assert not log_filter.filter(_record('pytestsalt-test.muted', logging.ERROR))
+    assert log_filter.filter(_record('pytestsalt-test.muted', logging.CRITICAL))
+    # Child loggers which only exist in the salt daemons
+    assert not log_filter.filter(_record('pytestsalt-test.muted.child', logging.ERROR))
+    assert log_filter.filter(_record('pytestsalt-test.muted.loud.child', logging.ERROR))
+    assert not log_filter.filter(_record('pytestsalt-test.disabled', logging.CRITICAL))
+    assert log_filter.filter(_record('pytestsalt-test.disabled.child', logging.ERROR))
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+'''
+    test_log_handler.py
+    ~~~~~~~~~~~~~~~~~~~
+
+    Test the log handler the salt daemons send their log records with
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import time
+import logging
+import threading
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.salt.log_handlers import pytest_log_handler
+from pytestsalt.salt.log_handlers.pytest_log_handler import PytestLogHandler
+from pytestsalt.salt.log_handlers.pytest_log_handler import RecordsBuffer
+from pytestsalt.utils import log_ring
+
+
+def _fill(records_buffer, levels):
+    for idx, levelno in enumerate(levels):
+        records_buffer.put(levelno, str(idx).encode())
+
+
+def test_drop_oldest():
+    records_buffer = RecordsBuffer(3, 'drop-oldest')
+    _fill(records_buffer, [logging.ERROR] * 5)
+    assert records_buffer.get() == [b'2', b'3', b'4']
+    assert records_buffer.dropped == 2
+
+
+def test_drop_debug_first():
+    records_buffer = RecordsBuffer(3, 'drop-debug-first')
+    _fill(records_buffer, [logging.DEBUG, logging.ERROR, logging.DEBUG, logging.ERROR, logging.ERROR])
+    assert records_buffer.get() == [b'1', b'3', b'4']
+    assert records_buffer.dropped == 2
+    # Without debug log records to drop, the oldest go
+    _fill(records_buffer, [logging.ERROR] * 4)
+    assert records_buffer.get() == [b'1', b'2', b'3']
+    assert records_buffer.dropped == 3
+
+
+def test_block():
+    records_buffer = RecordsBuffer(2, 'block')
+    _fill(records_buffer, [logging.ERROR] * 2)
+    producer = threading.Thread(target=records_buffer.put, args=(logging.ERROR, b'2'))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert records_buffer.get() == [b'0', b'1']
+    producer.join(5)
+    assert not producer.is_alive()
+    assert records_buffer.get() == [b'2']
+    assert records_buffer.dropped == 0
+
+
+def test_take_dropped():
+    records_buffer = RecordsBuffer(2, 'drop-oldest')
+    _fill(records_buffer, [logging.ERROR] * 4)
+    assert records_buffer.take_dropped() == 2
+    assert records_buffer.take_dropped() == 0
+    _fill(records_buffer, [logging.ERROR])
+    assert records_buffer.take_dropped() == 1
+    assert records_buffer.dropped == 3
+
+
+def test_dropped_reported_on_flush(monkeypatch):
+    sent = []
+    monkeypatch.setattr(pytest_log_handler, '_get_sender', lambda *address: sent.append)
+    records_buffer = RecordsBuffer(2, 'drop-oldest')
+    _fill(records_buffer, [logging.ERROR] * 4)
+    sender = threading.Thread(target=pytest_log_handler.process_buffer,
+                              args=((None, None, None), records_buffer, lambda count: b'dropped %d' % count))
+    sender.start()
+    try:
+        # Without the handler being closed
+        expire = time.time() + 5
+        while len(sent) < 2 and time.time() < expire:
+            time.sleep(0.01)
+        assert sent == [[b'2', b'3'], [b'dropped 2']]
+        # Only reported once
+        records_buffer.put(logging.ERROR, b'4')
+        expire = time.time() + 5
+        while len(sent) < 3 and time.time() < expire:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert sent[2:] == [[b'4']]
+    finally:
+        records_buffer.close()
+        sender.join(5)
+    assert not sender.is_alive()
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        RecordsBuffer(2, 'drop-newest')
+
+
+def test_handler(tmpdir):
+    consumer = log_ring.RingConsumer(tmpdir.strpath)
+    handled = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            handled.append(record.getMessage())
+
+    receiver = Handler()
+    logging.getLogger().addHandler(receiver)
+    try:
+        handler = PytestLogHandler('prefix', (None, None, tmpdir.strpath))
+        for idx in range(2):
+            handler.handle(logging.makeLogRecord({'name': 'pytestsalt-test', 'msg': 'message %d',
+                                                  'args': (idx,), 'levelno': logging.ERROR}))
+        handler._buffer.dropped = 3
+        handler.close()
+    finally:
+        consumer.stop()
+        logging.getLogger().removeHandler(receiver)
+    handled = [message for message in handled if message.startswith('[prefix] ')]
+    reports = [message for message in handled if 'log records were dropped' in message]
+    assert [message for message in handled if message not in reports] == ['[prefix] message 0',
+                                                                          '[prefix] message 1']
+    # The dropped log records are reported once, by the thread sending the log records or
+    # when the handler is closed
+    assert len(reports) == 1
+    assert reports[0].startswith('[prefix] 3 log records were dropped')
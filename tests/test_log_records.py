@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+'''
+    test_log_records.py
+    ~~~~~~~~~~~~~~~~~~~
+
+    Test reading the log records the salt daemons send and handling them
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import logging
+import threading
+
+# Import pytest libs
+import pytest
+
+# Import 3rd-party libs
+import msgpack
+
+# Import pytest-salt libs
+from pytestsalt.utils import log_records
+
+
+def _records(count, start=0):
+    return [{'name': 'pytestsalt-test.records', 'msg': 'message {}'.format(idx), 'levelno': logging.ERROR}
+            for idx in range(start, start + count)]
+
+
+class BlockingHandler(logging.Handler):
+    '''
+    Collects the messages of the log records it handles, once ``release`` is set
+    '''
+
+    def __init__(self):
+        super(BlockingHandler, self).__init__()
+        self.handling = threading.Event()
+        self.release = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.handling.set()
+        self.release.wait(10)
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def handler():
+    logger = logging.getLogger('pytestsalt-test.records')
+    blocking_handler = BlockingHandler()
+    logger.addHandler(blocking_handler)
+    yield blocking_handler
+    blocking_handler.release.set()
+    logger.removeHandler(blocking_handler)
+
+
+def test_read_size():
+    read_size = log_records.ReadSize()
+    assert read_size.size == log_records.MIN_READ_SIZE
+    # Grows while the reads are filled, up to the maximum
+    sizes = []
+    for _ in range(20):
+        read_size.update(read_size.size)
+        sizes.append(read_size.size)
+    assert sizes[0] == log_records.MIN_READ_SIZE * 2
+    assert sizes[-1] == log_records.MAX_READ_SIZE
+    # Partially filled reads don't change it
+    read_size.update(log_records.MAX_READ_SIZE // 2)
+    assert read_size.size == log_records.MAX_READ_SIZE
+    # Shrinks when the reads are mostly empty, down to the minimum
+    read_size.update(1)
+    assert read_size.size == log_records.MAX_READ_SIZE // 2
+    for _ in range(20):
+        read_size.update(1)
+    assert read_size.size == log_records.MIN_READ_SIZE
+
+
+def test_unpack_split_record():
+    records = _records(3)
+    wire_bytes = b''.join(msgpack.packb(record) for record in records)
+    unpacker = log_records.RecordsUnpacker('test')
+    split = len(msgpack.packb(records[0])) + 5
+    assert unpacker.feed(wire_bytes[:split]) == records[:1]
+    assert unpacker.feed(wire_bytes[split:split + 1]) == []
+    assert unpacker.feed(wire_bytes[split + 1:]) == records[1:]
+
+
+def test_unpack_buffer_full(monkeypatch, caplog):
+    monkeypatch.setattr(log_records, 'MAX_BUFFER_SIZE', 1024)
+    unpacker = log_records.RecordsUnpacker('test')
+    huge = dict(_records(1)[0], msg='x' * 2048)
+    with caplog.at_level(logging.ERROR, logger=log_records.__name__):
+        assert unpacker.feed(msgpack.packb(huge)) == []
+    assert 'A log record from test is over 1024 bytes' in caplog.text
+    # The log records which follow are still unpacked
+    records = _records(2)
+    assert unpacker.feed(b''.join(msgpack.packb(record) for record in records)) == records
+
+
+def test_dispatch_backpressure(monkeypatch, handler):  # pylint: disable=redefined-outer-name
+    monkeypatch.setattr(log_records, 'MAX_PENDING_BATCHES', 2)
+    dispatcher = log_records.RecordDispatcher()
+    try:
+        assert dispatcher.dispatch(_records(1)) is True
+        # The dispatcher thread is now stuck handling the first batch
+        assert handler.handling.wait(10)
+        assert dispatcher.dispatch(_records(1, 1)) is True
+        assert dispatcher.dispatch(_records(1, 2)) is True
+        assert dispatcher.dispatch(_records(1, 3)) is False
+    finally:
+        handler.release.set()
+        dispatcher.stop()
+    assert handler.messages == ['message 0', 'message 1', 'message 2']
+
+
+def test_stop_drains_queue(handler):  # pylint: disable=redefined-outer-name
+    dispatcher = log_records.RecordDispatcher()
+    for idx in range(5):
+        assert dispatcher.dispatch(_records(2, idx * 2)) is True
+    assert handler.handling.wait(10)
+    handler.release.set()
+    dispatcher.stop()
+    assert handler.messages == [record['msg'] for record in _records(10)]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+'''
+    test_log_ring.py
+    ~~~~~~~~~~~~~~~~
+
+    Test the shared memory ring buffers the salt daemons write their log records to
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import time
+import logging
+
+# Import pytest libs
+import pytest
+
+# Import 3rd-party libs
+import msgpack
+
+# Import pytest-salt libs
+from pytestsalt.salt.log_handlers.pytest_log_handler import RingWriter
+from pytestsalt.utils import log_ring
+
+
+def _records(count, start=0):
+    return [{'name': 'ring', 'msg': 'message {}'.format(idx), 'levelno': logging.ERROR}
+            for idx in range(start, start + count)]
+
+
+def test_write_and_read(tmpdir):
+    path = tmpdir.join('{}.ring'.format(os.getpid())).strpath
+    writer = RingWriter(path, capacity=4096)
+    reader = log_ring.RingReader(path)
+    assert reader.pid == os.getpid()
+    assert reader.read() == []
+    # Enough records for the frames to wrap around the end of the ring buffer a few times
+    for batch in range(10):
+        records = _records(30, batch * 30)
+        writer.write([msgpack.packb(record) for record in records])
+        assert reader.read() == records
+    reader.close()
+    writer.close()
+
+
+def test_writer_waits_for_room(tmpdir):
+    path = tmpdir.join('{}.ring'.format(os.getpid())).strpath
+    writer = RingWriter(path, capacity=1024)
+    reader = log_ring.RingReader(path)
+    records = _records(100)
+    read = []
+    reserve = writer._reserve
+
+    def _reserve(size):
+        # The writer only makes progress when the reader does, which is this thread
+        writer._publish()
+        read.extend(reader.read())
+        reserve(size)
+
+    writer._reserve = _reserve
+    writer.write([msgpack.packb(record) for record in records])
+    read.extend(reader.read())
+    assert read == records
+    reader.close()
+    writer.close()
+
+
+def test_reader_ignores_incomplete_files(tmpdir):
+    path = tmpdir.join('1.ring')
+    path.write('')
+    with pytest.raises(ValueError):
+        log_ring.RingReader(path.strpath)
+    path.write(b'\x00' * 4096, mode='wb')
+    with pytest.raises(ValueError):
+        log_ring.RingReader(path.strpath)
+
+
+def test_consumer(tmpdir):
+    handled = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            handled.append(record.getMessage())
+
+    logger = logging.getLogger('ring')
+    handler = Handler()
+    logger.addHandler(handler)
+    consumer = log_ring.RingConsumer(tmpdir.strpath)
+    try:
+        writer = RingWriter(tmpdir.join('{}.ring'.format(os.getpid())).strpath)
+        records = _records(50)
+        writer.write([msgpack.packb(record) for record in records])
+        timeout = time.time() + 10
+        while len(handled) < len(records) and time.time() < timeout:
+            time.sleep(0.05)
+        writer.close()
+    finally:
+        consumer.stop()
+        logger.removeHandler(handler)
+    assert handled == [record['msg'] for record in records]
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+'''
+    test_log_server.py
+    ~~~~~~~~~~~~~~~~~~
+
+    Test the servers receiving the log records of the salt daemons
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import sys
+import time
+import socket
+import logging
+
+# Import pytest libs
+import pytest
+
+# Import 3rd-party libs
+import msgpack
+
+# Import pytest-salt libs
+from pytestsalt.fixtures.log import get_log_server
+
+
+def _get_unused_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _connect(port, timeout=10):
+    expire = time.time() + timeout
+    while True:
+        try:
+            return socket.create_connection(('127.0.0.1', port))
+        except socket.error:
+            if time.time() > expire:
+                raise
+            time.sleep(0.05)
+
+
+@pytest.mark.parametrize('backend', (
+    'tornado',
+    pytest.param('asyncio', marks=pytest.mark.skipif(sys.version_info < (3, 5),
+                                                     reason='The asyncio backend requires Python >= 3.5')),
+))
+def test_log_server(backend):
+    name = 'pytestsalt-test.log-server.{}'.format(backend)
+    handled = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            handled.append(record.getMessage())
+
+    logger = logging.getLogger(name)
+    handler = Handler()
+    logger.addHandler(handler)
+    try:
+        port = _get_unused_port()
+        get_log_server(backend)(port)
+        records = [{'name': name, 'msg': 'message {}'.format(idx), 'levelno': logging.ERROR}
+                   for idx in range(100)]
+        sock = _connect(port)
+        try:
+            sock.sendall(b''.join(msgpack.packb(record) for record in records))
+        finally:
+            sock.close()
+        expire = time.time() + 10
+        while len(handled) < len(records) and time.time() < expire:
+            time.sleep(0.05)
+    finally:
+        logger.removeHandler(handler)
+    assert handled == [record['msg'] for record in records]
+
+
+def test_unknown_log_server_backend():
+    with pytest.raises(pytest.fail.Exception, match='Unknown log server backend'):
+        get_log_server('twisted')
+
+
+@pytest.mark.parametrize('args,expected', (
+    ((), 'asyncio'),
+    (('--salt-log-server-backend=tornado',), 'tornado'),
+))
+def test_log_server_backend_option(testdir, args, expected):
+    testdir.makeini('''
+        [pytest]
+        salt_log_server_backend = asyncio
+    ''')
+    testdir.makepyfile('''
+        def test_backend(_salt_log_server_backend):
+            assert _salt_log_server_backend == {!r}
+    '''.format(expected))
+    result = testdir.runpytest(*args)
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+'''
+    test_output_pump.py
+    ~~~~~~~~~~~~~~~~~~~
+
+    Test consuming the output of the Salt CLI scripts
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import sys
+import time
+import subprocess
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+import pytestsalt.utils
+from pytestsalt.utils import ProcessOutputPump
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith('win'), reason='Windows pipes are not selectable')
+
+# Writes 4MB to stdout and stderr, in interleaved chunks of different sizes
+INTERLEAVED = '''
+import sys
+out = getattr(sys.stdout, 'buffer', sys.stdout)
+err = getattr(sys.stderr, 'buffer', sys.stderr)
+for idx in range(1024):
+    out.write(b'o' * 4096)
+    err.write(b'e' * 4095 + b'\\n')
+    if idx % 7 == 0:
+        out.flush()
+        err.flush()
+'''
+
+
+@pytest.fixture(params=('selectors', 'select'))
+def backend(request, monkeypatch):
+    if request.param == 'selectors':
+        if not pytestsalt.utils.HAS_SELECTORS:
+            pytest.skip('selectors is not available')
+    else:
+        monkeypatch.setattr(pytestsalt.utils, 'HAS_SELECTORS', False)
+    return request.param
+
+
+def _popen(code):
+    return subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def test_interleaved_output(backend):  # pylint: disable=unused-argument,redefined-outer-name
+    terminal = _popen(INTERLEAVED)
+    pump = ProcessOutputPump(terminal)
+    timeout_expire = time.time() + 30
+    assert pump.run(timeout_expire) is True
+    assert pump.wait(timeout_expire) is True
+    assert terminal.returncode == 0
+    assert bytes(pump.stdout) == b'o' * 4096 * 1024
+    assert bytes(pump.stderr) == (b'e' * 4095 + b'\n') * 1024
+    terminal.stdout.close()
+    terminal.stderr.close()
+
+
+def test_timeout_partial_output(backend):  # pylint: disable=unused-argument,redefined-outer-name
+    terminal = _popen('import sys, time; sys.stdout.write("partial"); sys.stdout.flush(); time.sleep(60)')
+    pump = ProcessOutputPump(terminal)
+    start = time.time()
+    assert pump.run(start + 1) is False
+    assert time.time() - start < 10
+    assert pump.wait(time.time() + 0.1) is False
+    # What the CLI scripts do once the timeout is reached
+    terminal.kill()
+    assert pump.wait(time.time() + 10) is True
+    assert terminal.returncode != 0
+    assert bytes(pump.stdout) == b'partial'
+    assert bytes(pump.stderr) == b''
+    terminal.stdout.close()
+    terminal.stderr.close()
+
+
+def test_immediate_eof(backend):  # pylint: disable=unused-argument,redefined-outer-name
+    terminal = _popen('import os; os.close(1); os.close(2)')
+    pump = ProcessOutputPump(terminal)
+    start = time.time()
+    assert pump.run(start + 30) is True
+    assert pump.wait(start + 30) is True
+    assert time.time() - start < 10
+    assert bytes(pump.stdout) == bytes(pump.stderr) == b''
+    terminal.stdout.close()
+    terminal.stderr.close()
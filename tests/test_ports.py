@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+'''
+    test_ports.py
+    ~~~~~~~~~~~~~
+
+    Test the pytest salt plugin ports allocator
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import json
+import socket
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import ports
+
+pytestmark = pytest.mark.skipif(not ports.HAS_FCNTL, reason='The ports allocator requires fcntl')
+
+
+def test_unique_ports_across_allocators(tmpdir):
+    state_path = tmpdir.join('ports.json').strpath
+    allocators = [ports.PortAllocator(state_path=state_path, block_size=5) for _ in range(3)]
+    handed_out = [allocator.get_port() for _ in range(12) for allocator in allocators]
+    assert len(handed_out) == len(set(handed_out))
+
+
+def test_release(tmpdir):
+    state_path = tmpdir.join('ports.json')
+    allocator = ports.PortAllocator(state_path=state_path.strpath, block_size=5)
+    allocator.get_port()
+    assert json.loads(state_path.read())
+    allocator.release()
+    assert json.loads(state_path.read()) == {}
+
+
+def test_reclaim_dead_process_blocks(tmpdir):
+    state_path = tmpdir.join('ports.json')
+    port_range = ports.get_default_port_range()
+    # No process runs with a pid this high
+    state_path.write(json.dumps({str(port_range[0]): 2 ** 30}))
+    allocator = ports.PortAllocator(state_path=state_path.strpath, port_range=port_range, block_size=5)
+    allocator.get_port()
+    assert list(json.loads(state_path.read()).values()) == [allocator._pid]  # pylint: disable=protected-access
+
+
+def test_held_port_can_be_bound_by_daemon(tmpdir):
+    allocator = ports.PortAllocator(state_path=tmpdir.join('ports.json').strpath, block_size=5)
+    port = allocator.get_port(hold=True)
+    # Nothing which doesn't allow reusing the address gets the port while it's held
+    other_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    with pytest.raises(socket.error):
+        other_sock.bind(('127.0.0.1', port))
+    other_sock.close()
+    daemon_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    daemon_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        daemon_sock.bind(('127.0.0.1', port))
+        daemon_sock.listen(1)
+        allocator.release_ports([port])
+        assert ports.is_port_free(port) is False
+    finally:
+        daemon_sock.close()
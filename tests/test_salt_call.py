@@ -18,6 +18,9 @@ from __future__ import absolute_import
 # Import pytest libs
 import pytest
 
+# Import pytest-salt libs
+from pytestsalt.utils import zygote
+
 
 def test_ping(salt_call):
     assert salt_call.run_sync('test.ping', timeout=10).exitcode == 0
@@ -37,3 +40,28 @@ def test_sync(salt_call):
 def test_sync_async(salt_call):
     result = yield salt_call.run('saltutil.sync_all', timeout=10)
     assert result.exitcode == 0
+
+
+def test_run_many(salt_call):
+    calls = [(('test.ping',), {'timeout': 10})] * 4
+    finished = []
+    results = salt_call.run_many(calls, concurrency=2, callback=lambda index, result: finished.append(index))
+    assert [result.exitcode for result in results] == [0] * 4
+    assert sorted(finished) == [0, 1, 2, 3]
+
+
+@pytest.mark.skipif(not zygote.is_supported(), reason='Salt CLI zygotes are not supported on this platform')
+def test_ping_zygote(salt_call):
+    cold = salt_call.run_sync('test.ping', timeout=10)
+    salt_call.use_zygote = True
+    warm = salt_call.run_sync('test.ping', timeout=10)
+    assert warm.exitcode == cold.exitcode == 0
+    assert warm.json == cold.json
+
+
+def test_ping_caller_backend(salt_call):
+    cold = salt_call.run_sync('test.ping', timeout=10)
+    salt_call.backend = 'caller'
+    warm = salt_call.run_sync('test.ping', timeout=10)
+    assert warm.exitcode == cold.exitcode == 0
+    assert warm.json == cold.json
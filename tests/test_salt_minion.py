@@ -17,3 +17,24 @@ from __future__ import absolute_import
 
 def test_salt_minion_running(salt_minion):
     assert salt_minion.is_alive()
+
+
+def test_salt_ping_client_backend(salt):
+    cold = salt.run_sync('test.ping', timeout=10)
+    salt.backend = 'client'
+    warm = salt.run_sync('test.ping', timeout=10)
+    assert warm.exitcode == cold.exitcode == 0
+    assert warm.json == cold.json is True
+
+
+def test_salt_topology_running(salt_topology):
+    assert salt_topology.master.is_alive()
+    assert salt_topology.minion.is_alive()
+    assert salt_topology.secondary_minion.is_alive()
+
+
+def test_salt_topology_shares_daemons(salt_topology, salt_master, salt_minion, salt_call):
+    # The CLI fixtures and the topology use the same daemons, started together
+    assert salt_topology.master is salt_master
+    assert salt_topology.minion is salt_minion
+    assert salt_call.run_sync('test.ping').json is True
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+'''
+    test_skeleton.py
+    ~~~~~~~~~~~~~~~~
+
+    Test the pytest salt plugin root dir skeleton
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import stat
+
+# Import pytest-salt libs
+from pytestsalt.utils import skeleton
+
+
+def test_clone(tmpdir):
+    source = tmpdir.join('skeleton')
+    for relpath in skeleton.CONFIG_DIRS + skeleton.TREE_DIRS + skeleton.VERIFY_ENV_DIRS:
+        source.join(relpath).ensure(dir=True)
+    source.join(skeleton.PKI_DIR).chmod(0o700)
+
+    destination = tmpdir.join('root')
+    skeleton.Skeleton(source.strpath).clone(destination.strpath)
+
+    for relpath in skeleton.CONFIG_DIRS + skeleton.TREE_DIRS + skeleton.VERIFY_ENV_DIRS:
+        assert destination.join(relpath).isdir()
+    assert stat.S_IMODE(os.stat(destination.join(skeleton.PKI_DIR).strpath).st_mode) == 0o700
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+'''
+    test_ssh_keys.py
+    ~~~~~~~~~~~~~~~~
+
+    Test generating the SSH keys only once per session
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import shutil
+import subprocess
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.fixtures import config
+import pytestsalt.utils.compat as compat
+
+pytestmark = pytest.mark.skipif(compat.which('ssh-keygen') is None, reason='"ssh-keygen" not found')
+
+
+@pytest.fixture
+def key_store(monkeypatch):
+    store = config.SSHKeyStore()
+    store.keygen_runs = []
+    popen = subprocess.Popen
+
+    def counting_popen(args, **kwargs):
+        store.keygen_runs.append(args)
+        return popen(args, **kwargs)
+
+    monkeypatch.setattr(config.subprocess, 'Popen', counting_popen)
+    yield store
+    if store.path is not None:
+        shutil.rmtree(store.path, True)
+
+
+def _read(path):
+    with open(path, 'rb') as rfh:
+        return rfh.read()
+
+
+def test_generate_once(tmpdir, key_store):  # pylint: disable=redefined-outer-name
+    first = tmpdir.join('first').strpath
+    key_store.copy([(first, 'ecdsa', 521), (first + '-rsa', 'rsa', 2048)])
+    assert len(key_store.keygen_runs) == 2
+    assert os.stat(first).st_mode & 0o777 == 0o600
+    store_path = key_store.path
+
+    # The same type and size of key, somewhere else, is copied from the store
+    second = tmpdir.join('second').strpath
+    key_store.copy([(second, 'ecdsa', 521)])
+    assert len(key_store.keygen_runs) == 2
+    assert key_store.path == store_path
+    assert _read(second) == _read(first)
+    assert _read(second + '.pub') == _read(first + '.pub')
+
+    # Only the keys of a new type are generated
+    key_store.copy([(tmpdir.join('third').strpath, 'ecdsa', 521), (tmpdir.join('fourth').strpath, 'ed25519', 256)])
+    assert len(key_store.keygen_runs) == 3
+    assert key_store.keygen_runs[-1][key_store.keygen_runs[-1].index('-t') + 1] == 'ed25519'
+
+
+def test_existing_keys_kept(tmpdir, key_store):  # pylint: disable=redefined-outer-name
+    key_path = tmpdir.join('key')
+    key_path.write('existing')
+    key_store.copy([(key_path.strpath, 'ecdsa', 521)])
+    assert key_store.keygen_runs == []
+    assert key_store.path is None
+    assert key_path.read() == 'existing'
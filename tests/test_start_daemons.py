@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+'''
+    test_start_daemons.py
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Test starting several daemons concurrently
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import threading
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import containment
+from pytestsalt.utils import start_daemons
+from pytestsalt.utils import SaltDaemonScriptBase
+
+pytestmark = pytest.mark.skipif(not containment.is_supported(), reason='Process groups are not supported')
+
+
+class FakeRequest(object):
+
+    def __init__(self):
+        self.finalizers = []
+
+    def addfinalizer(self, finalizer):
+        self.finalizers.append((threading.current_thread(), finalizer))
+
+    def getfixturevalue(self, name):
+        assert name == '_salt_daemon_readiness'
+        return 'ports'
+
+    def run_finalizers(self):
+        # Like pytest, the last one added first
+        while self.finalizers:
+            self.finalizers.pop()[1]()
+
+
+class RecordingDaemon(SaltDaemonScriptBase):
+    '''
+    Runs a script standing in for a salt daemon, recording when it's stopped
+    '''
+
+    stopped = []
+
+    def get_script_path(self, script_name):
+        return os.path.join(self.config_dir, script_name)
+
+    def terminate(self):
+        if self._running.is_set():
+            self.stopped.append(self.log_prefix)
+        super(RecordingDaemon, self).terminate()
+
+
+def _kwargs(tmpdir, name, script_name='daemon'):
+    return dict(daemon_name=name,
+                daemon_id=name,
+                daemon_log_prefix=name,
+                daemon_cli_script_name=script_name,
+                daemon_config={},
+                daemon_config_dir=tmpdir.strpath,
+                daemon_class=RecordingDaemon,
+                bin_dir_path=tmpdir.strpath,
+                fail_hard=True,
+                slow_stop=False,
+                max_attempts=1)
+
+
+@pytest.fixture
+def script(tmpdir):
+    path = tmpdir.join('daemon')
+    path.write('#!/bin/sh\nexec sleep 60\n')
+    path.chmod(0o755)
+    del RecordingDaemon.stopped[:]
+    return path
+
+
+def test_start_daemons(tmpdir, script):  # pylint: disable=unused-argument,redefined-outer-name
+    request = FakeRequest()
+    daemons = start_daemons(request, [(name, _kwargs(tmpdir, name)) for name in ('master', 'minion', 'syndic')])
+    try:
+        assert sorted(daemons) == ['master', 'minion', 'syndic']
+        assert all(daemon.is_alive() for daemon in daemons.values())
+        # Not from the threads the daemons were started in
+        assert [thread for thread, _ in request.finalizers] == [threading.current_thread()] * 3
+    finally:
+        request.run_finalizers()
+    # The daemons the others connect to are listed first, and stopped last
+    assert RecordingDaemon.stopped == ['syndic', 'minion', 'master']
+
+
+def test_start_daemons_failure(tmpdir, script):  # pylint: disable=unused-argument,redefined-outer-name
+    request = FakeRequest()
+    with pytest.raises(Exception):
+        start_daemons(request, [
+            ('master', _kwargs(tmpdir, 'master')),
+            ('minion', _kwargs(tmpdir, 'minion', script_name='missing')),
+        ])
+    # The daemons which did start are still stopped
+    assert len(request.finalizers) == 1
+    request.run_finalizers()
+    assert RecordingDaemon.stopped == ['master']
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+    test_terminate_process.py
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test terminating lists of processes
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import sys
+import time
+import signal
+import subprocess
+
+# Import pytest libs
+import pytest
+
+# Import 3rd-party libs
+import psutil
+
+# Import pytest-salt libs
+import pytestsalt.utils
+from pytestsalt.utils import terminate_process_list
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith('win'), reason='SIGTERM can not be ignored on windows')
+
+IGNORE_SIGTERM = '''
+import sys, time, signal
+signal.signal(signal.SIGTERM, signal.SIG_IGN)
+sys.stdout.write('ready\\n')
+sys.stdout.flush()
+time.sleep(60)
+'''
+
+
+def _start(code):
+    child = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+    assert child.stdout.readline() == b'ready\n'
+    child.stdout.close()
+    return child
+
+
+def test_stragglers_killed_after_grace_period(monkeypatch):
+    grace_period = 1
+    monkeypatch.setattr(pytestsalt.utils, 'TERMINATE_STEP_TIMEOUTS', (grace_period, grace_period, 5))
+    children = [_start(IGNORE_SIGTERM) for _ in range(5)]
+    children.append(_start('import sys, time; sys.stdout.write("ready\\n"); sys.stdout.flush(); time.sleep(60)'))
+    processes = [psutil.Process(child.pid) for child in children]
+    process_list = processes[:]
+    start = time.time()
+    terminate_process_list(process_list, slow_stop=True)
+    elapsed = time.time() - start
+    assert process_list == []
+    # The one which doesn't ignore SIGTERM is gone right away, the others only get
+    # killed once both of the slow stop steps are over
+    assert processes[-1].returncode == -signal.SIGTERM
+    assert [proc.returncode for proc in processes[:-1]] == [-signal.SIGKILL] * 5
+    assert elapsed >= 2 * grace_period
+    # Waited for collectively, not one after the other
+    assert elapsed < 2 * grace_period + 2
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+'''
+    test_wait_until_running.py
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Test waiting for the salt daemons to be running
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import socket
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+import pytestsalt.utils
+from pytestsalt.utils import SaltDaemonScriptBase
+
+
+class FakeTime(object):
+    '''
+    A clock which only moves forward when slept on
+    '''
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeSocketModule(object):
+    '''
+    Stands in for the socket module, the port is connectable after ``refused`` attempts
+    '''
+
+    AF_INET = socket.AF_INET
+    SOCK_STREAM = socket.SOCK_STREAM
+    SHUT_RDWR = socket.SHUT_RDWR
+    error = socket.error
+
+    def __init__(self, refused):
+        self.refused = refused
+        self.attempts = 0
+
+    def socket(self, *args):
+        return FakeSocket(self)
+
+
+class FakeSocket(object):
+
+    def __init__(self, module):
+        self.module = module
+
+    def connect_ex(self, address):
+        self.module.attempts += 1
+        return 0 if self.module.attempts > self.module.refused else 111
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+class Daemon(SaltDaemonScriptBase):
+
+    def get_check_ports(self):
+        return [4506]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_time = FakeTime()
+    monkeypatch.setattr(pytestsalt.utils, 'time', fake_time)
+    return fake_time
+
+
+def _daemon(clock):  # pylint: disable=redefined-outer-name
+    daemon = Daemon(None, {}, '/tmp', '/tmp', 'test', cli_script_name='salt-master', readiness='ports')
+    daemon._running.set()
+    daemon._start_time = clock.now
+    return daemon
+
+
+def _expected_sleeps(count):
+    interval = Daemon.RUNNING_CHECK_INITIAL_INTERVAL
+    sleeps = []
+    for _ in range(count):
+        sleeps.append(interval)
+        interval = min(interval * Daemon.RUNNING_CHECK_BACKOFF_FACTOR, Daemon.RUNNING_CHECK_MAX_INTERVAL)
+    return sleeps
+
+
+def test_backoff(monkeypatch, clock):  # pylint: disable=redefined-outer-name
+    monkeypatch.setattr(pytestsalt.utils, 'socket', FakeSocketModule(refused=15))
+    daemon = _daemon(clock)
+    assert daemon.wait_until_running(timeout=60) is True
+    # One sleep after each refused connection
+    assert clock.sleeps == pytest.approx(_expected_sleeps(15))
+    # The intervals grow, and stop growing once capped
+    assert clock.sleeps[1] > clock.sleeps[0]
+    assert clock.sleeps[-2] == clock.sleeps[-1] == Daemon.RUNNING_CHECK_MAX_INTERVAL
+    assert daemon.startup_time == pytest.approx(sum(clock.sleeps))
+    # Already running, no more checks
+    assert daemon.wait_until_running(timeout=60) is True
+    assert len(clock.sleeps) == 15
+
+
+def test_backoff_timeout(monkeypatch, clock):  # pylint: disable=redefined-outer-name
+    fake_socket = FakeSocketModule(refused=float('inf'))
+    monkeypatch.setattr(pytestsalt.utils, 'socket', fake_socket)
+    daemon = _daemon(clock)
+    timeout = 5
+    assert daemon.wait_until_running(timeout=timeout) is False
+    assert daemon.startup_time is None
+    assert max(clock.sleeps) == Daemon.RUNNING_CHECK_MAX_INTERVAL
+    # The last sleep doesn't go past the timeout
+    assert clock.now - daemon._start_time == pytest.approx(timeout)
+    assert fake_socket.attempts == len(clock.sleeps)
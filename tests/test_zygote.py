@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+'''
+    test_zygote.py
+    ~~~~~~~~~~~~~~
+
+    Test the pytest salt plugin Salt CLI zygotes bookkeeping
+'''
+
+# Import python libs
+from __future__ import absolute_import
+
+# Import pytest libs
+import pytest
+
+# Import pytest-salt libs
+from pytestsalt.utils import zygote
+
+
+class FakeZygote(object):
+
+    def __init__(self, script_path, environ, cwd, config_file=None):
+        self.script_path = script_path
+        self.environ = environ
+        self.cwd = cwd
+        self.config_file = config_file
+        self.alive = False
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+
+@pytest.fixture
+def zygotes(monkeypatch):
+    monkeypatch.setattr(zygote, 'SaltCliZygote', FakeZygote)
+    monkeypatch.setattr(zygote, '_ZYGOTES', {})
+
+
+def test_get_zygote_per_config_file(zygotes):  # pylint: disable=unused-argument,redefined-outer-name
+    master = zygote.get_zygote('salt-call', {'A': '1'}, '/', config_file='/master/minion')
+    assert zygote.get_zygote('salt-call', {'A': '1'}, '/', config_file='/master/minion') is master
+    other = zygote.get_zygote('salt-call', {'A': '1'}, '/', config_file='/other/minion')
+    assert other is not master
+    assert other.config_file == '/other/minion'
+    assert master.is_alive()
+
+
+def test_get_zygote_restarts_on_changes(zygotes):  # pylint: disable=unused-argument,redefined-outer-name
+    first = zygote.get_zygote('salt-call', {'A': '1'}, '/', config_file='/minion')
+    second = zygote.get_zygote('salt-call', {'A': '2'}, '/', config_file='/minion')
+    assert second is not first
+    assert not first.is_alive()
+    assert second.environ == {'A': '2'}
+    third = zygote.get_zygote('salt-call', {'A': '2'}, '/tmp', config_file='/minion')
+    assert third is not second
+    assert not second.is_alive()
+    assert third.cwd == '/tmp'